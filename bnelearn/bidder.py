@@ -177,7 +177,8 @@ class Bidder(Player):
         if valuations is None:
             valuations = self._cached_valuations
 
-        item_dimension = valuations.dim() - 1
+        # allocations may have more (leading) batch dimensions than valuations
+        item_dimension = -1
         welfare = (valuations * allocations).sum(dim=item_dimension)
 
         return welfare
@@ -253,7 +254,7 @@ class CombinatorialBidder(Bidder):
         if valuations is None:
             valuations = self._cached_valuations
 
-        item_dimension = valuations.dim() - 1
+        item_dimension = -1
 
         valuations_extended = torch.zeros_like(allocations, dtype=torch.float)
         if self.player_position == 2:
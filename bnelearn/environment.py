@@ -5,9 +5,13 @@ implements reward allocation to agents.
 """
 
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from copy import deepcopy
+from threading import Lock
 from typing import Callable, Set, Iterable, Tuple
 
 import torch
+from torch.nn.utils import parameters_to_vector, vector_to_parameters
 
 from bnelearn.bidder import Bidder, MatrixGamePlayer, Player
 from bnelearn.mechanism import MatrixGame, Mechanism
@@ -80,6 +84,42 @@ class Environment(ABC):
                                aggregate=aggregate_batch, regularize=regularize,
                                smooth_market=smooth_market, deterministic=deterministic)
 
+    def get_strategies_rewards(self, strategies: Iterable[Strategy] or torch.Tensor, player_position: int,
+                               model: NeuralNetStrategy = None, aggregate_batch=True,
+                               regularize: float=0, smooth_market: bool=False,
+                               deterministic: bool=False, **strat_to_player_kwargs) -> torch.Tensor:
+        """Returns rewards of K candidate strategies in the given agent position,
+        all evaluated against the same environment.
+
+        Args:
+            strategies: either an iterable of K strategies, or a tensor of shape
+                (K, n_parameters) of flat parameter vectors for `model`.
+            player_position: the player position at which the candidates will be evaluated
+            model: NeuralNetStrategy whose architecture is used when `strategies`
+                is a parameter tensor.
+            Further arguments as in `get_strategy_reward`.
+
+        Returns:
+            rewards: torch.Tensor of shape (K) or (K, batch_size) if not `aggregate_batch`.
+        """
+        if torch.is_tensor(strategies):
+            if model is None:
+                raise ValueError('A model is required to evaluate a tensor of parameters.')
+            candidates = []
+            for parameters in strategies:
+                candidate = deepcopy(model)
+                vector_to_parameters(parameters, candidate.parameters())
+                candidates.append(candidate)
+            strategies = candidates
+
+        return torch.stack([
+            self.get_strategy_reward(
+                strategy, player_position, aggregate_batch=aggregate_batch,
+                regularize=regularize, smooth_market=smooth_market,
+                deterministic=deterministic, **strat_to_player_kwargs)
+            for strategy in strategies
+        ])
+
     def get_strategy_action_and_reward(self, strategy: Strategy, player_position: int,
                                        redraw_valuations=False, **strat_to_player_kwargs) -> torch.Tensor:
         """Returns reward of a given strategy in given environment agent position.
@@ -188,6 +228,10 @@ class AuctionEnvironment(Environment):
 
         strategy_to_bidder_closure: A closure (strategy, batch_size) -> Bidder to
             transform strategies into a Bidder compatible with the environment
+        cache_opponent_actions: whether to cache the actions of environment
+            agents between calls. Cached actions are reused as long as neither
+            the valuations have been redrawn nor the agent's parameters have
+            changed (e.g. by an optimizer step).
     """
 
     def __init__(
@@ -198,7 +242,8 @@ class AuctionEnvironment(Environment):
             batch_size = 100,
             n_players = None,
             strategy_to_player_closure: Callable[[Strategy], Bidder] = None,
-            redraw_every_iteration: bool = False
+            redraw_every_iteration: bool = False,
+            cache_opponent_actions: bool = True
         ):
 
         assert isinstance(valuation_observation_sampler, ValuationObservationSampler)
@@ -217,6 +262,16 @@ class AuctionEnvironment(Environment):
         self.sampler = valuation_observation_sampler
 
         self._redraw_every_iteration = redraw_every_iteration
+
+        # actions of environment agents, keyed by agent, reused as long as
+        # `_action_cache_key` of that agent doesn't change
+        self._cache_opponent_actions = cache_opponent_actions
+        self._action_cache = {}
+        # learners may evaluate concurrently (see `shared_iteration`)
+        self._action_cache_lock = Lock()
+        # incremented whenever new valuations/observations are drawn
+        self._valuation_generation = 0
+
         # draw initial observations and iterations
         self._observations: torch.Tensor = None
         self._valuations: torch.Tensor = None
@@ -245,8 +300,70 @@ class AuctionEnvironment(Environment):
             if isinstance(agent.strategy, NeuralNetStrategy):
                 agent.strategy.train(False)
 
-            yield (agent.player_position,
-                   agent.get_action(self._observations[..., agent.player_position, :]))
+            key = self._action_cache_key(agent)
+            with self._action_cache_lock:
+                cached = self._action_cache.get(id(agent))
+            if key is not None and cached is not None and cached[0][:2] == key[:2] \
+                    and torch.equal(cached[0][2], key[2]):
+                action = cached[1]
+            else:
+                action = agent.get_action(self._observations[..., agent.player_position, :])
+                if key is not None:
+                    with self._action_cache_lock:
+                        self._action_cache[id(agent)] = (key, action.detach())
+
+            yield (agent.player_position, action)
+
+    def get_strategies_rewards(self, strategies: Iterable[Strategy] or torch.Tensor, player_position: int,
+                               model: NeuralNetStrategy = None, aggregate_batch=True,
+                               regularize: float=0, smooth_market: bool=False,
+                               deterministic: bool=False, **strat_to_player_kwargs) -> torch.Tensor:
+        """Returns rewards of K candidate strategies in the given agent position.
+
+        In contrast to the generic implementation, the (K, batch_size, n_players, n_items)
+        bid profile is built once, reusing the opponents' bids, and all
+        candidates are played in a single mechanism call. A tensor of parameters
+        is evaluated in a single stacked forward pass of `model`.
+        See `Environment.get_strategies_rewards` for the arguments.
+        """
+        if torch.is_tensor(strategies):
+            if model is None:
+                raise ValueError('A model is required to evaluate a tensor of parameters.')
+            candidates = _PopulationStrategy(model, strategies)
+        else:
+            candidates = _StackedStrategies(strategies)
+
+        return self.get_strategy_reward(
+            candidates, player_position, aggregate_batch=aggregate_batch,
+            regularize=regularize, smooth_market=smooth_market,
+            deterministic=deterministic, **strat_to_player_kwargs)
+
+    def _action_cache_key(self, agent: Bidder) -> tuple or None:
+        """Returns the key under which an agent's actions can be cached, or
+        None if its actions must not be cached.
+
+        The key consists of the valuation-draw generation, the strategy and a
+        copy of its parameters. Comparing the parameters' contents (rather than
+        their storage or version counters) also detects updates that bypass
+        autograd's version tracking, e.g. `vector_to_parameters` or writes to
+        aliased `.data` buffers as in `PSOLearner`.
+        """
+        if not self._cache_opponent_actions:
+            return None
+        strategy = agent.strategy
+        # mixed strategies sample new actions in each call
+        if getattr(strategy, 'mixed_strategy', None):
+            return None
+        if isinstance(strategy, torch.nn.Module) and any(True for _ in strategy.parameters()):
+            parameters = parameters_to_vector(strategy.parameters()).detach().clone()
+        else:
+            parameters = torch.empty(0)
+        return (self._valuation_generation, id(strategy), parameters)
+
+    def invalidate_action_cache(self):
+        """Discards all cached actions of environment agents."""
+        with self._action_cache_lock:
+            self._action_cache = {}
 
     def get_reward(
             self,
@@ -260,6 +377,11 @@ class AuctionEnvironment(Environment):
         ) -> torch.Tensor or Tuple[torch.Tensor, torch.Tensor]: #pylint: disable=arguments-differ
         """Returns reward of a single player against the environment, and optionally additionally the allocation of that player.
            Reward is calculated as average utility for each of the batch_size x env_size games
+
+           The agent's strategy may return actions with additional leading
+           (population) dimensions, i.e. of shape (*population_sizes, batch_size, action_length).
+           In that case, all candidates are played against the same opponent
+           actions in a single mechanism call and rewards are returned per candidate.
         """
 
         if not isinstance(agent, Bidder):
@@ -279,16 +401,16 @@ class AuctionEnvironment(Environment):
 
         # get agent_bid
         agent_bid = agent.get_action(agent_observation, deterministic=deterministic)
-        action_length = agent_bid.shape[-1]
+        *population_sizes, _, action_length = agent_bid.shape
 
         if not self.agents or len(self.agents)==1:# Env is empty --> play only with own action against 'nature'
             allocations, payments = self.mechanism.play(
-                agent_bid.view(agent.batch_size, 1, action_length),
+                agent_bid.view(*population_sizes, agent.batch_size, 1, action_length),
                 smooth_market=smooth_market
             )
         else: # at least 2 environment agent --> build bid_profile, then play
             # get bid profile
-            bid_profile = torch.empty(self.batch_size, self.n_players, action_length,
+            bid_profile = torch.empty(*population_sizes, self.batch_size, self.n_players, action_length,
                                       dtype=agent_bid.dtype, device=self.mechanism.device)
             bid_profile[..., player_position, :] = agent_bid
 
@@ -303,7 +425,7 @@ class AuctionEnvironment(Environment):
                 # since auction mechanisms are symmetric, we'll define 'our' agent to have position 0
                 if opponent_pos is None:
                     opponent_pos = counter
-                bid_profile[:, opponent_pos, :] = opponent_bid.detach()
+                bid_profile[..., opponent_pos, :] = opponent_bid.detach()
                 counter = counter + 1
 
             allocations, payments = self.mechanism.play(bid_profile, smooth_market=smooth_market)
@@ -314,11 +436,16 @@ class AuctionEnvironment(Environment):
         # average over batch against this opponent
         agent_utility = agent.get_utility(agent_allocation, agent_payment, agent_valuation)
 
-        # regularize
-        agent_utility -= regularize * agent_bid.mean()
+        # regularize (per candidate if a population of actions was given, and
+        # per member slice of the batch if the agent plays an ensemble)
+        if regularize:
+            n_members = getattr(agent.strategy, 'n_members', 1)
+            mean_bids = agent_bid.reshape(*population_sizes, n_members, -1).mean(dim=-1, keepdim=True)
+            agent_utility = (agent_utility.view(*population_sizes, n_members, -1) - regularize * mean_bids) \
+                .view_as(agent_utility)
 
         if aggregate:
-            agent_utility = agent_utility.mean()
+            agent_utility = agent_utility.mean(dim=-1) if population_sizes else agent_utility.mean()
 
             if return_allocation:
                 # Returns flat tensor with int entries `i` for an allocation of `i`th item
@@ -418,6 +545,21 @@ class AuctionEnvironment(Environment):
         if self._redraw_every_iteration:
             self.draw_valuations()
 
+    @contextmanager
+    def shared_iteration(self):
+        """Context in which several learners share a single iteration of the
+        environment, e.g. when updating concurrently: The iteration is
+        prepared once on entry and `prepare_iteration` does not redraw
+        valuations within the context.
+        """
+        self.prepare_iteration()
+        redraw_every_iteration = self._redraw_every_iteration
+        self._redraw_every_iteration = False
+        try:
+            yield self
+        finally:
+            self._redraw_every_iteration = redraw_every_iteration
+
     def draw_valuations(self):
         """
         Draws a new valuation and observation profile
@@ -432,6 +574,9 @@ class AuctionEnvironment(Environment):
         self._valuations, self._observations = \
             self.sampler.draw_profiles(batch_sizes=self.batch_size)
 
+        self._valuation_generation += 1
+        self.invalidate_action_cache()
+
     def draw_conditionals(
             self,
             conditioned_player: int,
@@ -450,3 +595,30 @@ class AuctionEnvironment(Environment):
             inner_batch_size, device
         )
         return cv, co
+
+
+class _StackedStrategies(Strategy):
+    """Plays a list of strategies at once, stacking their actions along a
+    new leading (population) dimension."""
+    def __init__(self, strategies: Iterable[Strategy]):
+        self.strategies = list(strategies)
+        self.n_members = getattr(self.strategies[0], 'n_members', 1)
+        if hasattr(self.strategies[0], 'input_length'):
+            self.input_length = self.strategies[0].input_length
+
+    def play(self, inputs, deterministic: bool = False):
+        return torch.stack([s.play(inputs, deterministic=deterministic) for s in self.strategies])
+
+
+class _PopulationStrategy(Strategy):
+    """Wraps a `NeuralNetStrategy` and a stack of flat parameter vectors, such
+    that the whole population plays at once with the population as leading
+    batch dimension."""
+    def __init__(self, model: NeuralNetStrategy, parameters: torch.Tensor):
+        self.model = model
+        self.parameters = parameters
+        self.n_members = getattr(model, 'n_members', 1)
+        self.input_length = model.input_length
+
+    def play(self, inputs, deterministic: bool = False):
+        return self.model.forward_with_parameters(inputs, self.parameters, deterministic)
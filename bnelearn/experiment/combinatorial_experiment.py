@@ -534,7 +534,8 @@ class LLLLGGExperiment(LocalGlobalExperiment):
 
     def _setup_mechanism(self):
         self.mechanism = LLLLGGAuction(rule=self.payment_rule, core_solver=self.setting.core_solver,
-                                       parallel=self.hardware.max_cpu_threads, cuda=self.hardware.cuda)
+                                       parallel=self.hardware.max_cpu_threads, cuda=self.hardware.cuda,
+                                       warm_start=self.setting.core_solver_warm_start)
 
     def _get_logdir_hierarchy(self):
         name = ['LLLLGG', self.payment_rule, str(self.n_players) + 'p']
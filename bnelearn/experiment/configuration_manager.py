@@ -468,7 +468,8 @@ class ConfigurationManager:
                     correlation_coefficients: List[float] = 'None',
                     pretrain_transform: callable = 'None', constant_marginal_values: bool = 'None',
                     item_interest_limit: int = 'None', efficiency_parameter: float = 'None',
-                    core_solver: str = 'None', tullock_impact_factor: float = 'None', impact_function: str = 'None',
+                    core_solver: str = 'None', core_solver_warm_start: bool = 'None',
+                    tullock_impact_factor: float = 'None', impact_function: str = 'None',
                     crowdsourcing_values: List = None):
         """
         Sets only the parameters of setting which were passed, returns self. Using None here and below
@@ -501,7 +502,11 @@ class ConfigurationManager:
                 multi-unit auctions.
             efficiency_parameters: Efficiency parameter in split-award auction.
             core_solver: Specifies which solver should be used to calculate core prices.
-                Should be one of 'NoCore', 'mpc', 'gurobi', 'cvxpy' (Relevant settings: LLLLGG)
+                Should be one of 'NoCore', 'mpc', 'gurobi', 'enumeration', 'cvxpy', 'qpth' or 'auto', which picks the
+                fastest sufficiently accurate solver per batch size. (Relevant settings: LLLLGG)
+            core_solver_warm_start: Whether to warm-start the 'mpc' core solver from the
+                payments of its previous call, which speeds up repeated solves of similar bids,
+                e.g. for the population of an ES learner. (Relevant settings: LLLLGG)
 
         Returns:
             ``self`` with updated parameters.
@@ -520,7 +525,8 @@ class ConfigurationManager:
                      pretrain_iters: int = 'None', smoothing_temperature: bool = 'None',
                      batch_size: int = 'None', hidden_activations: List[nn.Module] = 'None',
                      redraw_every_iteration: bool = 'None', mixed_strategy: str = 'None',
-                     pretrain_to_bne: None or int = 'None', value_contest: bool = True):
+                     pretrain_to_bne: None or int = 'None', value_contest: bool = True,
+                     quasi_monte_carlo: bool = 'None', prefetch_batches: int = 'None'):
         """Sets only the parameters of learning which were passed, returns self"""
         for arg, v in {key: value for key, value in locals().items() if key != 'self' and value != 'None'}.items():
             if hasattr(self.learning, arg):
@@ -538,7 +544,13 @@ class ConfigurationManager:
                     save_figure_to_disk_png: bool = 'None', save_figure_to_disk_svg: bool = 'None',
                     save_figure_data_to_disk: bool = 'None',
                     cache_eval_actions: bool = 'None', export_step_wise_linear_bid_function_size: bool = 'None',
-                    experiment_dir: str = 'None', experiment_name: str = 'None'):
+                    experiment_dir: str = 'None', experiment_name: str = 'None',
+                    util_loss_memory_budget: int = 'None', util_loss_n_threads: int = 'None',
+                    util_loss_refinement_rounds: int = 'None', util_loss_refinement_top_k: int = 'None',
+                    util_loss_polishing_steps: int = 'None',
+                    async_evaluation: bool = 'None', async_evaluation_max_pending: int = 'None',
+                    eval_tolerance: float = 'None', eval_chunk_size: int = 'None',
+                    util_loss_tolerance: float = 'None'):
         """Sets only the parameters of logging which were passed, returns self"""
         for arg, v in {key: value for key, value in locals().items() if key != 'self' and value != 'None'}.items():
             if hasattr(self.logging, arg):
@@ -551,7 +563,8 @@ class ConfigurationManager:
 
     # pylint: disable=too-many-arguments, unused-argument
     def set_hardware(self, cuda: bool = 'None', specific_gpu: int = 'None', fallback: bool = 'None',
-                     max_cpu_threads: int = 'None'):
+                     max_cpu_threads: int = 'None', parallel_learner_updates: bool = 'None',
+                     parallel_runs: int = 'None', ensemble_runs: bool = 'None'):
         """Sets only the parameters of hardware which were passed, returns self"""
         for arg, v in {key: value for key, value in locals().items() if key != 'self' and value != 'None'}.items():
             if hasattr(self.hardware, arg):
@@ -612,7 +625,9 @@ class ConfigurationManager:
             smoothing_temperature=None,
             redraw_every_iteration=False,
             mixed_strategy=None,
-            bias=True)
+            bias=True,
+            quasi_monte_carlo=False,
+            prefetch_batches=0)
         logging = LoggingConfig(
             enable_logging=True,
             log_root_dir=os.path.join(os.path.expanduser('~'), 'bnelearn', 'experiments'),
@@ -635,12 +650,25 @@ class ConfigurationManager:
             eval_frequency=100,
             best_response=False,
             eval_batch_size=2 ** 22,
-            cache_eval_actions=True)
+            cache_eval_actions=True,
+            util_loss_memory_budget=None,
+            util_loss_n_threads=1,
+            util_loss_refinement_rounds=0,
+            util_loss_refinement_top_k=4,
+            util_loss_polishing_steps=0,
+            async_evaluation=False,
+            async_evaluation_max_pending=1,
+            eval_tolerance=None,
+            eval_chunk_size=2 ** 12,
+            util_loss_tolerance=None)
         hardware = HardwareConfig(
             specific_gpu=0,
             cuda=True,
             fallback=False,
-            max_cpu_threads=MAX_CPU_THREADS)
+            max_cpu_threads=MAX_CPU_THREADS,
+            parallel_learner_updates=False,
+            parallel_runs=1,
+            ensemble_runs=False)
 
         return running, setting, learning, logging, hardware
 
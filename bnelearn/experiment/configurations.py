@@ -61,6 +61,8 @@ class SettingConfig:
 
     # LLLLGG
     core_solver: str = None
+    # whether to warm-start the 'mpc' core solver from its previous solution
+    core_solver_warm_start: bool = False
     # parallel: int = 1 in hardware config now
 
     # Contests
@@ -88,6 +90,12 @@ class LearningConfig:
     bias: bool
     hidden_activations: List[nn.Module] = None
     value_contest: bool = True
+    # Draw valuations and observations from scrambled Sobol sequences
+    # (randomized quasi-Monte Carlo) instead of pseudo-random numbers
+    quasi_monte_carlo: bool = False
+    # With `redraw_every_iteration`, the number of batches of valuations
+    # that are drawn ahead of time in a background process (0: disabled)
+    prefetch_batches: int = 0
 
 
 
@@ -140,6 +148,34 @@ class LoggingConfig:
     experiment_dir: str = None
     experiment_name: str = None
 
+    # Utility Loss calculation on CPU: RAM (in bytes) that mini batches may
+    # use at once (defaults to half of the available memory) and number of
+    # threads that evaluate mini batches concurrently
+    util_loss_memory_budget: int = None
+    util_loss_n_threads: int = 1
+
+    # Utility Loss calculation: number of rounds in which the best responses
+    # on the grid are refined locally, and number of candidates refined per round
+    util_loss_refinement_rounds: int = 0
+    util_loss_refinement_top_k: int = 4
+    # Utility Loss calculation: number of local ascent steps that polish the best responses
+    util_loss_polishing_steps: int = 0
+
+    # Calculates the evaluation metrics in a separate worker process while
+    # training continues. Training waits once `async_evaluation_max_pending`
+    # evaluations are outstanding.
+    async_evaluation: bool = False
+    async_evaluation_max_pending: int = 1
+
+    # Sequential estimation: If given, the utilities vs. BNE are estimated from
+    # chunks of `eval_chunk_size` games until their standard error falls below
+    # `eval_tolerance` (`eval_batch_size` is the cap) and reported with their
+    # confidence intervals. Likewise for the utilities of the actual actions in
+    # the util loss, with `util_loss_opponent_batch_size` as cap.
+    eval_tolerance: float = None
+    eval_chunk_size: int = 2**12
+    util_loss_tolerance: float = None
+
 
 @dataclass
 class HardwareConfig:
@@ -148,6 +184,12 @@ class HardwareConfig:
     fallback: bool
     max_cpu_threads: int
     device: str = None
+    # Whether the learners of an experiment update concurrently in each iteration
+    parallel_learner_updates: bool = False
+    # Number of runs (seeds) of an experiment that are run in parallel worker processes
+    parallel_runs: int = 1
+    # Whether all runs of an experiment are trained at once as stacked ensemble models
+    ensemble_runs: bool = False
 
 
 @dataclass
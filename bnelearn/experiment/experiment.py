@@ -8,6 +8,8 @@ from sys import platform
 import time
 from inspect import getmembers
 from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import multiprocessing
 from time import perf_counter as timer
 from typing import Iterable, List, Callable
 from collections import deque
@@ -26,13 +28,14 @@ from mpl_toolkits.mplot3d import Axes3D  # pylint: disable=unused-import
 
 import bnelearn.util.logging as logging_utils
 import bnelearn.util.metrics as metrics
+from bnelearn.util.process_pool import shutdown_process_pools
 import bnelearn.learner as learners
 from bnelearn.bidder import Bidder
 from bnelearn.environment import AuctionEnvironment, Environment
 from bnelearn.experiment.configurations import ExperimentConfig
 from bnelearn.mechanism import Mechanism
-from bnelearn.strategy import NeuralNetStrategy
-from bnelearn.sampler import ValuationObservationSampler
+from bnelearn.strategy import NeuralNetStrategy, EnsembleStrategy
+from bnelearn.sampler import ValuationObservationSampler, PrefetchingSampler
 
 
 # pylint: disable=unnecessary-pass,unused-argument
@@ -97,6 +100,10 @@ class Experiment(ABC):
         self.bidders: Iterable[Bidder] = None
         self.env: Environment = None
         self.learners: Iterable[learners.Learner] = None
+        self._learner_pool: ThreadPoolExecutor = None
+        # only set in ensemble runs
+        self.ensemble_models: List[List[torch.nn.Module]] = None
+        self.ensemble_utilities: torch.Tensor = None
 
         # These are set on first _log_experiment
         self.v_opt: torch.Tensor = None
@@ -132,9 +139,11 @@ class Experiment(ABC):
         for b_id, m_id in enumerate(self._bidder2model):
             self._model2bidder[m_id].append(b_id)
         self._model_names = self._get_model_names()
+        self._evaluation_worker = None
 
         self._setup_mechanism()
         self._setup_sampler()
+        self.sampler.quasi_monte_carlo = self.learning.quasi_monte_carlo
 
         self.known_bne = self._check_and_set_known_bne()
         if self.known_bne:
@@ -199,6 +208,30 @@ class Experiment(ABC):
             )
             for m_id, model in enumerate(self.models)]
 
+    def _setup_learner_pool(self):
+        """Sets up a thread pool for concurrent updates of the learners, if
+        requested via `hardware.parallel_learner_updates`.
+
+        Each worker thread gets an equal share of `hardware.max_cpu_threads`
+        as its intra-op thread budget. (With torch's OpenMP backend,
+        `torch.set_num_threads` applies to the calling thread only.)
+        """
+        if not self.hardware.parallel_learner_updates or len(self.learners) < 2:
+            return
+        if not all(isinstance(l, learners.GradientBasedLearner) for l in self.learners):
+            warnings.warn('Parallel learner updates require gradient-based learners. Updating sequentially.')
+            return
+        if not self.mechanism.thread_safe:
+            warnings.warn('Parallel learner updates require a mechanism without mutable state across calls '
+                          '(e.g. core solver warm starts). Updating sequentially.')
+            return
+
+        n_threads = min(self.hardware.max_cpu_threads or os.cpu_count(), os.cpu_count())
+        thread_budget = max(1, n_threads // len(self.learners))
+        self._learner_pool = ThreadPoolExecutor(
+            max_workers=len(self.learners),
+            initializer=torch.set_num_threads, initargs=(thread_budget,))
+
     def pretrain_transform(self, player_position: int) -> callable:
         """Some experiments need specific pretraining transformations. In
         most cases, pretraining to the truthful bid (i.e. the identity function)
@@ -269,20 +302,34 @@ class Experiment(ABC):
         Sets up an environment used for evaluation of learning agents (e.g.) vs known BNE"""
         raise NotImplementedError("This Experiment has no implemented BNE. No eval env was created.")
 
-    def _setup_learning_environment(self):
+    def _setup_learning_environment(self, batch_size: int = None):
+        self._close_prefetching_sampler()
+        batch_size = batch_size or self.learning.batch_size
+
+        sampler = self.sampler
+        if self.learning.redraw_every_iteration and self.learning.prefetch_batches > 0:
+            # draw the valuations of the next iterations in the background
+            sampler = PrefetchingSampler(self.sampler, self.learning.prefetch_batches, batch_size)
+
         self.env = AuctionEnvironment(self.mechanism,
                                       agents=self.bidders,
-                                      valuation_observation_sampler=self.sampler,
-                                      batch_size=self.learning.batch_size,
+                                      valuation_observation_sampler=sampler,
+                                      batch_size=batch_size,
                                       n_players=self.n_players,
                                       strategy_to_player_closure=self._strat_to_bidder,
                                       redraw_every_iteration=self.learning.redraw_every_iteration)
 
+    def _close_prefetching_sampler(self):
+        """Stops the background process of the learning environment's sampler, if any."""
+        if self.env is not None and isinstance(self.env.sampler, PrefetchingSampler):
+            self.env.sampler.close()
+
     def _init_new_run(self):
         """Setup everything that is specific to an individual run, including everything nondeterministic"""
         self._setup_bidders()
         self._setup_learning_environment()
         self._setup_learners()
+        self._setup_learner_pool()
         self.epoch = 0
 
         if self.logging.log_metrics['opt'] and hasattr(self, 'bne_env'):
@@ -314,6 +361,8 @@ class Experiment(ABC):
             # self._log_experiment_params()
             logging_utils.save_experiment_config(self.experiment_log_dir, self.config)
             logging_utils.log_git_commit_hash(self.experiment_log_dir)
+            if self.logging.async_evaluation:
+                self._setup_evaluation_worker()
             elapsed = timer() - tic
         else:
             print('\tLogging disabled.')
@@ -377,6 +426,9 @@ class Experiment(ABC):
 
     def _exit_run(self, global_step=None):
         """Cleans up a run after it is completed"""
+        if self._evaluation_worker is not None:
+            self._shutdown_evaluation_worker()
+
         if self.logging.enable_logging:
             self._log_experiment_params(global_step=global_step)
 
@@ -386,6 +438,23 @@ class Experiment(ABC):
         del self.writer  # make this explicit to force cleanup and closing of tb-logfiles
         self.writer = None
 
+        self._release_run_resources()
+
+    def _release_run_resources(self):
+        """Stops the worker threads and processes of a run and frees cached
+        device memory. Used by both individual and ensemble runs."""
+        if self._evaluation_worker is not None:
+            self._shutdown_evaluation_worker()
+
+        if self._learner_pool is not None:
+            self._learner_pool.shutdown()
+            self._learner_pool = None
+
+        self._close_prefetching_sampler()
+
+        # worker pools of parallel strategies and mechanisms are reused within a run
+        shutdown_process_pools()
+
         if self.hardware.cuda:
             torch.cuda.empty_cache()
             torch.cuda.ipc_collect()
@@ -400,10 +469,13 @@ class Experiment(ABC):
         tic = timer()
 
         # update model
-        utilities = torch.tensor([
-            learner.update_strategy_and_evaluate_utility()
-            for learner in self.learners
-        ])
+        if self._learner_pool is not None:
+            utilities = self._update_learners_in_parallel()
+        else:
+            utilities = torch.tensor([
+                learner.update_strategy_and_evaluate_utility()
+                for learner in self.learners
+            ])
 
         time_per_step = timer() - tic
 
@@ -424,8 +496,28 @@ class Experiment(ABC):
 
         return utilities
 
+    def _update_learners_in_parallel(self) -> torch.Tensor:
+        """Updates all learners concurrently on the learner pool.
+
+        All learners share the same iteration of the environment and compute
+        their updates against the same (current) strategy profile. Only after
+        all of them have finished (barrier), the updates are applied, i.e. the
+        players update simultaneously.
+        """
+        with self.env.shared_iteration():
+            # barrier: wait for all updates before changing any model
+            list(self._learner_pool.map(lambda learner: learner.compute_update(), self.learners))
+            for learner in self.learners:
+                learner.apply_update()
+            utilities = list(self._learner_pool.map(lambda learner: learner.evaluate_utility(), self.learners))
+
+        return torch.tensor(utilities)
+
     def run(self) -> bool:
         """Runs the experiment implemented by this class, i.e. all defined runs.
+        If `hardware.parallel_runs` > 1, the runs are distributed over a pool
+        of worker processes. If `hardware.ensemble_runs`, all runs are trained
+        at once as an ensemble (see `_run_ensemble`).
 
         If a run fails for whatever reason, a warning will be raised and the
         next run will be triggered until all runs have completed/failed.
@@ -442,45 +534,15 @@ class Experiment(ABC):
         assert sum(1 for _ in self.running.seeds) == self.running.n_runs, \
             "Number of seeds doesn't match number of runs."
 
-        for run_id, seed in enumerate(self.running.seeds):
-            print(f'\n\nRunning experiment {run_id} (using seed {seed})')
-            try:
-                t = time.strftime('%T ')
-                if platform == 'win32':
-                    t = t.replace(':', '.')
-
-                self.run_log_dir = os.path.join(
-                    self.experiment_log_dir,
-                    f'{run_id:02d} ' + t + str(seed)
-                    )
-
-                torch.random.manual_seed(seed)
-                torch.cuda.manual_seed_all(seed)
-                np.random.seed(seed)
-
-                self._init_new_run()
-
-                if self.logging.enable_logging:
-                    self._plot_current_strategies()
-
-                for _ in range(self.running.n_epochs + 1):
-                    utilities = self._training_loop()
-                    self.epoch += 1
-
-                if self.logging.enable_logging and (
-                        self.logging.export_step_wise_linear_bid_function_size is not None):
-                    bidders = [self.bidders[self._model2bidder[m][0]] for m in range(self.n_models)]
-                    logging_utils.export_stepwise_linear_bid(
-                        experiment_dir=self.run_log_dir, bidders=bidders,
-                        step=self.logging.export_step_wise_linear_bid_function_size)
-            except Exception as e:
-                encountered_errors = True
-                tb = traceback.format_exc()
-                print("\t Error... aborting run.")
-                warnings.warn(f"WARNING: Run {run_id} failed with {type(e)}! Traceback:\n{tb}")
-
-            finally:
-                self._exit_run()
+        ensemble = self.hardware.ensemble_runs and self.running.n_runs > 1
+        if ensemble:
+            encountered_errors = not self._run_ensemble()
+        elif self.hardware.parallel_runs > 1 and self.running.n_runs > 1:
+            encountered_errors = not self._run_in_parallel()
+        else:
+            for run_id, seed in enumerate(self.running.seeds):
+                if not self._run_single(run_id, seed):
+                    encountered_errors = True
 
         # Once all runs are done, convert tb event files to csv
         if self.logging.enable_logging and self.config.running.n_runs > 0 and (
@@ -499,6 +561,202 @@ class Experiment(ABC):
 
         return not encountered_errors
 
+    def _run_single(self, run_id: int, seed: int) -> bool:
+        """Performs a single run of the experiment with the given seed.
+
+        If the run fails for whatever reason, a warning will be raised.
+
+        Returns:
+            success (bool): True if the run completed successfully.
+        """
+        print(f'\n\nRunning experiment {run_id} (using seed {seed})')
+        success = True
+        try:
+            t = time.strftime('%T ')
+            if platform == 'win32':
+                t = t.replace(':', '.')
+
+            self.run_log_dir = os.path.join(
+                self.experiment_log_dir,
+                f'{run_id:02d} ' + t + str(seed)
+                )
+
+            torch.random.manual_seed(seed)
+            torch.cuda.manual_seed_all(seed)
+            np.random.seed(seed)
+
+            self._init_new_run()
+
+            if self.logging.enable_logging:
+                self._plot_current_strategies()
+
+            for _ in range(self.running.n_epochs + 1):
+                utilities = self._training_loop()
+                self.epoch += 1
+
+            if self.logging.enable_logging and (
+                    self.logging.export_step_wise_linear_bid_function_size is not None):
+                bidders = [self.bidders[self._model2bidder[m][0]] for m in range(self.n_models)]
+                logging_utils.export_stepwise_linear_bid(
+                    experiment_dir=self.run_log_dir, bidders=bidders,
+                    step=self.logging.export_step_wise_linear_bid_function_size)
+        except Exception as e:
+            success = False
+            tb = traceback.format_exc()
+            print("\t Error... aborting run.")
+            warnings.warn(f"WARNING: Run {run_id} failed with {type(e)}! Traceback:\n{tb}")
+
+        finally:
+            self._exit_run()
+
+        return success
+
+    def _run_in_parallel(self) -> bool:
+        """Performs all runs in a pool of `hardware.parallel_runs` worker
+        processes. Each worker sets up its own instance of the experiment and
+        gets an equal share of `hardware.max_cpu_threads`.
+
+        Returns:
+            success (bool): True if all runs ran successfully, false otherwise.
+        """
+        n_workers = min(self.hardware.parallel_runs, self.running.n_runs)
+        n_threads = min(self.hardware.max_cpu_threads or os.cpu_count(), os.cpu_count())
+        thread_budget = max(1, n_threads // n_workers)
+        print(f'\n\nRunning {self.running.n_runs} runs in {n_workers} parallel processes')
+
+        success = True
+        # cuda (and torch's thread pools) can't be used in forked processes
+        with ProcessPoolExecutor(max_workers=n_workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            futures = [
+                pool.submit(_run_in_worker_process, type(self), self.config, run_id, seed, thread_budget)
+                for run_id, seed in enumerate(self.running.seeds)]
+            for run_id, future in enumerate(futures):
+                try:
+                    success = future.result() and success
+                except Exception as e:
+                    success = False
+                    tb = traceback.format_exc()
+                    warnings.warn(f"WARNING: Run {run_id} failed with {type(e)}! Traceback:\n{tb}")
+
+        return success
+
+    def _init_new_ensemble_run(self):
+        """Sets up the models of all runs, each seeded individually, and stacks
+        them into one `EnsembleStrategy` per model. These are played by bidders
+        in a single learning environment of n_runs times the batch size, in
+        which each run plays its own part of the batch.
+        """
+        if self.learning.learner_type not in ['ESPGLearner', 'PGLearner']:
+            raise ValueError(f'Ensemble runs are not supported by {self.learning.learner_type}.')
+
+        # ensemble_models[run_id][model_id]
+        self.ensemble_models = []
+        for seed in self.running.seeds:
+            torch.random.manual_seed(seed)
+            torch.cuda.manual_seed_all(seed)
+            np.random.seed(seed)
+            self._setup_bidders()
+            self.ensemble_models.append(self.models)
+
+        self.models = [EnsembleStrategy([models[m_id] for models in self.ensemble_models])
+                       for m_id in range(self.n_models)]
+        batch_size = self.running.n_runs * self.learning.batch_size
+        self.bidders = [
+            self._strat_to_bidder(strategy=self.models[m_id], batch_size=batch_size, player_position=i)
+            for i, m_id in enumerate(self._bidder2model)]
+
+        self._setup_learning_environment(batch_size)
+        self._setup_learners()
+        self.epoch = 0
+
+    def _evaluate_ensemble_utilities(self) -> torch.Tensor:
+        """Returns the current utilities of each model in each run of the
+        ensemble, shape: n_models x n_runs."""
+        return torch.stack([
+            model.aggregate_by_member(self.env.get_strategy_reward(
+                model, aggregate_batch=False, smooth_market=learner.smooth_market,
+                **learner.strat_to_player_kwargs).detach())
+            for model, learner in zip(self.models, self.learners)])
+
+    def _run_ensemble(self) -> bool:
+        """Performs all runs at once: The models of all runs are trained as
+        stacked ensembles, such that each iteration requires only a single
+        (batched) forward pass and mechanism call per evaluation for all runs.
+
+        The utilities of the last epoch are stored for each model and run in
+        `self.ensemble_utilities` (n_models x n_runs), the trained models of
+        each run in `self.ensemble_models` (n_runs x n_models). If logging is
+        enabled, the utilities and step times of each run are logged to its own
+        run directory (see `_initialize_ensemble_logging`), s.t. ensemble runs
+        are tabulated like individual runs.
+
+        NOTE: Evaluation metrics (e.g. util loss or vs. the BNE) are not
+        available for ensemble runs.
+
+        Returns:
+            success (bool): True if the runs completed successfully.
+        """
+        print(f'\n\nRunning {self.running.n_runs} runs as ensemble (using seeds {list(self.running.seeds)})')
+
+        success = True
+        writers = []
+        try:
+            self._init_new_ensemble_run()
+            if self.logging.enable_logging:
+                writers = self._initialize_ensemble_logging()
+
+            for _ in range(self.running.n_epochs + 1):
+                tic = timer()
+                for learner in self.learners:
+                    learner.update_strategy()
+                self.ensemble_utilities = self._evaluate_ensemble_utilities()
+                time_per_step = timer() - tic
+                for run_id, writer in enumerate(writers):
+                    writer.add_metrics_dict(
+                        {'utilities': self.ensemble_utilities[:, run_id], 'time_per_step': time_per_step},
+                        self._model_names, self.epoch, metric_tag_mapping=metrics.MAPPING_METRICS_TAGS)
+                print('epoch {}:\telapsed {:.2f}s'.format(self.epoch, time_per_step), end="\r")
+                self.epoch += 1
+
+            for model in self.models:
+                model.update_members()
+            print(f'\nUtilities per run: {self.ensemble_utilities.t().tolist()}')
+
+            if self.logging.enable_logging and self.logging.save_models:
+                for writer, models in zip(writers, self.ensemble_models):
+                    for model, player_position in zip(models, self._model2bidder):
+                        torch.save(model.state_dict(), os.path.join(
+                            writer.log_dir, 'models', 'model_' + str(player_position[0]) + '.pt'))
+        except Exception as e:
+            success = False
+            tb = traceback.format_exc()
+            print("\t Error... aborting runs.")
+            warnings.warn(f"WARNING: Ensemble runs failed with {type(e)}! Traceback:\n{tb}")
+
+        finally:
+            for writer in writers:
+                writer.close()
+            self.writer = None
+            self._release_run_resources()
+
+        return success
+
+    def _initialize_ensemble_logging(self) -> list:
+        """Creates the usual log directory of each run of the ensemble and
+        returns one summary writer per run."""
+        t = time.strftime('%T ')
+        if platform == 'win32':
+            t = t.replace(':', '.')
+
+        writers = []
+        for run_id, seed in enumerate(self.running.seeds):
+            self.run_log_dir = os.path.join(self.experiment_log_dir, f'{run_id:02d} ' + t + str(seed))
+            self._initialize_logging()
+            writers.append(self.writer)
+        logging_utils.save_experiment_config(self.experiment_log_dir, self.config)
+        logging_utils.log_git_commit_hash(self.experiment_log_dir)
+        return writers
+
 
 
     ########################################################################################################
@@ -720,38 +978,18 @@ class Experiment(ABC):
         ]
         del self._cur_epoch_log_params['prev_params']
 
+        # write results of evaluations that finished in the meantime
+        if self._evaluation_worker is not None:
+            self._collect_evaluations()
+
         # logging metrics
         # TODO: should just check if logging is enabled in general... if bne_exists and we log, we always want this
         if (self.epoch % self.logging.eval_frequency) == 0:
-            if self.known_bne and self.logging.log_metrics['opt']:
-                utility_vs_bne, epsilon_relative, epsilon_absolute = self._calculate_metrics_known_bne()
-                L_2, L_inf = self._calculate_metrics_action_space_norms()
-                for i in range(len(self.bne_env)):
-                    n = '_bne' + str(i + 1) if len(self.bne_env) > 1 else ''
-                    self._cur_epoch_log_params['utility_vs_bne' + (n if n == '' else n[4:])] \
-                        = utility_vs_bne[i]
-                    self._cur_epoch_log_params['epsilon_relative' + n] = epsilon_relative[i]
-                    self._cur_epoch_log_params['epsilon_absolute' + n] = epsilon_absolute[i]
-                    self._cur_epoch_log_params['L_2' + n] = L_2[i]
-                    self._cur_epoch_log_params['L_inf' + n] = L_inf[i]
-
-            if self.epoch > 0 and self.logging.log_metrics['util_loss']:
-                create_plot_output = self.epoch % self.logging.plot_frequency == 0
-                self._cur_epoch_log_params['util_loss_ex_ante'], \
-                self._cur_epoch_log_params['util_loss_ex_interim'], \
-                self._cur_epoch_log_params['estimated_relative_ex_ante_util_loss'] = \
-                    self._calculate_metrics_util_loss(create_plot_output)
-
-                print("\tcurrent est. ex-interim loss:" + str(
-                    [f"{l.item():.4f}" for l in self._cur_epoch_log_params['util_loss_ex_interim']]))
-
-            if self.logging.log_metrics['efficiency']:
-                self._cur_epoch_log_params['efficiency'] = \
-                    self.env.get_efficiency(self.env)
-
-            if self.logging.log_metrics['revenue']:
-                self._cur_epoch_log_params['revenue'] = \
-                    self.env.get_revenue(self.env)
+            if self._evaluation_worker is not None:
+                self._submit_evaluation()
+            else:
+                self._cur_epoch_log_params.update(self._calculate_evaluation_metrics(
+                    create_plot_output=self.epoch % self.logging.plot_frequency == 0))
 
             self._cur_epoch_log_params['utility_variance'] = [
                 self.env.get_reward(
@@ -785,9 +1023,116 @@ class Experiment(ABC):
                 group_prefix=None, metric_tag_mapping = metrics.MAPPING_METRICS_TAGS)
         return timer() - start_time
 
+    def _calculate_evaluation_metrics(self, create_plot_output: bool = False) -> dict:
+        """Calculates the (expensive) evaluation metrics of the current
+        strategies: comparisons to the BNE, util losses, efficiency and revenue.
+
+        Returns:
+            dict of metrics as in `_cur_epoch_log_params`.
+        """
+        log_params = {}
+
+        if self.known_bne and self.logging.log_metrics['opt']:
+            utility_vs_bne, utility_vs_bne_ci, epsilon_relative, epsilon_absolute = \
+                self._calculate_metrics_known_bne()
+            L_2, L_inf = self._calculate_metrics_action_space_norms()
+            for i in range(len(self.bne_env)):
+                n = '_bne' + str(i + 1) if len(self.bne_env) > 1 else ''
+                log_params['utility_vs_bne' + (n if n == '' else n[4:])] = utility_vs_bne[i]
+                log_params['epsilon_relative' + n] = epsilon_relative[i]
+                log_params['epsilon_absolute' + n] = epsilon_absolute[i]
+                if utility_vs_bne_ci[i] is not None:
+                    # the BNE utilities are known, s.t. the errors only stem from the estimates
+                    log_params['utility_vs_bne_ci' + n] = utility_vs_bne_ci[i]
+                    log_params['epsilon_relative_ci' + n] = utility_vs_bne_ci[i] / \
+                        torch.tensor([self.bne_utilities[i][b[0]] for b in self._model2bidder]).abs()
+                    log_params['epsilon_absolute_ci' + n] = utility_vs_bne_ci[i]
+                log_params['L_2' + n] = L_2[i]
+                log_params['L_inf' + n] = L_inf[i]
+
+        if self.epoch > 0 and self.logging.log_metrics['util_loss']:
+            log_params['util_loss_ex_ante'], \
+            log_params['util_loss_ex_interim'], \
+            log_params['estimated_relative_ex_ante_util_loss'], \
+            util_loss_ex_ante_ci, util_loss_ex_interim_ci = \
+                self._calculate_metrics_util_loss(create_plot_output)
+            if self.logging.util_loss_tolerance is not None:
+                log_params['util_loss_ex_ante_ci'] = util_loss_ex_ante_ci
+                log_params['util_loss_ex_interim_ci'] = util_loss_ex_interim_ci
+
+            print("\tcurrent est. ex-interim loss:" + str(
+                [f"{l.item():.4f}" for l in log_params['util_loss_ex_interim']]))
+
+        if self.logging.log_metrics['efficiency']:
+            log_params['efficiency'] = self.env.get_efficiency(self.env)
+
+        if self.logging.log_metrics['revenue']:
+            log_params['revenue'] = self.env.get_revenue(self.env)
+
+        return log_params
+
+    def _setup_evaluation_worker(self):
+        """Starts a worker process that calculates the evaluation metrics
+        asynchronously (see `LoggingConfig.async_evaluation`). The worker sets
+        up its own copy of the experiment, into which it loads snapshots of
+        the models."""
+        n_threads = min(self.hardware.max_cpu_threads or os.cpu_count(), os.cpu_count())
+        self._evaluation_worker = ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_evaluation_worker,
+            initargs=(type(self), self.config, max(1, n_threads // 2)))
+        self._pending_evaluations = deque()
+        self._latest_evaluation = None
+
+    def _submit_evaluation(self):
+        """Submits a snapshot of the current models for evaluation. If
+        `logging.async_evaluation_max_pending` evaluations are pending already,
+        waits for the oldest one first (backpressure)."""
+        while len(self._pending_evaluations) >= max(1, self.logging.async_evaluation_max_pending):
+            self._collect_evaluations(n_wait=1)
+
+        state_dicts = [
+            {k: v.detach().cpu().clone() for k, v in model.state_dict().items()}
+            for model in self.models]
+        future = self._evaluation_worker.submit(_evaluate_in_worker, self.epoch, state_dicts)
+        self._pending_evaluations.append((self.epoch, future))
+
+    def _collect_evaluations(self, n_wait: int = 0):
+        """Writes the results of finished evaluations, in order of their
+        epochs. Waits for (at least) the `n_wait` oldest ones to finish."""
+        while self._pending_evaluations and (n_wait > 0 or self._pending_evaluations[0][1].done()):
+            epoch, future = self._pending_evaluations.popleft()
+            n_wait -= 1
+            try:
+                log_params = future.result()
+            except Exception as e:  # pylint: disable=broad-except
+                warnings.warn(f"Evaluation of epoch {epoch} failed with {type(e)}: {e}")
+                continue
+
+            self._latest_evaluation = log_params
+            if self.writer:
+                self.writer.add_metrics_dict(
+                    log_params, self._model_names, epoch,
+                    group_prefix=None, metric_tag_mapping=metrics.MAPPING_METRICS_TAGS)
+
+    def _shutdown_evaluation_worker(self):
+        """Waits for all pending evaluations, writes their results and stops
+        the worker."""
+        self._collect_evaluations(n_wait=len(self._pending_evaluations))
+        self._evaluation_worker.shutdown()
+        self._evaluation_worker = None
+
+        # the final metrics are logged as hyperparameters at the end of the run
+        if self._latest_evaluation is not None:
+            self._cur_epoch_log_params.update(self._latest_evaluation)
+
     def _calculate_metrics_known_bne(self):
         """Compare performance to BNE and return:
             utility_vs_bne: List[Tensor] of length `len(self.bne_env)`, length of Tensor `n_models`.
+            utility_vs_bne_ci: List of length `len(self.bne_env)` of Tensors
+                of length `n_models` with the half-widths of the confidence
+                intervals of `utility_vs_bne`, if these are estimated
+                sequentially (see `logging.eval_tolerance`), else of Nones.
             epsilon_relative: List[Tensor] of length `len(self.bne_env)`, length of Tensor `n_models`.
             epsilon_absolute: List[Tensor] of length `len(self.bne_env)`, length of Tensor `n_models`.
 
@@ -798,6 +1143,7 @@ class Experiment(ABC):
         m2b = lambda m: self._model2bidder[m][0]
 
         utility_vs_bne = [None] * len(self.bne_env)
+        utility_vs_bne_ci = [None] * len(self.bne_env)
         epsilon_relative = [None] * len(self.bne_env)
         epsilon_absolute = [None] * len(self.bne_env)
 
@@ -807,13 +1153,25 @@ class Experiment(ABC):
             # TODO Stefan: this seems to be false in most settings, even when not desired.
             redraw_bne_vals = not self.logging.cache_eval_actions
             # length: n_models
-            utility_vs_bne[bne_idx] = torch.tensor([
-                bne_env.get_strategy_reward(
-                    strategy=model,
-                    player_position=m2b(m),
-                    redraw_valuations=redraw_bne_vals,
-                ) for m, model in enumerate(self.models)
-            ])
+            if self.logging.eval_tolerance is not None:
+                # draw fresh chunks of games until the estimates are precise enough
+                estimates = [
+                    metrics.sequential_strategy_reward(
+                        bne_env, strategy=model, player_position=m2b(m),
+                        tolerance=self.logging.eval_tolerance,
+                        chunk_size=self.logging.eval_chunk_size
+                    ) for m, model in enumerate(self.models)
+                ]
+                utility_vs_bne[bne_idx] = torch.tensor([e[0] for e in estimates])
+                utility_vs_bne_ci[bne_idx] = torch.tensor([e[1] for e in estimates])
+            else:
+                utility_vs_bne[bne_idx] = torch.tensor([
+                    bne_env.get_strategy_reward(
+                        strategy=model,
+                        player_position=m2b(m),
+                        redraw_valuations=redraw_bne_vals,
+                    ) for m, model in enumerate(self.models)
+                ])
             epsilon_relative[bne_idx] = torch.tensor(
                 [1 - utility_vs_bne[bne_idx][i] / self.bne_utilities[bne_idx][m2b(i)]
                  for i, model in enumerate(self.models)]
@@ -823,7 +1181,7 @@ class Experiment(ABC):
                  for i, model in enumerate(self.models)]
             )
 
-        return utility_vs_bne, epsilon_relative, epsilon_absolute
+        return utility_vs_bne, utility_vs_bne_ci, epsilon_relative, epsilon_absolute
 
     def _calculate_metrics_action_space_norms(self):
         """Calculate "action space distance" of model and bne-strategy. If
@@ -876,6 +1234,12 @@ class Experiment(ABC):
         Returns:
             ex_ante_util_loss: List[torch.tensor] of length self.n_models
             ex_interim_max_util_loss: List[torch.tensor] of length self.n_models
+            estimated_relative_ex_ante_util_loss: List[float] of length self.n_models
+            ex_ante_util_loss_ci: List[torch.tensor] of length self.n_models,
+                half-widths of the confidence intervals of the ex ante util
+                losses (zero unless `logging.util_loss_tolerance` is given)
+            ex_interim_max_util_loss_ci: List[torch.tensor] of length
+                self.n_models, likewise for the ex interim util losses
         """
 
         env = self.env
@@ -892,13 +1256,20 @@ class Experiment(ABC):
         with torch.no_grad():  # don't need any gradient information here
             # TODO: currently we don't know where exactly a memory leak is            
             _, observations = env.sampler.draw_profiles(batch_sizes=[batch_size])
-            util_losses, best_responses = zip(*[
+            util_losses, best_responses, util_loss_cis = zip(*[
                 metrics.ex_interim_util_loss(
                     env=env,
                     player_position=player_positions[0],
                     agent_observations=observations[:, player_positions[0], :],
                     grid_size=grid_size,
-                    opponent_batch_size=opponent_batch_size
+                    opponent_batch_size=opponent_batch_size,
+                    memory_budget=self.logging.util_loss_memory_budget,
+                    n_threads=self.logging.util_loss_n_threads,
+                    refinement_rounds=self.logging.util_loss_refinement_rounds,
+                    refinement_top_k=self.logging.util_loss_refinement_top_k,
+                    polishing_steps=self.logging.util_loss_polishing_steps,
+                    tolerance=self.logging.util_loss_tolerance,
+                    return_ci=True
                 )
                 for player_positions in self._model2bidder
             ])
@@ -923,6 +1294,9 @@ class Experiment(ABC):
         # calculate different losses
         ex_ante_util_loss = [util_loss_model.mean() for util_loss_model in util_losses]
         ex_interim_max_util_loss = [util_loss_model.max() for util_loss_model in util_losses]
+        # the per observation estimates are independent
+        ex_ante_util_loss_ci = [ci.pow(2).sum().sqrt() / ci.numel() for ci in util_loss_cis]
+        ex_interim_max_util_loss_ci = [ci[l.argmax()] for l, ci in zip(util_losses, util_loss_cis)]
         estimated_relative_ex_ante_util_loss = [
             (1 - u / (u + l)).item()
             for u, l in zip(
@@ -948,7 +1322,8 @@ class Experiment(ABC):
                        figure_name='util_loss_landscape', y_label='ex-interim loss',
                        labels=labels, fmts=fmts, plot_points=self.plot_points)
 
-        return ex_ante_util_loss, ex_interim_max_util_loss, estimated_relative_ex_ante_util_loss
+        return ex_ante_util_loss, ex_interim_max_util_loss, estimated_relative_ex_ante_util_loss, \
+            ex_ante_util_loss_ci, ex_interim_max_util_loss_ci
 
     def _calculate_metrics_gradient_variance(self):
         return [l.gradient_variance for l in self.learners]
@@ -1000,3 +1375,57 @@ class Experiment(ABC):
         for model, player_position in zip(self.models, self._model2bidder):
             name = 'model_' + str(player_position[0]) + '.pt'
             torch.save(model.state_dict(), os.path.join(directory, 'models', name))
+
+
+def _run_in_worker_process(experiment_class: type, config: ExperimentConfig, run_id: int, seed: int,
+                           n_threads: int) -> bool:
+    """Performs a single run of an experiment in a worker process of `Experiment.run`.
+
+    Returns:
+        success (bool): True if the run completed successfully.
+    """
+    torch.set_num_threads(n_threads)
+    if config.hardware.cuda and config.hardware.specific_gpu is not None:
+        torch.cuda.set_device(config.hardware.specific_gpu)
+
+    experiment: Experiment = experiment_class(config)
+    return experiment._run_single(run_id, seed)  # pylint: disable=protected-access
+
+
+_evaluation_experiment: Experiment = None
+
+def _init_evaluation_worker(experiment_class: type, config: ExperimentConfig, n_threads: int):
+    """Sets up the copy of the experiment in the evaluation worker process of
+    `Experiment._setup_evaluation_worker`, which doesn't log on its own."""
+    global _evaluation_experiment  # pylint: disable=global-statement
+    torch.set_num_threads(n_threads)
+    if config.hardware.cuda and config.hardware.specific_gpu is not None:
+        torch.cuda.set_device(config.hardware.specific_gpu)
+
+    config.logging.enable_logging = False
+    config.logging.async_evaluation = False
+    config.logging.best_response = False
+    config.hardware.parallel_learner_updates = False
+    config.learning.prefetch_batches = 0
+
+    _evaluation_experiment = experiment_class(config)
+    _evaluation_experiment._init_new_run()  # pylint: disable=protected-access
+
+def _evaluate_in_worker(epoch: int, state_dicts: List[dict]) -> dict:
+    """Calculates the evaluation metrics of a snapshot of the models in the
+    evaluation worker process.
+
+    Returns:
+        dict of metrics as in `Experiment._cur_epoch_log_params` (on CPU).
+    """
+    experiment = _evaluation_experiment
+    for model, state_dict in zip(experiment.models, state_dicts):
+        model.load_state_dict(state_dict)
+    experiment.epoch = epoch
+
+    with torch.no_grad():
+        log_params = experiment._calculate_evaluation_metrics()  # pylint: disable=protected-access
+
+    to_cpu = lambda v: v.cpu() if isinstance(v, torch.Tensor) else v
+    return {k: [to_cpu(x) for x in v] if isinstance(v, (list, tuple)) else to_cpu(v)
+            for k, v in log_params.items()}
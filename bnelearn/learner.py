@@ -5,7 +5,7 @@ from copy import deepcopy
 
 import math
 from abc import ABC, abstractmethod
-from typing import Tuple, Type, Callable
+from typing import List, Tuple, Type, Callable
 from time import perf_counter as timer
 
 import sympy.ntheory as sympy
@@ -13,7 +13,7 @@ import torch
 from torch.nn.utils import parameters_to_vector, vector_to_parameters
 
 from bnelearn.environment import Environment
-from bnelearn.strategy import Strategy, NeuralNetStrategy
+from bnelearn.strategy import Strategy, NeuralNetStrategy, EnsembleStrategy
 import bnelearn.util.autograd_hacks as autograd_hacks
 
 
@@ -87,23 +87,42 @@ class GradientBasedLearner(Learner):
 
         Returns: None or loss evaluated by closure. (See above.)
         """
+        self.compute_update()
+        return self.apply_update(closure)
+
+    def compute_update(self):
+        """Computes the (pseudo-)gradients of the next model-update without
+        changing the model itself.
+
+        Together with `apply_update`, this allows several learners to compute
+        their updates against the same strategy profile (e.g. concurrently)
+        before any of them changes its strategy.
+        """
         self.optimizer.zero_grad()
         self._set_gradients()
+
+    def apply_update(self, closure: Callable=None) -> torch.Tensor or None:
+        """Applies the model-update previously computed by `compute_update`.
+        See `update_strategy` for the closure."""
         step = self.optimizer.step(closure=closure)
         if self.scheduler is not None:
             reward = self.environment.get_strategy_reward(self.model, **self.strat_to_player_kwargs).detach()
             self.scheduler.step(reward)
         return step
 
-    def update_strategy_and_evaluate_utility(self, closure = None):
-        """updates model and returns utility after the update."""
-
-        self.update_strategy(closure)
+    def evaluate_utility(self) -> torch.Tensor:
+        """Returns the utility of the current model."""
         return self.environment.get_strategy_reward(
             self.model, smooth_market=self.smooth_market,
             **self.strat_to_player_kwargs
         ).detach()
 
+    def update_strategy_and_evaluate_utility(self, closure = None):
+        """updates model and returns utility after the update."""
+
+        self.update_strategy(closure)
+        return self.evaluate_utility()
+
     def _calculate_gradient_variance(self):
         """Calculate gradient variances"""
         autograd_hacks.compute_grad1(self.model)
@@ -129,6 +148,11 @@ class ESPGLearner(GradientBasedLearner):
     over a population of models perturbed by parameter noise epsilon yielding
     perturbed rewards.
 
+    If the model is an `EnsembleStrategy`, rewards, baselines and
+    normalization are computed separately for each member, such that each
+    member receives the same gradient estimate as if it was trained on its
+    own. (Logging the gradient variance is not supported in this case.)
+
     Arguments:
         model: bnelearn.bidder
         environment: bnelearn.Environment
@@ -164,6 +188,16 @@ class ESPGLearner(GradientBasedLearner):
                 symmetric_sampling: bool
                     whether or not we sample symmetric pairs of perturbed parameters, e.g.
                     p + eps and p - eps.
+                vectorize_population: bool (default: False)
+                    If true, the whole population is evaluated in a single stacked
+                    forward pass over a (population_size x n_parameters) tensor of
+                    perturbed parameters and played in a single mechanism call with
+                    the population as additional batch dimension. Requires a
+                    `NeuralNetStrategy` model and population_size times the memory.
+                noise_table_size: int (default: max(2**20, 16 * n_parameters))
+                    Size of the preallocated table of standard normal noise that
+                    is shared by all perturbations. A perturbation is given by a
+                    random offset into this table.
         optimizer_type: Type[torch.optim.Optimizer]
             A class implementing torch's optimizer interface used for parameter update step.
         strat_to_player_kwargs: dict
@@ -182,12 +216,17 @@ class ESPGLearner(GradientBasedLearner):
             # one is invalid because there will be zero variance, leading to div by 0 errors
             raise ValueError('Please provide a valid `population_size` parameter >=2')
 
+        # members of an ensemble are rewarded separately
+        self.n_members = self.model.n_members if isinstance(self.model, EnsembleStrategy) else None
+        if self.n_members and self.log_gradient_variance:
+            raise ValueError('Logging the gradient variance is not supported for ensembles.')
+
         # set hyperparams
         self.population_size = hyperparams['population_size']
         self.sigma = float(hyperparams['sigma'])
         self.sigma_base = self.sigma
         if hyperparams['scale_sigma_by_model_size']:
-            self.sigma = self.sigma / self.n_parameters
+            self.sigma = self.sigma / (self.n_parameters // (self.n_members or 1))
 
         if 'normalize_gradients' in hyperparams and hyperparams['normalize_gradients']:
             self.normalize_gradients = True
@@ -216,6 +255,30 @@ class ESPGLearner(GradientBasedLearner):
         else:
             self.symmetric_sampling = False
 
+        if 'vectorize_population' in hyperparams and hyperparams['vectorize_population']:
+            if not isinstance(self.model, (NeuralNetStrategy, EnsembleStrategy)):
+                raise ValueError('Vectorized population evaluation requires a NeuralNetStrategy.')
+            self.vectorize_population = True
+        else:
+            self.vectorize_population = False
+
+        if 'noise_table_size' in hyperparams:
+            self.noise_table_size = int(hyperparams['noise_table_size'])
+        else:
+            self.noise_table_size = max(2**20, 16 * self.n_parameters)
+        if self.noise_table_size < self.n_parameters:
+            raise ValueError('The noise table must be at least as large as the model.')
+        # allocated lazily on the device of the model
+        self._noise_table: torch.Tensor = None
+
+        # candidates are evaluated by a single copy of the model whose
+        # parameters are views into one flat buffer that is perturbed in place
+        self._candidate_model = deepcopy(self.model)
+        for param in self._candidate_model.parameters():
+            param.requires_grad = False
+        self._candidate_params = parameters_to_vector(self._candidate_model.parameters()).clone()
+        vector_to_parameters(self._candidate_params, self._candidate_model.parameters())
+
     def _set_gradients(self):
         """Calculates ES-pseudogradients and applies them to the model parameter
            gradient data.
@@ -231,103 +294,66 @@ class ESPGLearner(GradientBasedLearner):
             direction as the gradient and has length (slightly smaller than) 1.
             Furthermore, the gradient samples will have low variance
             Note that for large sigma, this grad becomes smaller tha
+
+            Perturbations are given by offsets into a shared noise table and
+            signs, i.e. epsilon_i = sign_i * sigma * noise_table[offset_i: offset_i + n_parameters],
+            such that epsilons never have to be stored.
         """
 
         ### 1. if required redraw valuations / perform random moves (determined by env)
         self.environment.prepare_iteration()
 
         ### 2. Create a population of perturbations of the original model
-        if not self.symmetric_sampling:
-            population = (self._perturb_model(self.model) for _ in range(self.population_size))
-        else:
-            mid = int(self.population_size / 2.)
-            population = [self._perturb_model(self.model) for _ in range(mid)]
-            sym_pop = [
-                self._perturb_model(self.model, -e)
-                for _, e in population
-            ]
-            population += sym_pop
+        offsets, signs = self._sample_perturbations()
 
         ### 3. let each candidate against the environment and get their utils ###
-        # both of these as a row-matrix. i.e.
-        # rewards: population_size x 1
-        # epsilons: population_size x parameter_length
+        # rewards: population_size (or batch_size x population_size if we log the gradient variance,
+        # or n_members x population_size for ensembles)
         self.regularize *= self.regularize_decay
 
-        if not self.log_gradient_variance:
-            rewards, epsilons = (
-                torch.cat(tensors).view(self.population_size, -1)
-                for tensors in zip(*(
-                    (
-                        self.environment.get_strategy_reward(
-                            model, **self.strat_to_player_kwargs, regularize=self.regularize
-                        ).detach().view(1),
-                        epsilon
-                    )
-                    for (model, epsilon) in population
-                    ))
-            )
-            ### 4. calculate the ES-pseuogradients   ####
-            # See ES_Analysis notebook in repository for more information about where
-            # these choices come from.
-            if self.baseline == 'current_reward':
-                baseline = self.environment.get_strategy_reward(
-                    self.model, regularize=self.regularize,
-                    **self.strat_to_player_kwargs
-                ).detach().view(1)
-            elif self.baseline == 'mean_reward':
-                baseline = rewards.mean(dim=0)
-            else: # baseline is a float
-                baseline = self.baseline
+        if self.vectorize_population:
+            rewards = self._evaluate_vectorized_population(offsets, signs)
+        else:
+            rewards = self._evaluate_population(offsets, signs)
+
+        ### 4. calculate the ES-pseuogradients   ####
+        # See ES_Analysis notebook in repository for more information about where
+        # these choices come from.
+        if self.baseline == 'current_reward':
+            baseline = self._reward(self.model, aggregate_batch=not self.log_gradient_variance)
+            if self.log_gradient_variance or self.n_members:
+                baseline = baseline.view(-1, 1)
+        elif self.baseline == 'mean_reward':
+            baseline = rewards.mean(dim=-1, keepdim=True) if self.n_members else rewards.mean(dim=0)
+        else: # baseline is a float
+            baseline = self.baseline
 
-            denominator = self.sigma * rewards.std() if self.normalize_gradients else self.sigma**2
+        if self.normalize_gradients:
+            denominator = self.sigma * (rewards.std(dim=-1, keepdim=True) if self.n_members else rewards.std())
+        else:
+            denominator = self.sigma**2
 
-            if denominator == 0:
-                # all candidates returned same reward and normalize is true --> stationary
-                gradient_vector = torch.zeros_like(parameters_to_vector(self.params()))
-            else:
-                gradient_vector = ((rewards - baseline)*epsilons).mean(dim=0) / denominator
+        # weights of the noise vectors, such that a (single sample) gradient
+        # is given by sum_i(weight_i * noise_i)
+        weights = (rewards - baseline) * signs * self.sigma / self.population_size / denominator
+        if self.normalize_gradients:
+            # all candidates returned same reward and normalize is true --> stationary
+            weights = weights.masked_fill(denominator == 0, 0.)
 
+        if self.n_members:
+            gradient_vector = self._weighted_noise_sum(offsets, weights.t())
+        elif not self.log_gradient_variance:
+            gradient_vector = self._weighted_noise_sum(offsets, weights)
         else:
-            rewards = torch.zeros((self.environment.batch_size, self.population_size, 1), device=next(self.model.parameters()).device)
-            epsilons = torch.zeros((1, self.population_size, parameters_to_vector(self.model.parameters()).shape[0]), device=next(self.model.parameters()).device)
-            for i, (model, epsilon) in enumerate(population):
-                rewards[:, i, 0] = self.environment.get_strategy_reward(
-                        model, **self.strat_to_player_kwargs,
-                        regularize=self.regularize,
-                        aggregate_batch=False
-                    ).detach()
-                epsilons[0, i, :] = epsilon
-
-            ### 4. calculate the ES-pseuogradients   ####
-            # See ES_Analysis notebook in repository for more information about where
-            # these choices come from.
-            if self.baseline == 'current_reward':
-                baseline = self.environment.get_strategy_reward(
-                    self.model, regularize=self.regularize,
-                    **self.strat_to_player_kwargs,
-                    aggregate_batch=False
-                ).detach().view(self.environment.batch_size, 1, 1)
-            elif self.baseline == 'mean_reward':
-                baseline = rewards.mean(dim=0)
-            else: # baseline is a float
-                baseline = self.baseline
-
-            denominator = self.sigma * rewards.std() if self.normalize_gradients else self.sigma**2
-
-            if denominator == 0:
-                # all candidates returned same reward and normalize is true --> stationary
-                gradient_vector = torch.zeros_like(parameters_to_vector(self.params()))
-            else:
-                single_sample_gradients = ((rewards - baseline)*epsilons).mean(dim=1) / denominator
-                gradient_vector = single_sample_gradients.mean(dim=0)
-
-                # Calculate (empirical) variance (sum of component-wise variances)
-                self.gradient_variance = single_sample_gradients.var(dim=0, unbiased=True).sum()
+            gradient_vector = self._weighted_noise_sum(offsets, weights.mean(dim=0))
 
-        # put gradient vector into same format as model parameters
-        gradient_params = deepcopy(list(self.params()))
-        vector_to_parameters(gradient_vector, gradient_params)
+            # Calculate (empirical) variance (sum of component-wise variances)
+            # of the single sample gradients via the Gram matrix of the noise
+            # vectors rather than materializing a batch_size x n_parameters tensor.
+            centered_weights = weights - weights.mean(dim=0)
+            self.gradient_variance = \
+                (centered_weights.mm(self._noise_gram_matrix(offsets)) * centered_weights).sum() \
+                / (self.environment.batch_size - 1)
 
         ### 5. assign gradients to model gradient ####
         # We actually _add_ to existing gradient (as common in pytorch), to make it
@@ -337,30 +363,115 @@ class ESPGLearner(GradientBasedLearner):
 
         # NOTE: torch.otpimizers minimize but we use a maximization formulation
         # in the rewards, thus we need to use the negative gradient here.
-
-        for p, d_p in zip(self.params(), gradient_params):
+        pointer = 0
+        for p in self.params():
+            d_p = gradient_vector[pointer:pointer + p.numel()].view_as(p)
+            pointer += p.numel()
             if p.grad is not None:
                 p.grad.add_(-d_p)
             else:
                 p.grad = -d_p
-                
+
         # Decay of regularization
         self.regularize *= self.regularize_decay
 
-    def _perturb_model(self, model: torch.nn.Module, noise: torch.Tensor = None) -> Tuple[torch.nn.Module, torch.Tensor]:
+    def _sample_perturbations(self) -> Tuple[List[int], torch.Tensor]:
+        """Samples the population's perturbations as offsets into the shared
+        noise table and their signs (which are all positive unless we use
+        symmetric sampling)."""
+        device = self._candidate_params.device
+        dtype = self._candidate_params.dtype
+        if self._noise_table is None or self._noise_table.device != device:
+            self._noise_table = torch.randn(self.noise_table_size, device=device, dtype=dtype)
+
+        n_samples = int(self.population_size / 2.) if self.symmetric_sampling else self.population_size
+        offsets = torch.randint(0, self.noise_table_size - self.n_parameters + 1, (n_samples,)).tolist()
+        signs = torch.ones(self.population_size, device=device, dtype=dtype)
+        if self.symmetric_sampling:
+            offsets += offsets
+            signs[n_samples:] = -1
+
+        return offsets, signs
+
+    def _noise(self, offset: int) -> torch.Tensor:
+        """Returns the noise vector at `offset` as a view into the noise table."""
+        return self._noise_table[offset:offset + self.n_parameters]
+
+    def _weighted_noise_sum(self, offsets: List[int], weights: torch.Tensor) -> torch.Tensor:
+        """Returns sum_i(weights_i * noise_i) for the noise vectors at the given offsets.
+
+        For ensembles, weights_i holds one weight per member, which is applied
+        to the member's part of noise_i.
         """
-        Returns a randomly perturbed copy of a model [torch.nn.Module],
-        as well as the noise vector used to generate the perturbation.
+        result = torch.zeros_like(self._candidate_params)
+        n_parts = self.n_members or 1
+        for offset, weight in zip(offsets, weights):
+            result.view(n_parts, -1).addcmul_(self._noise(offset).view(n_parts, -1), weight.view(-1, 1))
+        return result
+
+    def _noise_gram_matrix(self, offsets: List[int]) -> torch.Tensor:
+        """Returns the matrix of inner products of the noise vectors at the given offsets."""
+        noise = torch.stack([self._noise(offset) for offset in offsets])
+        return noise.mm(noise.t())
+
+    def _reward(self, strategy: Strategy, aggregate_batch: bool = True) -> torch.Tensor:
+        """Returns the reward of a strategy in the learner's player position,
+        for ensembles separately for each member."""
+        reward = self.environment.get_strategy_reward(
+            strategy, **self.strat_to_player_kwargs,
+            regularize=self.regularize,
+            aggregate_batch=aggregate_batch and not self.n_members
+        ).detach()
+        return self.model.aggregate_by_member(reward) if self.n_members else reward
+
+    def _evaluate_population(self, offsets: List[int], signs: torch.Tensor) -> torch.Tensor:
+        """Evaluates the candidates one after another by perturbing the flat
+        parameter buffer of the candidate model in place.
+
+        Returns:
+            rewards: population_size (or batch_size x population_size if log_gradient_variance,
+                or n_members x population_size for ensembles)
+        """
+        params_flat = parameters_to_vector(self.params()).detach()
+        self._candidate_model.train(self.model.training)
+
+        if self.log_gradient_variance:
+            rewards = torch.empty(self.environment.batch_size, self.population_size, device=params_flat.device)
+        elif self.n_members:
+            rewards = torch.empty(self.n_members, self.population_size, device=params_flat.device)
+        else:
+            rewards = torch.empty(self.population_size, device=params_flat.device)
+
+        for i, (offset, sign) in enumerate(zip(offsets, signs.tolist())):
+            torch.add(params_flat, self._noise(offset), alpha=sign * self.sigma, out=self._candidate_params)
+            rewards[..., i] = self._reward(self._candidate_model, aggregate_batch=not self.log_gradient_variance)
+
+        return rewards
+
+    def _evaluate_vectorized_population(self, offsets: List[int], signs: torch.Tensor) -> torch.Tensor:
+        """Evaluates the whole population in a single stacked forward pass and
+        a single mechanism call.
+
+        Returns:
+            rewards: population_size (or batch_size x population_size if log_gradient_variance,
+                or n_members x population_size for ensembles)
         """
-        perturbed = deepcopy(model)
+        params_flat = parameters_to_vector(self.params()).detach()
 
-        params_flat = parameters_to_vector(model.parameters())
-        if noise is None:
-            noise = torch.zeros_like(params_flat).normal_(mean=0.0, std=self.sigma)
-        # copy perturbed params into copy
-        vector_to_parameters(params_flat + noise, perturbed.parameters())
+        indices = torch.tensor(offsets, device=params_flat.device).unsqueeze(-1) \
+            + torch.arange(self.n_parameters, device=params_flat.device)
+        population = params_flat + self.sigma * signs.unsqueeze(-1) * self._noise_table[indices]
 
-        return perturbed, noise
+        rewards = self.environment.get_strategies_rewards(
+            population, model=self.model,
+            **self.strat_to_player_kwargs,
+            regularize=self.regularize,
+            aggregate_batch=not (self.log_gradient_variance or self.n_members)
+        ).detach()
+
+        if self.n_members:
+            rewards = self.model.aggregate_by_member(rewards)
+        return rewards if not (self.log_gradient_variance or self.n_members) else rewards.t()
 
     def __str__(self):
         return "NPGA"
@@ -412,6 +523,10 @@ class PGLearner(GradientBasedLearner):
             self.model, **self.strat_to_player_kwargs,
             smooth_market=self.smooth_market
         )
+        if isinstance(self.model, EnsembleStrategy):
+            # members play disjoint parts of the batch: each member's gradient
+            # should be that of its own mean reward
+            loss = loss * self.model.n_members
         loss.backward()
 
         if self.log_gradient_variance:
@@ -626,16 +741,17 @@ class PSOLearner(Learner):
             self.max_velocity = max_velocity
 
         #### --- initialize the swarm ---
-        # positions
+        # positions, on the device of the model to be optimized
+        model_parameters = parameters_to_vector(self.model.parameters()).detach()
         if pretrain_deviation > 0:
             # perturbation of pretrained model params
-            self.position = torch.zeros(swarm_size, n_parameters, device=torch.cuda.current_device()).normal_(mean=0.0,
-                                                                                                              std=pretrain_deviation)
-            self.position.add_(parameters_to_vector(self.model.parameters()))
+            self.position = torch.zeros(swarm_size, n_parameters, device=model_parameters.device).normal_(
+                mean=0.0, std=pretrain_deviation)
+            self.position.add_(model_parameters)
         else:
             # random positions
             self.position = 2 * max_position * torch.rand(swarm_size, n_parameters,
-                                                          device=torch.cuda.current_device()) - max_position
+                                                          device=model_parameters.device) - max_position
         # velocities
         self.velocity = 2 * max_velocity * torch.rand_like(self.position) - max_velocity
         # option for evaluation: zero velocities:
@@ -724,26 +840,28 @@ class PSOLearner(Learner):
         return self.pbest_fitness.detach().clone(), torch.empty_like(self.position), neighborhood.to(
             device=self.position.device)
 
-    def _calculate_fitness(self, position):
-        """Let the candidate particle try against the environment and get its utility
+    def _calculate_fitness(self, positions):
+        """Let the candidate particles try against the environment and get their utilities.
+            All particles are evaluated at once, in a single stacked forward pass
+            and a single mechanism call.
             NOTE: PSO minimize but we use a maximization formulation in the rewards,
             thus we need to use the negative reward.
             Arguments:
-                position: Tensor
-                    The current particle's parameter values
+                positions: Tensor
+                    The particles' parameter values, shape: n_particles x n_params
             Returns:
                 reward: Tensor
-                    The fitness value (utility) of the current particle
+                    The fitness values (utilities) of the particles, shape: n_particles
         """
-        vector_to_parameters(position, self.particle_evaluation_model.parameters())
-        reward = self.environment.get_strategy_reward(
-            self.particle_evaluation_model,
+        rewards = self.environment.get_strategies_rewards(
+            positions,
+            model=self.particle_evaluation_model,
             smooth_market=self.smooth_market,
             **self.strat_to_player_kwargs,
         ).detach()
-        assert reward.numel() == 1
-        self.utility_eval_counter += 1
-        return -reward
+        assert rewards.shape == positions.shape[:1]
+        self.utility_eval_counter += positions.shape[0]
+        return -rewards
 
     def update_strategy(self):
         # Performs one model-update to the player's strategy.
@@ -753,16 +871,14 @@ class PSOLearner(Learner):
         self.environment.prepare_iteration()
         ### 2. evaluate each particles current position (solution)
         # fitness: 1 x swarm size
-        fitness = torch.tensor([self._calculate_fitness(p) for p in self.position], device=self.position.device)
+        fitness = self._calculate_fitness(self.position)
 
         # prevent stale memory: reevaluate the personal and overall best fitness
         if self.reeval_frequency and self.cur_epoch > 0 and not self.cur_epoch % self.reeval_frequency:
             old_best = self.best_fitness.detach().clone()
-            self.best_fitness = torch.squeeze(
-                torch.tensor([self._calculate_fitness(p) for p in self.best_position], device=self.position.device), 0)
+            self.best_fitness = self._calculate_fitness(self.best_position).view_as(old_best)
             if not torch.equal(old_best, self.best_fitness):
-                self.pbest_fitness = torch.tensor([self._calculate_fitness(p) for p in self.pbest_position],
-                                                  device=self.position.device)
+                self.pbest_fitness = self._calculate_fitness(self.pbest_position)
         if self.decrease_fitness:
             self.pbest_fitness = self.pbest_fitness * self.decrease_pbest
             self.best_fitness = self.best_fitness * self.decrease_best
@@ -943,21 +1059,14 @@ class AESPGLearner(GradientBasedLearner):
         ### 1. if required redraw valuations / perform random moves (determined by env)
         self.environment.prepare_iteration()
         ### 2. Create a population of perturbations of the original model outputs
-        population = (self._perturb_model(self.model) for _ in range(n_pop))
-        ### 3. let each candidate against the environment and get their utils ###
+        population, epsilons = zip(*(self._perturb_model(self.model) for _ in range(n_pop)))
+        ### 3. let all candidates play against the environment at once and get their utils ###
 
         # rewards: population_size x n_batch x 1, epsilons: n_pop x n_batch x n_action
-        rewards, epsilons = (
-            torch.cat(tensors)#.view(n_pop, -1)
-            for tensors in zip(*(
-                (
-                    self.environment.get_strategy_reward(
-                        model, aggregate_batch=False, **self.strat_to_player_kwargs).detach().view(1,n_batch, 1),
-                    epsilon.unsqueeze(0)
-                )
-                for (model, epsilon) in population
-                ))
-            )
+        rewards = self.environment.get_strategies_rewards(
+            population, aggregate_batch=False, **self.strat_to_player_kwargs
+        ).detach().view(n_pop, n_batch, 1)
+        epsilons = torch.stack(epsilons)
         ### 4. calculate the ES-pseudogradients   ####
         ## base case: current reward
         # action: batch x 1, baseline: batch
@@ -1,10 +1,12 @@
 """Auction mechanism for combinatorial auctions (where bidders are interested
 in bundles of items).
 """
+import json
 import os
-import sys
+import platform
+import warnings
+from time import perf_counter as timer
 from typing import Tuple
-#from time import perf_counter as timer
 
 # pylint: disable=E1102
 import torch
@@ -12,7 +14,8 @@ import torch.nn as nn
 # For qpth #pylint:disable=ungrouped-imports
 from qpth.qp import QPFunction
 from tqdm import tqdm
-from functools import reduce
+from functools import lru_cache, reduce
+from itertools import combinations
 from operator import mul
 
 # Some (but not all) of the features in this module need gurobi,
@@ -28,6 +31,7 @@ except ImportError as e:
 
 from bnelearn.mechanism.data import LLGData, LLLLGGData, LLLLRRGData
 from bnelearn.util import mpc
+from bnelearn.util.process_pool import get_process_pool
 from .mechanism import Mechanism
 
 
@@ -84,6 +88,10 @@ class _OptNet_for_LLLLGG(nn.Module):
         self.mu = None
         self.Q = None
         self.q = None
+        # optional warm-start (x0, z0, y0) for the mpc solver, and the final
+        # iterates of its last solve
+        self.warm_start: dict = None
+        self.mpc_iterates: dict = None
 
     def _add_objective_min_payments(self):
         """
@@ -150,7 +158,8 @@ class _OptNet_for_LLLLGG(nn.Module):
                 self.mu_no_grad=None
             x_mpc, _ = mpc_solver.solve(self.Q.detach(), self.q.detach(), self.G.detach(),
                                         self.h.detach(), self.e_no_grad, self.mu_no_grad,
-                                        print_warning=False)
+                                        print_warning=False, **(self.warm_start or {}))
+            self.mpc_iterates = {'x0': mpc_solver.x, 'z0': mpc_solver.z, 'y0': mpc_solver.y}
             return x_mpc
         else:
             raise NotImplementedError(":/")
@@ -474,21 +483,22 @@ class LLGFullAuction(Mechanism):
                 values = [0, Inf].
 
         """
-        n_batch, n_players, _ = bids.shape
-        vcg_payments = torch.zeros(n_batch, n_players, device=self.device)
-        for player_position in range(n_players):
-            bids_reduced = bids.clone()
-            bids_reduced[:, player_position] = 0
-            optimal_welfare_wo_current = self._calculate_welfare(
-                valuations=bids_reduced,
-                allocations=self._solve_allocation_problem(bids_reduced),
-                # exclude=[player_position] -> should be zero anyway
-            )
-            actual_welfare_wo_current = self._calculate_welfare(
-                valuations=bids, allocations=allocations, exclude=[player_position])
-            vcg_payments[:, player_position] = optimal_welfare_wo_current \
-                - actual_welfare_wo_current
-        return vcg_payments
+        n_players = bids.shape[1]
+        players = torch.arange(n_players, device=bids.device).view(1, n_players, 1)
+
+        # Solve all counterfactual problems 'without player i' at once: the
+        # highest bid of the others on each item is the overall highest bid,
+        # unless i placed it, then it's the second highest.
+        top_bids = bids.topk(2, dim=1)
+        highest_bids_wo = torch.where(top_bids.indices[:, :1] == players,
+                                      top_bids.values[:, 1:], top_bids.values[:, :1])
+        # optimal welfare: items individually or the bundle (as in `_solve_allocation_problem`)
+        optimal_welfare_wo = torch.max(highest_bids_wo[:, :, :2].sum(dim=2), highest_bids_wo[:, :, 2])
+
+        player_welfare = (bids * allocations).sum(dim=2)
+        actual_welfare_wo = player_welfare.sum(dim=1, keepdim=True) - player_welfare
+
+        return optimal_welfare_wo - actual_welfare_wo
 
     def _calculate_payments_core(
             self,
@@ -635,6 +645,73 @@ class LLGFullAuction(Mechanism):
         return welfare.sum(axis=player_dim)
 
 
+@lru_cache(maxsize=None)
+def _core_active_sets(n_winners: int) -> dict:
+    """Precomputes the candidate active sets of the core pricing problems of
+    `n_winners` winning bidders, which only depend on the number of winners,
+    see `LLLLGGAuction._run_batch_nearest_vcg_core_enumeration`.
+
+    The constraints on the winners' payments x are written as
+    `normals @ x >= rhs`, with rows for all nonempty coalitions S of winners
+    (ordered by their bit mask, sum_{i in S} x_i >= beta_S), the lower bounds
+    (x_i >= 0) and the upper bounds (-x_i >= -b_i).
+
+    Returns a dict of cpu tensors:
+        normals: (n_constraints, k)
+        lp_duals: (n_lp, n_constraints) the vertices of the dual of
+            min sum(x), i.e. the nonnegative weights of k linearly independent
+            normals that sum up to the objective.
+        qp_rows: (n_qp, k) the (at most k-1) active constraints of all
+            candidate solutions of the nearest-VCG problem, followed by the
+            index n_constraints (for the constraint sum(x) = mu) and padded
+            with n_constraints + 1 (for a zero right hand side).
+        qp_normals: (n_qp, k, k) the corresponding (padded) normals.
+        qp_projections: (n_qp, k, k) inverses of qp_normals @ qp_normals.T
+            (padded with zeros).
+        qp_inequalities: (n_qp, k) which of the rows are inequalities.
+    """
+    k = n_winners
+    subsets = ((torch.arange(1, 2**k).unsqueeze(1) >> torch.arange(k)) & 1).double()
+    eye = torch.eye(k, dtype=torch.double)
+    normals = torch.cat([subsets, eye, -eye])
+    n_constraints = len(normals)
+    ones = torch.ones(k, dtype=torch.double)
+
+    rows = torch.tensor(list(combinations(range(n_constraints), k)), dtype=torch.long)
+    bases = normals[rows]
+    regular = torch.linalg.matrix_rank(bases) == k
+    rows, bases = rows[regular], bases[regular]
+    weights = torch.linalg.solve(bases.transpose(1, 2), ones.expand(len(rows), k))
+    feasible = (weights >= -1e-12).all(dim=1)
+    lp_duals = torch.zeros(int(feasible.sum()), n_constraints, dtype=torch.double) \
+        .scatter(1, rows[feasible], weights[feasible].clamp(min=0))
+    # degenerate bases share their vertex
+    lp_duals = lp_duals.round(decimals=12).unique(dim=0)
+
+    qp_rows, qp_normals, qp_projections, qp_inequalities = [], [], [], []
+    for n_active in range(k):
+        for active_rows in combinations(range(n_constraints), n_active):
+            active = torch.cat([normals[list(active_rows)], ones.unsqueeze(0)])
+            if torch.linalg.matrix_rank(active) < n_active + 1:
+                continue
+            padding = k - n_active - 1
+            qp_rows.append(list(active_rows) + [n_constraints] + [n_constraints + 1] * padding)
+            qp_normals.append(torch.cat([active, torch.zeros(padding, k, dtype=torch.double)]))
+            projection = torch.zeros(k, k, dtype=torch.double)
+            projection[:n_active + 1, :n_active + 1] = torch.linalg.inv(active @ active.t())
+            qp_projections.append(projection)
+            qp_inequalities.append([True] * n_active + [False] * (padding + 1))
+
+    return {
+        'normals': normals,
+        'lp_duals': lp_duals,
+        'qp_rows': torch.tensor(qp_rows, dtype=torch.long),
+        'qp_normals': torch.stack(qp_normals),
+        'qp_projections': torch.stack(qp_projections),
+        'qp_inequalities': torch.tensor(qp_inequalities, dtype=torch.bool)
+    }
+
+
 class LLLLGGAuction(Mechanism):
     """
     Inspired by implementation of Seuken Paper (Bosshard et al. (2019), https://arxiv.org/abs/1812.01955).
@@ -642,18 +719,37 @@ class LLLLGGAuction(Mechanism):
 
     Args:
         rule: pricing rule
-        core_solver: which solver to use, only relevant if pricing rule is a core rule
+        core_solver: which solver to use, only relevant if pricing rule is a core rule.
+            'enumeration' solves the (small) core problems of up to 4 winners
+            exactly by enumerating their active sets. With 'auto', the
+            available solvers are benchmarked on a probe of the first batch of
+            each batch size bucket (powers of 2), and the fastest one whose
+            payments are within `solver_tolerance` of the reference solver
+            (gurobi if available, else 'enumeration') is used from then on.
+            The choices are cached per (host, batch size bucket, device,
+            number of threads) in `solver_cache_file`.
         parallel: number of processors for parallelization in gurobi (only)
+        warm_start: whether to warm-start the 'mpc' core solver from the
+            solution of its previous call (if the batch sizes match). This pays
+            off when subsequent calls have similar bids, e.g. for the
+            population of an ES learner.
+        solver_cache_file: json file of the 'auto' solver choices, defaults to
+            `~/bnelearn/core_solvers.json`.
+        solver_tolerance: maximal payment deviation of the 'auto' solver choice.
     """
 
-    def __init__(self, rule='first_price', core_solver='NoCore', parallel: int = 1, cuda: bool = True):
+    # core solvers in order of decreasing accuracy
+    core_solvers = ['gurobi', 'enumeration', 'cvxpy', 'mpc', 'qpth']
+
+    def __init__(self, rule='first_price', core_solver='NoCore', parallel: int = 1, cuda: bool = True,
+                 warm_start: bool = False, solver_cache_file: str = None, solver_tolerance: float = 1e-3):
         super().__init__(cuda)
 
         if rule not in ['nearest_vcg', 'vcg', 'first_price']:
             raise ValueError('Invalid pricing rule.')
 
         if rule == 'nearest_vcg':
-            if core_solver not in ['gurobi', 'cvxpy', 'qpth', 'mpc']:
+            if core_solver not in self.core_solvers + ['auto']:
                 raise ValueError('Invalid solver.')
         if core_solver == 'gurobi':
             assert GUROBI_AVAILABLE, "You have selected the gurobi solver, but gurobipy is not installed!"
@@ -671,6 +767,15 @@ class LLLLGGAuction(Mechanism):
 
         self.core_solver = core_solver
         self.parallel = parallel
+        self.warm_start = warm_start
+        # final mpc iterates of each stage of the last core computation
+        self._core_iterates = {}
+
+        self.solver_cache_file = solver_cache_file or \
+            os.path.join(os.path.expanduser('~'), 'bnelearn', 'core_solvers.json')
+        self.solver_tolerance = solver_tolerance
+        # 'auto' solver choices by host, batch size bucket, device and number of threads
+        self._core_solver_choices = {}
 
         # When using cpu-multiprocessing for the solver, self cannot have
         # members allocated on cuda, or multiprocessing will fail.
@@ -678,7 +783,7 @@ class LLLLGGAuction(Mechanism):
         # This will cost us a few copy operations, but we'll be bottlenecked by
         # the solver anyway.
         self._solver_device = self.device
-        if (parallel > 1 and core_solver == 'gurobi'):
+        if (parallel > 1 and core_solver in ['gurobi', 'auto']):
             self._solver_device = 'cpu'
 
         # all feasible allocations as a dense tensor
@@ -689,11 +794,6 @@ class LLLLGGAuction(Mechanism):
         self.player_bundles = LLLLGGData.player_bundles(device=self._solver_device)
         assert self.player_bundles.shape == torch.Size([self.n_bidders, self.action_size])
 
-    def __mute(self):
-        """suppresses stdout output from multiprocessing workers
-        (e.g. avoid gurobi startup licence message clutter)"""
-        sys.stdout = open(os.devnull, 'w')
-
     def _solve_allocation_problem(self, bids: torch.Tensor, dont_allocate_to_zero_bid=True):
         """
         Computes allocation and welfare.
@@ -753,20 +853,18 @@ class LLLLGGAuction(Mechanism):
             payments: torch.Tensor, dim (batch_size, n_bidders), values = [0, Inf]
 
         """
-        player_bundles = self.player_bundles.to(self.device)
+        solutions = self.candidate_solutions.to(self.device)
 
         n_batch, n_players, n_bundles = bids.shape
-        bids_flat = bids.view(n_batch, n_players * n_bundles)
-        vcg_payments = torch.zeros(n_batch, n_players, device=self.device)
-        val = torch.zeros(n_batch, n_players, device=self.device)
-        for bidder in range(n_players):
-            bids_clone = bids.clone()
-            bids_clone[:, bidder] = 0
-            bidder_bundles = player_bundles[bidder]
-            val[:, bidder] = torch.sum(
-                bids_flat.index_select(1, bidder_bundles) * allocation.index_select(1, bidder_bundles),
-                dim=1, keepdim=True).view(-1)
-            vcg_payments[:, bidder] = val[:, bidder] - (welfare - self._solve_allocation_problem(bids_clone)[1])
+        # bidders' values of their bundles in each candidate solution: (batch_size, n_players, n_solutions)
+        solutions_values = torch.einsum(
+            'bpn,spn->bps', bids, solutions.view(-1, n_players, n_bundles).to(bids.dtype))
+        # all counterfactual problems 'without bidder i' at once: the welfare of
+        # each solution when i's bids are zero, maximized over the solutions
+        welfare_without = (solutions_values.sum(dim=1, keepdim=True) - solutions_values).max(dim=2).values
+
+        val = (allocation.view_as(bids) * bids).sum(dim=2)
+        vcg_payments = val - (welfare.unsqueeze(1) - welfare_without)
 
         return vcg_payments
 
@@ -836,22 +934,225 @@ class LLLLGGAuction(Mechanism):
         b = torch.sum(allocation.view(n_batch, n_player, n_bundle) * bids.view(n_batch, n_player, n_bundle), dim=2)
         payments_vcg = self._calculate_payments_vcg(bids, allocation, welfare)
 
+        if self.core_solver == 'enumeration':
+            # (handles duplicate coalitions itself)
+            return self._run_batch_nearest_vcg_core_enumeration(A, beta, payments_vcg, b)
+
         # Reduce problem and only keep highest value for a coalition
         A, beta = self._reduce_nearest_vcg_remove_duplicates(A, beta)
         # Not efficient. Takes longer than the speedup it results in
         #A, beta = self._reduce_nearest_vcg_remove_zeros(A, beta)
 
+        if self.core_solver == 'auto':
+            return self._run_batch_nearest_vcg_core_auto(A, beta, payments_vcg, b)
+        return self._run_batch_nearest_vcg_core(A, beta, payments_vcg, b, self.core_solver)
+
+    def _run_batch_nearest_vcg_core(self, A, beta, payments_vcg, b, solver):
         # Choose core solver
-        if self.core_solver == 'gurobi':
+        if solver == 'gurobi':
             payment = self._run_batch_nearest_vcg_core_gurobi(A, beta, payments_vcg, b)
-        elif self.core_solver == 'cvxpy':
+        elif solver == 'cvxpy':
             payment = self._run_batch_nearest_vcg_core_cvxpy(A, beta, payments_vcg, b)
-        elif self.core_solver == 'qpth' or self.core_solver == 'mpc':
-            payment = self._run_batch_nearest_vcg_core_qpth_mpc(A, beta, payments_vcg, b,self.core_solver).squeeze()
+        elif solver == 'enumeration':
+            payment = self._run_batch_nearest_vcg_core_enumeration(A, beta, payments_vcg, b)
+        elif solver == 'qpth' or solver == 'mpc':
+            payment = self._run_batch_nearest_vcg_core_qpth_mpc(A, beta, payments_vcg, b, solver).squeeze()
         else:
             raise NotImplementedError(":/")
         return payment
 
+    def _run_batch_nearest_vcg_core_enumeration(self, A, beta, payments_vcg, b,
+                                                max_winners: int = 4, tol: float = 1e-9):
+        """Solves the core problems without an iterative solver.
+
+        Only the winners' payments are variables. Their constraints only depend
+        on the number of winners k: each nonempty coalition S of winners pays
+        at least the highest `beta` of the coalitions blocking S, and
+        0 <= x <= b. For each k, all candidate active sets of the LP (its
+        vertices) and of the nearest-VCG QP are precomputed (see
+        `_core_active_sets`), s.t. each sample only requires solving the
+        candidates' linear equations by (batched) matrix products and
+        selecting the candidate that satisfies the KKT conditions.
+
+        Samples with more than `max_winners` winners, or without a valid
+        candidate (due to numerical issues), are solved by the mpc solver.
+
+        Args:
+            A, beta, payments_vcg, b: see `_calculate_payments_nearest_vcg_core`.
+            max_winners: largest number of winners whose candidates are enumerated.
+            tol: feasibility tolerance of the candidates.
+        Returns:
+            payment: torch.Tensor (n_batch, n_player), dtype double
+        """
+        n_batch, _, n_player = A.shape
+        A, beta = A.double(), beta.double()
+        payments_vcg, b = payments_vcg.double(), b.double()
+
+        winners = b > 0
+        n_winners = winners.sum(dim=1)
+        # coalitions as bit masks of the winners they exclude, where bit t
+        # corresponds to the t-th winner of the sample
+        slots = (winners.cumsum(dim=1) - 1).clamp(min=0)
+        masks = (A * winners.unsqueeze(1) * (2 ** slots).unsqueeze(1)).sum(dim=2).long()
+
+        payment = torch.zeros(n_batch, n_player, dtype=torch.double, device=A.device)
+        unsolved = n_winners > max_winners
+        for k in range(1, max_winners + 1):
+            samples = (n_winners == k).nonzero().squeeze(-1)
+            if len(samples) == 0:
+                continue
+            # the highest willingness to pay of each coalition (implied by x >= 0 if not present)
+            beta_k = torch.zeros(len(samples), 2**k, dtype=torch.double, device=A.device) \
+                .scatter_reduce(1, masks[samples], beta[samples], 'amax')
+            x, valid = self._solve_core_problems_by_enumeration(
+                beta_k[:, 1:], payments_vcg[samples][winners[samples]].view(-1, k),
+                b[samples][winners[samples]].view(-1, k), tol)
+            solved = samples[valid]
+            payment[solved] = payment[solved].masked_scatter(winners[solved], x[valid])
+            unsolved[samples[~valid]] = True
+
+        if unsolved.any():
+            payment[unsolved] = self._run_batch_nearest_vcg_core_qpth_mpc(
+                A[unsolved], beta[unsolved], payments_vcg[unsolved], b[unsolved], 'mpc') \
+                .view(-1, n_player).double()
+        return payment
+
+    def _solve_core_problems_by_enumeration(self, beta, payments_vcg, b, tol, max_chunk_size=2**24):
+        """Solves the core problems of a batch of samples with the same number
+        of winners k by enumerating the candidate active sets.
+
+        By duality, neither step requires checking the candidates' primal
+        feasibility: the minimal revenue is the maximum of the dual objective
+        over the dual vertices, and the nearest-VCG payments are the candidate
+        with nonnegative multipliers that is farthest from VCG (each such
+        candidate's distance is a lower bound of the optimal one).
+
+        Args:
+            beta: (n_batch, 2**k - 1) willingness to pay of the coalitions
+            payments_vcg, b: (n_batch, k)
+        Returns:
+            x: (n_batch, k) nearest-VCG core payments
+            valid: (n_batch) whether the solution is feasible
+        """
+        n_batch, k = b.shape
+        candidates = {name: value.to(b.device) for name, value in _core_active_sets(k).items()}
+        n_candidates = len(candidates['qp_rows'])
+        # chunk the batch to bound the memory of the candidates
+        chunk_size = max(1, max_chunk_size // (k * n_candidates))
+
+        x, valid = torch.zeros_like(b), torch.zeros(n_batch, dtype=torch.bool, device=b.device)
+        for chunk in torch.arange(n_batch, device=b.device).split(chunk_size):
+            rhs = torch.cat([beta[chunk], torch.zeros_like(b[chunk]), -b[chunk]], dim=1)
+
+            # 1. minimal revenue mu = min sum(x) s.t. normals @ x >= rhs
+            mu = (rhs @ candidates['lp_duals'].t()).max(dim=1).values
+
+            # 2. payments nearest to VCG s.t. sum(x) == mu: projections of the
+            #    VCG payments onto each candidate active set
+            p = payments_vcg[chunk]
+            extended_rhs = torch.cat([rhs, mu.unsqueeze(1), torch.zeros_like(mu).unsqueeze(1)], dim=1)
+            residuals = extended_rhs[:, candidates['qp_rows']] \
+                - torch.einsum('cij,nj->nci', candidates['qp_normals'], p)
+            multipliers = torch.einsum('cij,ncj->nci', candidates['qp_projections'], residuals)
+            dual_feasible = ((multipliers >= -tol) | ~candidates['qp_inequalities']).all(dim=2)
+            distance = (residuals * multipliers).sum(dim=2).masked_fill(~dual_feasible, -float('inf'))
+            best = distance.argmax(dim=1)
+            x[chunk] = p + torch.einsum('nji,nj->ni', candidates['qp_normals'][best],
+                                        multipliers[torch.arange(len(chunk), device=b.device), best])
+
+            valid[chunk] = (x[chunk] @ candidates['normals'].t() >= rhs - tol).all(dim=1) \
+                & ((x[chunk].sum(dim=1) - mu).abs() <= tol)
+
+        return x, valid
+
+    def _run_batch_nearest_vcg_core_auto(self, A, beta, payments_vcg, b):
+        """Solves the core problems with the fastest sufficiently accurate
+        solver for this batch size, which is benchmarked on first use."""
+        n_batch = A.shape[0]
+        # timings are only comparable on the same machine
+        key = '{}-{}-{}-{}-{}'.format(platform.node(), 1 << (n_batch - 1).bit_length(), self.device,
+                                      torch.get_num_threads(), self.parallel)
+
+        if key not in self._core_solver_choices:
+            self._core_solver_choices.update(self._load_core_solver_choices())
+        if key not in self._core_solver_choices:
+            solver = self._benchmark_core_solvers(A, beta, payments_vcg, b)
+            self._core_solver_choices[key] = solver
+            self._save_core_solver_choice(key, solver)
+        return self._run_batch_nearest_vcg_core(A, beta, payments_vcg, b, self._core_solver_choices[key])
+
+    def _benchmark_core_solvers(self, A, beta, payments_vcg, b,
+                                max_probe_size: int = 2**10, pilot_size: int = 2**6):
+        """Benchmarks the available core solvers on a probe of (at most
+        `max_probe_size`) problems subsampled from the batch.
+
+        The reference payments are those of gurobi if available, else those of
+        the (exact) enumeration solver. Every other solver is first timed on a
+        pilot of `pilot_size` problems and skipped if its pilot time,
+        extrapolated to the probe, exceeds the fastest accurate solver so far.
+
+        Returns:
+            solver: the fastest solver whose payments deviate at most
+                `solver_tolerance` from the reference on the probe.
+        """
+        n_batch = A.shape[0]
+        probe = torch.linspace(0, n_batch - 1, min(n_batch, max_probe_size), device=A.device).long()
+        A, beta, payments_vcg, b = A[probe], beta[probe], payments_vcg[probe], b[probe]
+        pilot = slice(0, pilot_size)
+
+        references = ['gurobi', 'enumeration'] if GUROBI_AVAILABLE else ['enumeration']
+        reference, best_solver, best_time = None, None, float('inf')
+        for solver in references + [s for s in self.core_solvers if s not in references]:
+            try:
+                # warm-up (e.g. lazy imports and precomputations), then pilot
+                self._run_batch_nearest_vcg_core(A[pilot], beta[pilot], payments_vcg[pilot], b[pilot], solver)
+                pilot_time, _ = self._time_core_solver(A[pilot], beta[pilot], payments_vcg[pilot], b[pilot], solver)
+                if reference is not None and pilot_time * len(probe) / len(A[pilot]) > best_time:
+                    continue
+                time, payment = self._time_core_solver(A, beta, payments_vcg, b, solver)
+            except Exception:  # pylint: disable=broad-except
+                # e.g. missing dependency or license
+                continue
+            payment = payment.double().view(-1)
+            if reference is None:
+                reference = payment
+            if (payment - reference).abs().max() <= self.solver_tolerance and time < best_time:
+                best_solver, best_time = solver, time
+
+        if best_solver is None:
+            raise RuntimeError('None of the core solvers is available.')
+        return best_solver
+
+    def _time_core_solver(self, A, beta, payments_vcg, b, solver):
+        """Returns the wall time and the payments of a core solver."""
+        if self.device == 'cuda':
+            torch.cuda.synchronize()
+        tic = timer()
+        payment = self._run_batch_nearest_vcg_core(A, beta, payments_vcg, b, solver)
+        if self.device == 'cuda':
+            torch.cuda.synchronize()
+        return timer() - tic, payment
+
+    def _load_core_solver_choices(self) -> dict:
+        """Returns the cached 'auto' solver choices."""
+        try:
+            with open(self.solver_cache_file) as cache_file:
+                return json.load(cache_file)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_core_solver_choice(self, key: str, solver: str):
+        """Adds an 'auto' solver choice to the cache file."""
+        choices = self._load_core_solver_choices()
+        choices[key] = solver
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.solver_cache_file)), exist_ok=True)
+            with open(self.solver_cache_file, 'w') as cache_file:
+                json.dump(choices, cache_file, indent=4)
+        except OSError:
+            # the choice is still kept in memory
+            pass
+
     def _reduce_nearest_vcg_remove_duplicates(self, A, beta):
         """
         For each coalition keep only the instance with the highest bid (beta)
@@ -935,14 +1236,13 @@ class LLLLGGAuction(Mechanism):
             chunksize = 1
             n_chunks = n_mini_batch / chunksize
             torch.multiprocessing.set_sharing_strategy('file_system')
-            with torch.multiprocessing.Pool(pool_size, initializer=self.__mute) as p:  #
-                result = list(tqdm(
-                    p.imap(self._run_single_mini_batch_nearest_vcg_core_gurobi, iterable_input, chunksize=chunksize),
-                    total=n_chunks, unit='chunks',
-                    desc=f'Solving mechanism for batch_size {n_chunks}. {pool_size} processes, chunk size {chunksize}'
-                ))
-                p.close()
-                p.join()
+            # the pool is reused across calls until `shutdown_process_pools` is called
+            p = get_process_pool(pool_size, mute_stdout=True)
+            result = list(tqdm(
+                p.imap(self._run_single_mini_batch_nearest_vcg_core_gurobi, iterable_input, chunksize=chunksize),
+                total=n_chunks, unit='chunks',
+                desc=f'Solving mechanism for batch_size {n_chunks}. {pool_size} processes, chunk size {chunksize}'
+            ))
             payment = torch.cat(result)
         else:
             iterator_A = A.detach()
@@ -1096,11 +1396,32 @@ class LLLLGGAuction(Mechanism):
         model = _OptNet_for_LLLLGG(self.device, A, beta, b, payments_vcg)
         if min_core_payments:
             model._add_objective_min_payments()
-            mu = model(solver)
+            mu = self._solve_core_stage(model, solver, 'min_payments')
             model._add_objective_min_vcg_distance(mu)
         else:
             model._add_objective_min_vcg_distance()
-        return model(solver)
+        return self._solve_core_stage(model, solver, 'min_vcg_distance')
+
+    @property
+    def thread_safe(self) -> bool:
+        # warm starts and 'auto' solver choices are state across calls
+        return not (self.warm_start or self.core_solver == 'auto')
+
+    def _solve_core_stage(self, model: _OptNet_for_LLLLGG, solver: str, stage: str):
+        """Solves the current objective of `model`. If `self.warm_start` is set,
+        the mpc solver is warm-started from the payments of the same stage in
+        the previous call. (Only the primal solution is reused: the dual
+        variables belong to the coalitions of the previous bids, which differ
+        after the removal of duplicate coalitions.)"""
+        if not (self.warm_start and solver == 'mpc'):
+            return model(solver)
+
+        previous = self._core_iterates.get(stage)
+        if previous is not None and previous['x0'].shape == (model.n_batch, model.n_player, 1):
+            model.warm_start = {'x0': previous['x0']}
+        result = model(solver)
+        self._core_iterates[stage] = model.mpc_iterates
+        return result
 
     def _run_batch_nearest_vcg_core_cvxpy(self, A, beta, payments_vcg, b, min_core_payments=True):
         # pylint: disable=import-outside-toplevel
@@ -1204,32 +1525,53 @@ class LLLLRRGAuction(LLLLGGAuction):
 
 
 class CombinatorialAuction(Mechanism):
-    """A combinatorial auction, implemented via (possibly parallel) calls to the gurobi solver.
+    """A general combinatorial auction, where each bidder can win at most one of
+    the `bundles` and each item can be allocated at most once.
+
+    By default, the auction is solved by enumeration: all feasible allocations
+    are precomputed once (per number of players), such that winner
+    determination and the VCG counterfactuals of a whole batch reduce to
+    matrix products and maximizations. As the number of feasible allocations
+    grows exponentially in the numbers of bidders and bundles, large
+    instances can instead be solved by (possibly parallel) calls to the
+    gurobi solver.
 
        Args:
         rule: pricing rule
+        cuda: whether to run the auction on the gpu
+        bundles: torch.Tensor (n_bundles x n_items), values = {0,1}
+        parallel: number of processes for the gurobi solver (only)
+        solver: one of 'enumeration' and 'gurobi'
+        max_enumerated_allocations: bound on the number of allocations that
+            are enumerated, i.e. on the product of (n_bundles + 1) over the
+            players. Larger instances fall back to the gurobi solver.
 
     """
 
-    def __init__(self, rule='first_price', cuda: bool = True, bundles=None, parallel: int = 1):
+    def __init__(self, rule='first_price', cuda: bool = True, bundles=None, parallel: int = 1,
+                 solver: str = 'enumeration', max_enumerated_allocations: int = 2**24):
         super().__init__(cuda)
 
         if rule not in ['vcg']:
             raise NotImplementedError(':(')
 
+        if solver not in ['enumeration', 'gurobi']:
+            raise ValueError('Invalid solver!')
+
         # 'nearest_zero' and 'proxy' are aliases
         if rule == 'proxy':
             rule = 'nearest_zero'
 
         self.rule = rule
         self.parallel = parallel
+        self.solver = solver
+        self.max_enumerated_allocations = max_enumerated_allocations
 
         self.bundles = bundles
         self.n_items = len(self.bundles[0])
 
-    def __mute(self):
-        """suppresses stdout output from workers (avoid gurobi startup licence message clutter)"""
-        sys.stdout = open(os.devnull, 'w')
+        # feasible allocations by number of players, see `_feasible_allocations`
+        self._allocations = {}
 
     def run(self, bids: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
         """
@@ -1237,14 +1579,19 @@ class CombinatorialAuction(Mechanism):
 
         Args:
             bids: torch.Tensor
-                of bids with dimensions (batch_size, n_players, 2) [0,Inf]
-            bundles: torch.Tensor
-                of bundles with dimensions (batch_size, 2, n_items), {0,1}
+                of bids with dimensions (batch_size, n_players, n_bundles) [0,Inf]
 
         Returns:
-            allocation: torch.Tensor, dim (batch_size, n_bidders, 2)
+            allocation: torch.Tensor, dim (batch_size, n_bidders, n_bundles)
             payments: torch.Tensor, dim (batch_size, n_bidders)
         """
+        if self.solver == 'enumeration':
+            if self._can_enumerate(bids.shape[1]):
+                return self._run_enumeration(bids)
+            if not GUROBI_AVAILABLE:
+                raise ValueError(self._too_many_allocations_message(bids.shape[1]) +
+                                 ' Install gurobipy to solve it.')
+            warnings.warn(self._too_many_allocations_message(bids.shape[1]) + ' Falling back to gurobi.')
 
         # detect appropriate pool size
         pool_size = min(self.parallel, len(bids))
@@ -1256,17 +1603,18 @@ class CombinatorialAuction(Mechanism):
             n_chunks = len(iterator)
 
             torch.multiprocessing.set_sharing_strategy('file_system')
-            with torch.multiprocessing.Pool(pool_size, initializer=self.__mute) as p:
-                # as we handled chunks ourselves, each element of our list should be an individual chunk,
-                # so the pool.map will get argument chunksize=1
-                # The following code is wrapped to produce progess bar, without it simplifies to:
-                # result = p.map(self.closure, split_tensor, chunksize=1)
-                result = list(tqdm(
-                    p.imap(self._run_single_batch, iterator, chunksize=1),
-                    total=n_chunks, unit='chunks',
-                    desc='Solving mechanism for batch_size {} with {} processes, chunk size of {}'.format(
-                        n_chunks, pool_size, 1)
-                ))
+            # the pool is reused across calls until `shutdown_process_pools` is called
+            p = get_process_pool(pool_size, mute_stdout=True)
+            # as we handled chunks ourselves, each element of our list should be an individual chunk,
+            # so the pool.map will get argument chunksize=1
+            # The following code is wrapped to produce progess bar, without it simplifies to:
+            # result = p.map(self.closure, split_tensor, chunksize=1)
+            result = list(tqdm(
+                p.imap(self._run_single_batch, iterator, chunksize=1),
+                total=n_chunks, unit='chunks',
+                desc='Solving mechanism for batch_size {} with {} processes, chunk size of {}'.format(
+                    n_chunks, pool_size, 1)
+            ))
             allocation, payment = [torch.cat(x) for x in zip(*result)]
 
         else:
@@ -1275,6 +1623,88 @@ class CombinatorialAuction(Mechanism):
 
         return allocation.to(self.device), payment.to(self.device)
 
+    def _can_enumerate(self, n_players: int) -> bool:
+        """Whether the (upper bound on the) number of allocations of the
+        bundles to `n_players` bidders stays within `max_enumerated_allocations`."""
+        return (len(self.bundles) + 1)**n_players <= self.max_enumerated_allocations
+
+    def _too_many_allocations_message(self, n_players: int) -> str:
+        return f'Up to {len(self.bundles) + 1}^{n_players} allocations of the bundles exceed ' \
+               f'max_enumerated_allocations={self.max_enumerated_allocations}.'
+
+    def _feasible_allocations(self, n_players: int) -> torch.Tensor:
+        """Returns all feasible allocations of the bundles to `n_players`
+        bidders, where each bidder wins at most one bundle and each item is
+        allocated at most once.
+
+        The allocations are built bidder by bidder and cached.
+
+        Returns:
+            allocations: torch.Tensor (n_allocations x n_players*n_bundles), values = {0,1}
+                The first allocation is the empty one.
+        """
+        if n_players not in self._allocations:
+            if not self._can_enumerate(n_players):
+                raise ValueError(self._too_many_allocations_message(n_players))
+            bundles = torch.as_tensor(self.bundles, device=self.device).bool()
+            n_bundles = bundles.shape[0]
+            # options of a single bidder: win nothing or one of the bundles
+            options = torch.cat([torch.zeros(1, n_bundles, dtype=torch.bool, device=self.device),
+                                 torch.eye(n_bundles, dtype=torch.bool, device=self.device)])
+            options_items = torch.cat([torch.zeros(1, self.n_items, dtype=torch.bool, device=self.device),
+                                       bundles])
+
+            allocations = torch.zeros(1, 0, dtype=torch.bool, device=self.device)
+            used_items = torch.zeros(1, self.n_items, dtype=torch.bool, device=self.device)
+            for _ in range(n_players):
+                # (partial allocation, option) pairs without overlapping items
+                partial, option = (~(used_items.unsqueeze(1) & options_items.unsqueeze(0)).any(-1)) \
+                    .nonzero(as_tuple=True)
+                allocations = torch.cat([allocations[partial], options[option]], dim=1)
+                used_items = used_items[partial] | options_items[option]
+
+            self._allocations[n_players] = allocations.float()
+
+        return self._allocations[n_players]
+
+    def _run_enumeration(self, bids: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Runs the auction for a batch of bids by enumerating all feasible
+        allocations.
+
+        Args:
+            bids: torch.Tensor (batch_size x n_players x n_bundles)
+
+        Returns:
+            allocation: torch.Tensor (batch_size x n_players x n_bundles),
+            payments: torch.Tensor (batch_size x n_players)
+        """
+        n_batch, n_players, n_bundles = bids.shape
+        assert n_bundles == len(self.bundles), "Bidders must bid on all bundles."
+        bids = bids.to(self.device)
+        allocations = self._feasible_allocations(n_players).to(bids.dtype)
+
+        # welfare of each feasible allocation: (batch_size x n_allocations)
+        bids_flat = bids.view(n_batch, n_players * n_bundles)
+        allocations_welfare = torch.mm(bids_flat, allocations.t())
+        welfare, winning_allocation = allocations_welfare.max(dim=1)
+        # don't allocate bundles that are bid zero on
+        allocation = allocations.index_select(0, winning_allocation).view_as(bids) * (bids > 0)
+
+        if self.rule == 'vcg':
+            # welfare of the others when bidder i is excluded: maximum over the
+            # allocations in which i doesn't win (this includes the empty one)
+            wins = allocations.view(-1, n_players, n_bundles).sum(dim=2) > 0
+            welfare_without = torch.stack(
+                [allocations_welfare.masked_fill(wins[:, bidder], -float('inf')).amax(dim=1)
+                 for bidder in range(n_players)],
+                dim=1)
+            value = (allocation * bids).sum(dim=2)
+            payments = value - (welfare.unsqueeze(1) - welfare_without)
+        else:
+            raise ValueError('Invalid Pricing rule!')
+
+        return allocation, payments
+
     def _run_single_batch(self, bids):
         """Runs the auction for a single batch of bids.
 
@@ -1293,7 +1723,7 @@ class CombinatorialAuction(Mechanism):
         model_all, assign_i_s = self._build_allocation_problem(bids)
         self._solve_allocation_problem(model_all)
 
-        allocation = torch.tensor(model_all.getAttr('x', assign_i_s).values(),
+        allocation = torch.tensor(list(model_all.getAttr('x', assign_i_s).values()),
                                   device=bids.device).view(n_players, n_bundles)
         if self.rule == 'vcg':
             payments = self._calculate_payments_vcg(bids, model_all, allocation, assign_i_s)
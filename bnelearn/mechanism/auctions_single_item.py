@@ -79,7 +79,7 @@ class VickreyAuction(Mechanism):
             allocations = softmax(bids / self.smoothing_temperature)
 
             # redistribute original payments proportional to allocation smoothing
-            total_payments = second_prices.view(*batch_sizes, 1, n_items).repeat(1, n_players, 1)
+            total_payments = second_prices.view(*batch_sizes, 1, n_items).expand(*batch_sizes, n_players, n_items)
             payments = (allocations * total_payments).sum(axis=item_dim)
 
         if self.random_tie_break: # restore bidder order
@@ -152,7 +152,7 @@ class FirstPriceSealedBidAuction(Mechanism):
             allocations = softmax(bids / self.smoothing_temperature)
 
             # redistribute original payments proportional to allocation smoothing
-            total_payments = highest_bids.view(*batch_sizes, 1, n_items).repeat(1, n_players, 1)
+            total_payments = highest_bids.view(*batch_sizes, 1, n_items).expand(*batch_sizes, n_players, n_items)
             payments = (allocations * total_payments).sum(axis=item_dim)
 
         return (allocations, payments)  # payments: batches x players, allocation: batch x players x items
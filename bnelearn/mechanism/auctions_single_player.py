@@ -16,9 +16,9 @@ class StaticMechanism(Mechanism):
     """
 
     def run(self, bids: torch.Tensor):
-        assert bids.dim() == 3, "Bid tensor must be 3d (batch x players x items)"
+        assert bids.dim() >= 3, "Bid tensor must be at least 3d (*batch_dims x players x items)"
         assert (bids >= 0).all().item(), "All bids must be nonnegative."
-        batch_dim, player_dim, item_dim = 0, 1, 2  # pylint: disable=unused-variable
+        *batch_dims, player_dim, item_dim = range(bids.dim())  # pylint: disable=unused-variable
 
         payments = torch.mul(bids, bids).mul_(0.05).sum(item_dim)
         allocations = (bids >= torch.rand_like(bids).mul_(10)).float()
@@ -41,9 +41,9 @@ class StaticFunctionMechanism(Mechanism):
     """
 
     def run(self, bids):
-        assert bids.dim() == 3, "Bid tensor must be 3d (batch x players x items)"
+        assert bids.dim() >= 3, "Bid tensor must be at least 3d (*batch_dims x players x items)"
         assert (bids >= 0).all().item(), "All bids must be nonnegative."
-        batch_dim, player_dim, item_dim = 0, 1, 2  # pylint: disable=unused-variable
+        *batch_dims, player_dim, item_dim = range(bids.dim())  # pylint: disable=unused-variable
 
         payments = torch.mul(5.0 - bids, 5.0 - bids).sum(item_dim)
         allocations = (torch.rand_like(bids) > 0.5).float()
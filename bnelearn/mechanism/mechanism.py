@@ -52,3 +52,9 @@ class Mechanism(Game, ABC):
     def run(self, bids) -> Tuple[torch.Tensor, torch.Tensor]:
         """Alias for play for auction mechanisms"""
         raise NotImplementedError()
+
+    @property
+    def thread_safe(self) -> bool:
+        """Whether `run` may be called concurrently from several threads, i.e.
+        the mechanism doesn't keep mutable state across calls."""
+        return True
@@ -2,3 +2,4 @@ from .base import *
 from .samplers_ipv import *
 from .samplers_correlated_pv import *
 from .samplers_non_pv import *
+from .samplers_prefetching import *
@@ -2,7 +2,7 @@
    valuation and observation profiles for a set of players."""
 
 from abc import ABC, abstractmethod
-from math import ceil
+from math import ceil, prod
 from typing import List, Tuple, Union
 from itertools import product
 from operator import add
@@ -28,6 +28,33 @@ class ValuationObservationSampler(ABC):
         assert support_bounds.size() == torch.Size([n_players, valuation_size, 2]), \
             "invalid support bounds."
         self.support_bounds: torch.FloatTensor = support_bounds.to(self.default_device)
+        # whether to draw scrambled Sobol points instead of pseudo-random ones
+        self.quasi_monte_carlo: bool = False
+
+    def _draw_uniform(self, batch_sizes: List[int], event_shape: List[int], device: Device,
+                      low: float = 0.0, high: float = 1.0, dtype=torch.float) -> torch.Tensor:
+        """Draws uniform samples on [low, high) of shape (*batch_sizes, *event_shape).
+
+        If `self.quasi_monte_carlo` is set, the (flattened) batch consists of the
+        points of a scrambled Sobol sequence of dimension prod(event_shape)
+        (randomized quasi-Monte Carlo). Subsamples of contiguous inner batches,
+        e.g. the conditional draws for a single observation, are then
+        well-spaced as well. The points are shuffled within the innermost
+        batch dimension: Otherwise, the leading digits of separately drawn
+        sequences would coincide despite their scrambling, which would make
+        draws dependent. Scrambling and shuffling are seeded by torch's RNG.
+        """
+        if not self.quasi_monte_carlo:
+            return torch.empty([*batch_sizes, *event_shape], device=device, dtype=dtype) \
+                .uniform_(low, high)
+
+        seed = int(torch.randint(2**31 - 1, (1,)))
+        sobol_engine = torch.quasirandom.SobolEngine(prod(event_shape), scramble=True, seed=seed)
+        points = sobol_engine.draw(prod(batch_sizes), dtype=dtype).view(*batch_sizes, -1)
+        permutation = torch.rand(batch_sizes).argsort(dim=-1)
+        points = points.gather(-2, permutation.unsqueeze(-1).expand_as(points)) \
+            .view(*batch_sizes, *event_shape).to(device)
+        return (high - low) * points + low
 
     def _parse_batch_sizes_arg(self, batch_sizes_argument: Union[int , List[int] , None]) -> List[int]:
         """Parses an integer batch_size_argument into a list. If none given,
@@ -147,6 +174,14 @@ class ValuationObservationSampler(ABC):
             player_position=player_position, minimum_number_of_points=minimum_number_of_points,
             dtype=dtype, device=device, support_bounds=support_bounds)
 
+    def project_onto_action_grid(self, player_position: int, actions: torch.Tensor) -> torch.Tensor:
+        """Maps actions of shape (*batch_sizes, action_size), e.g. refinements
+        of points of `generate_action_grid`, onto the (non-rectangular)
+        constraints of that grid. The default grid is rectangular, s.t. the
+        actions are returned as they are.
+        """
+        return actions
+
     def generate_cell_partition(self, player_position: int, grid_size: int,
                                 dtype=torch.float, device=None):
         """Generate a rectangular grid partition of the valuation/observation
@@ -252,6 +287,15 @@ class FlushedWrappedSampler(ValuationObservationSampler):
         # seems to work fine.
         self.support_bounds[:, -flush_val_dims:, :] = 0.0
 
+    @property
+    def quasi_monte_carlo(self) -> bool:
+        """Whether the base sampler draws scrambled Sobol points."""
+        return self._base_sampler.quasi_monte_carlo
+
+    @quasi_monte_carlo.setter
+    def quasi_monte_carlo(self, value: bool):
+        self._base_sampler.quasi_monte_carlo = value
+
     def draw_profiles(self, batch_sizes: Union[int, List[int]] = None,
         device=None) -> Tuple[torch.Tensor, torch.Tensor]:
         v, o = self._base_sampler.draw_profiles(
@@ -318,6 +362,16 @@ class CompositeValuationObservationSampler(ValuationObservationSampler):
         super().__init__(n_players, valuation_size, observation_size, support_bounds,
                          default_batch_size, default_device)
 
+    @property
+    def quasi_monte_carlo(self) -> bool:
+        """Whether the group samplers draw scrambled Sobol points."""
+        return all(sampler.quasi_monte_carlo for sampler in self.group_samplers)
+
+    @quasi_monte_carlo.setter
+    def quasi_monte_carlo(self, value: bool):
+        for sampler in self.group_samplers:
+            sampler.quasi_monte_carlo = value
+
     def draw_profiles(self, batch_sizes: int or List[int] = None, device=None) -> Tuple[torch.Tensor, torch.Tensor]:
         """Draws and returns a batch of valuation and observation profiles.
 
@@ -440,6 +494,16 @@ class CompositeValuationObservationSampler(ValuationObservationSampler):
                     kwargs['player_position'] =  pos - sum(self.group_sizes[:g])  # i's relative position in subgroup
                     return self.group_samplers[g].generate_action_grid(**kwargs)
 
+    def project_onto_action_grid(self, player_position: int, actions: torch.Tensor) -> torch.Tensor:
+        """Possibly need to call specific sampling"""
+        for g in range(self.n_groups):  # iterate over groups
+            player_positions = self.group_indices[g]  # player_positions within group
+            for pos in player_positions:
+                if player_position == pos:
+                    # i's relative position in subgroup
+                    return self.group_samplers[g].project_onto_action_grid(
+                        pos - sum(self.group_sizes[:g]), actions)
+
     def generate_cell_partition(self, **kwargs) -> torch.Tensor:
         """Possibly need to call specific sampling"""
         for g in range(self.n_groups):  # iterate over groups
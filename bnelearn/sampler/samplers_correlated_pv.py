@@ -81,15 +81,23 @@ class CorrelatedSymmetricUniformPVSampler(PVSampler, ABC):
         batch_sizes = self._parse_batch_sizes_arg(batch_sizes)
         device = device or self.default_device
 
-        individual_components = torch.empty(
-            [*batch_sizes, self.n_players, self.valuation_size],
-            device = device) \
-            .uniform_(self.u_lo, self.u_hi)
+        if self.quasi_monte_carlo:
+            # draw all components from a single Sobol sequence
+            components = self._draw_uniform(
+                batch_sizes, [self.n_players + 1, self.valuation_size], device,
+                self.u_lo, self.u_hi)
+            individual_components = components[..., :-1, :]
+            common_component = components[..., -1:, :]
+        else:
+            individual_components = torch.empty(
+                [*batch_sizes, self.n_players, self.valuation_size],
+                device = device) \
+                .uniform_(self.u_lo, self.u_hi)
 
-        common_component = torch.empty(
-            [*batch_sizes, 1, self.valuation_size],
-            device = device) \
-            .uniform_(self.u_lo, self.u_hi)
+            common_component = torch.empty(
+                [*batch_sizes, 1, self.valuation_size],
+                device = device) \
+                .uniform_(self.u_lo, self.u_hi)
 
         w = self._get_weights(batch_sizes, device)
 
@@ -110,9 +118,15 @@ class BernoulliWeightsCorrelatedSymmetricUniformPVSampler(CorrelatedSymmetricUni
         Returns:
             w: Tensor of shape (*batch_sizes, 1, 1)
         """
-        return (torch.empty(batch_sizes, device=device)
-                .bernoulli_(self.gamma) # different weight per batch
-                .view(*batch_sizes, 1, 1)) # same weight across item/bundle in each batch-instance
+        return self._draw_bernoulli(batch_sizes, device) \
+            .view(*batch_sizes, 1, 1) # same weight across item/bundle in each batch-instance
+
+    def _draw_bernoulli(self, batch_sizes: List[int], device: Device) -> torch.Tensor:
+        """Draws Bernoulli(gamma) weights of shape `batch_sizes`, from
+        scrambled Sobol points in QMC mode."""
+        if self.quasi_monte_carlo:
+            return (self._draw_uniform(batch_sizes, [], device) < self.gamma).float()
+        return torch.empty(batch_sizes, device=device).bernoulli_(self.gamma) # different weight per batch
 
     def draw_conditional_profiles(self, conditioned_player: int,
                                   conditioned_observation: torch.Tensor,
@@ -125,10 +139,8 @@ class BernoulliWeightsCorrelatedSymmetricUniformPVSampler(CorrelatedSymmetricUni
         # let i be the index of the player conditioned on.
         i = conditioned_player
 
-        # repeat each entry of conditioned_observation inner_batch_size times.
-        v_i = conditioned_observation \
-            .view(*outer_batch_sizes, 1, observation_size) \
-            .repeat(*([1] * len(outer_batch_sizes)), inner_batch_size, 1)
+        # broadcast each entry of conditioned_observation over the inner batch.
+        v_i = conditioned_observation.view(*outer_batch_sizes, 1, observation_size)
 
         # each observation v_i has a probability of self.gamma of being the
         # common component v_i=s, and (1-self.gamma) of being the player's
@@ -140,10 +152,9 @@ class BernoulliWeightsCorrelatedSymmetricUniformPVSampler(CorrelatedSymmetricUni
         # Start by sampling these (and overwriting ith entry with actual obs.)
         # (ith's entry is technically incorrect, but the cases
         # where v_i != z_i are disregarded by the weights drawn below.)
-        z = torch.empty([*outer_batch_sizes,inner_batch_size,
-                         self.n_players,
-                         self.valuation_size], device = device) \
-            .uniform_(self.u_lo, self.u_hi)
+        z = self._draw_uniform([*outer_batch_sizes, inner_batch_size],
+                               [self.n_players, self.valuation_size], device,
+                               self.u_lo, self.u_hi)
         z[...,i,:] = v_i
 
         # NOTE: with our current test (e.g. testing correlation matrix
@@ -152,13 +163,15 @@ class BernoulliWeightsCorrelatedSymmetricUniformPVSampler(CorrelatedSymmetricUni
         # batch, otherwise, we'll always end up perfectly correlated, or not
         # at all, rather than the correct amount.
 
-        w = torch.empty([*outer_batch_sizes, inner_batch_size, 1, 1], device=device) \
-            .bernoulli_(self.gamma)
+        w = self._draw_bernoulli([*outer_batch_sizes, inner_batch_size], device) \
+            .view(*outer_batch_sizes, inner_batch_size, 1, 1)
 
         # sample valuations directly:
         # either individual component of each player z_j,
         # or common component s=v_i, which we stored in the ith entry of the z tensor
-        v = (1-w)*z + w * z[...,[i],:]
+        # (computed in-place, s.t. only a single full profile is allocated)
+        s = z[...,[i],:].clone()
+        v = z.mul_(1-w).add_(w * s)
 
         # private values setting: observations = valuations
         return v, v
@@ -198,24 +211,21 @@ class ConstantWeightCorrelatedSymmetricUniformPVSampler(CorrelatedSymmetricUnifo
         # let i be the index of the player conditioned on.
         i = conditioned_player
 
-        # repeat each entry of conditioned_observation inner_batch_size times.
+        # broadcast each entry of conditioned_observation over the inner batch.
         v_i = (conditioned_observation
-               .to(device)
                # add a dim for inner_batch after outer_batch dim(s)
                # (dim before the last dim which is val_size)
                .unsqueeze(-2)
-               .repeat(*([1] * len(outer_batch_sizes)), inner_batch_size, 1)
+               .expand(*outer_batch_sizes, inner_batch_size, observation_size)
                )
 
         # individual components z_j are conditionally independent of z_i.
         # start by sampling these (and overwriting ith entry with actual obs.)
 
         # create repeated entries for conditioned_player
-        z = torch.empty([*outer_batch_sizes,
-                         inner_batch_size,
-                         self.n_players,
-                         self.valuation_size], device = device) \
-            .uniform_(self.u_lo, self.u_hi)
+        z = self._draw_uniform([*outer_batch_sizes, inner_batch_size],
+                               [self.n_players, self.valuation_size], device,
+                               self.u_lo, self.u_hi)
         z[..., i, :] = self._draw_z_given_v(v_i)
 
         # we have
@@ -223,8 +233,9 @@ class ConstantWeightCorrelatedSymmetricUniformPVSampler(CorrelatedSymmetricUnifo
         #     = w*( 1/w*(v_i - (1-w)*z_i) ) + (1-w)z_j
         #     = v_i + (1-w)*(z_j - z_i)
 
-        v =(1 - self._weight)*(z - z[...,[i],:]) + \
-            v_i.view(*outer_batch_sizes, inner_batch_size, 1, self.valuation_size)
+        # (computed in-place, s.t. only a single full profile is allocated)
+        z_i = z[...,[i],:].clone()
+        v = z.sub_(z_i).mul_(1 - self._weight).add_(v_i.unsqueeze(-2))
 
         # private values setting: observations = valuations
         return v, v
@@ -259,15 +270,15 @@ class ConstantWeightCorrelatedSymmetricUniformPVSampler(CorrelatedSymmetricUnifo
         # but we still need a separate implementation of the interface to
         # avoid division by 0 (as gama=1 implies w=1).
         if self.gamma == 1.0:
-            return torch.empty_like(v) \
-                .uniform_(self.u_lo, self.u_hi)
+            return self._draw_uniform(v.shape[:-1], v.shape[-1:], device,
+                                      self.u_lo, self.u_hi, v.dtype)
 
         # the conditional V_1 is uniformly distributed on [lower, upper] below:
         w = self._weight.to(device)
         lower = torch.max(self.u_lo*torch.ones_like(v), (v - w*self.u_hi)/(1 - w))
         upper = torch.min(self.u_hi*torch.ones_like(v), (v - w*self.u_lo)/(1 - w))
 
-        return (upper - lower) * torch.empty_like(v).uniform_(0,1) + lower
+        return (upper - lower) * self._draw_uniform(v.shape[:-1], v.shape[-1:], device, dtype=v.dtype) + lower
 
 
 class LocalGlobalCompositePVSampler(CompositeValuationObservationSampler):
@@ -12,6 +12,7 @@ from math import ceil, log
 import torch
 from torch.cuda import _device_t as Device
 from torch.distributions import Distribution
+from scipy.special import betaincinv
 from .base import IPVSampler
 
 from bnelearn.util.distribution_util import copy_dist_to_device
@@ -98,6 +99,11 @@ class SymmetricIPVSampler(IPVSampler):
         batch_sizes = self._parse_batch_sizes_arg(batch_sizes)
         device = device or self.default_device
 
+        if self.quasi_monte_carlo:
+            # inverse CDF of scrambled Sobol points
+            u = self._draw_uniform(batch_sizes, [self.n_players, self.valuation_size], device)
+            return copy_dist_to_device(self.distribution, device).icdf(u)
+
         return copy_dist_to_device(self.distribution, device).sample(batch_sizes)
 
     def draw_conditional_profiles(self,
@@ -115,10 +121,9 @@ class SymmetricIPVSampler(IPVSampler):
 
         profile = self._sample([*outer_batch_sizes, inner_batch_size], device)
 
+        # broadcast the observations over the inner batch (without copying them)
         profile[..., conditioned_player, :] = \
-            conditioned_observation \
-                .view(*outer_batch_sizes, 1, observation_size) \
-                .repeat(*([1]*len(outer_batch_sizes)), inner_batch_size, 1)
+            conditioned_observation.view(*outer_batch_sizes, 1, observation_size)
 
         return profile, profile
 
@@ -137,9 +142,9 @@ class UniformSymmetricIPVSampler(SymmetricIPVSampler):
         batch_sizes = self._parse_batch_sizes_arg(batch_sizes)
 
         # create an empty tensor on the output device, then sample in-place
-        return torch.empty(
-            [*batch_sizes, self.n_players, self.valuation_size],
-            device=device).uniform_(self.base_distribution.low, self.base_distribution.high)
+        return self._draw_uniform(
+            batch_sizes, [self.n_players, self.valuation_size], device,
+            self.base_distribution.low, self.base_distribution.high)
 
 
 class GaussianSymmetricIPVSampler(SymmetricIPVSampler):
@@ -154,6 +159,13 @@ class GaussianSymmetricIPVSampler(SymmetricIPVSampler):
 
     def _sample(self, batch_sizes, device) -> torch.Tensor:
         batch_sizes = self._parse_batch_sizes_arg(batch_sizes)
+
+        if self.quasi_monte_carlo:
+            # inverse CDF of scrambled Sobol points, clip
+            u = self._draw_uniform(batch_sizes, [self.n_players, self.valuation_size], device)
+            return (self.base_distribution.scale * torch.special.ndtri(u)
+                    + self.base_distribution.loc).relu_()
+
         # create empty tensor, sample in-place, clip
         return torch.empty([*batch_sizes, self.n_players, self.valuation_size],
                            device=device) \
@@ -175,6 +187,15 @@ class BetaSymmetricIPVSampler(SymmetricIPVSampler):
         batch_sizes = self._parse_batch_sizes_arg(batch_sizes)
         # create empty tensor, sample in-place, clip
         size = [self.n_players, self.valuation_size]
+
+        if self.quasi_monte_carlo:
+            # inverse CDF of scrambled Sobol points (not available in torch)
+            u = self._draw_uniform(batch_sizes, size, 'cpu', dtype=torch.double)
+            return torch.from_numpy(betaincinv(
+                self.base_distribution.concentration1.item(),
+                self.base_distribution.concentration0.item(),
+                u.numpy())).float().to(device)
+
         return self.base_distribution.expand(size) \
             .rsample([*batch_sizes]).to(device)
 
@@ -258,6 +279,10 @@ class MultiUnitValuationObservationSampler(UniformSymmetricIPVSampler):
         # transform to triangular grid (valuations are marginally descending)
         return rectangular_grid.sort(dim=1, descending=True)[0].unique(dim=0)
 
+    def project_onto_action_grid(self, player_position: int, actions: torch.Tensor) -> torch.Tensor:
+        """Like the grid, actions are marginally descending."""
+        return actions.sort(dim=-1, descending=True)[0]
+
     def generate_cell_partition(self, player_position: int, grid_size: int,
                                 dtype=torch.float, device=None):
         raise NotImplementedError('Cell partition not implemented for multi-unit auctions (b/c not rectangular).')
@@ -278,8 +303,9 @@ class SplitAwardValuationObservationSampler(UniformSymmetricIPVSampler):
         batch_sizes = self._parse_batch_sizes_arg(batch_sizes)
 
         # create an empty tensor on the output device, then sample in-place
-        sample = torch.empty([*batch_sizes, self.n_players, 2], device=device) \
-            .uniform_(self.base_distribution.low, self.base_distribution.high)
+        sample = self._draw_uniform(
+            batch_sizes, [self.n_players, 2], device,
+            self.base_distribution.low, self.base_distribution.high)
         sample[..., 0] = sample[..., 1] * self.efficiency_parameter
         return sample
 
@@ -48,14 +48,22 @@ class MineralRightsValuationObservationSampler(ValuationObservationSampler):
         batch_sizes = self._parse_batch_sizes_arg(batch_sizes)
         device = device or self.default_device
 
-        common_value = (self._common_value_hi - self._common_value_lo) * \
-            torch.empty([*batch_sizes, 1, self.valuation_size],
-                        device=device).uniform_() + \
+        if self.quasi_monte_carlo:
+            # draw common value and individual factors from a single Sobol sequence
+            u = self._draw_uniform(batch_sizes, [self.n_players + 1, self.valuation_size], device)
+            common_value, individual_factors = u[..., :1, :], u[..., 1:, :]
+        else:
+            common_value = torch.empty([*batch_sizes, 1, self.valuation_size],
+                                       device=device).uniform_()
+            individual_factors = None
+
+        common_value = (self._common_value_hi - self._common_value_lo) * common_value + \
             self._common_value_lo
 
         valuations = common_value.repeat([*([1]*len(batch_sizes)), self.n_players, 1])
 
-        individual_factors = torch.empty_like(valuations).uniform_()
+        if individual_factors is None:
+            individual_factors = torch.empty_like(valuations).uniform_()
         observations = 2*individual_factors*common_value
 
         return valuations, observations
@@ -75,27 +83,18 @@ class MineralRightsValuationObservationSampler(ValuationObservationSampler):
         # shorthands
         i = conditioned_player
 
-        v = self._draw_v_given_o(conditioned_observation, inner_batch)
+        v = self._draw_v_given_o(conditioned_observation, inner_batch).to(device)
 
-        valuations = v.to(device) \
-                      .view(*outer_batch_sizes, inner_batch, 1, observation_size) \
-                      .repeat(*([1]*len(outer_batch_sizes)), 1, self.n_players, 1)
+        # draw individual factors, then scale them to observations in-place
+        observations = self._draw_uniform(
+            [*outer_batch_sizes, inner_batch], [self.n_players, observation_size], device)
+        observations.mul_(2*v.unsqueeze(-2))
+        # overwrite for i (this also avoids computing i's individual factor
+        # o_i/(2v), which is 0/0 when o_i == 0 and u_lo == 0)
+        observations[..., i, :] = conditioned_observation.unsqueeze(-2)
 
-        # draw individual factors, then overwrite for i
-        x = torch.empty(
-            [*outer_batch_sizes, inner_batch, self.n_players, observation_size],
-            device=device).uniform_()
-        x[..., i, :] = conditioned_observation \
-            .unsqueeze(-2) \
-            .repeat(*([1]*len(outer_batch_sizes)), inner_batch, 1) / (2*v)
-        # previous operation introduces NaNs when cond_observation == 0
-        # and u_lo ==0 ==> v == 0, thus x/v = 0/0.
-        # in this case, we set x to 0.
-        # this should only happen for player i, if it happens somewhere else,
-        # we don't overwrite to avoid missing errors downstream.
-        x[...,i,:][x[...,i,:].isnan()] = 0.0
-
-        observations = 2*valuations*x
+        # same valuations for all agents: broadcast view, not a copy
+        valuations = v.unsqueeze(-2).expand_as(observations)
 
         return valuations, observations
 
@@ -113,9 +112,10 @@ class MineralRightsValuationObservationSampler(ValuationObservationSampler):
                 on same device as o_i
         """
 
-        *outer_batch_sizes, _ = o_i.shape
+        *outer_batch_sizes, valuation_size = o_i.shape
 
-        o_i = o_i.unsqueeze(-2).repeat(*([1]*len(outer_batch_sizes)), inner_batch_size, 1)
+        # broadcast o_i over the inner batch
+        o_i = o_i.unsqueeze(-2)
 
         # Let o = 2*v*x where v is U[lo,hi], x is U[0,1]. Then
         #  1. f(o|v) ∝ 1/v on [0, 2v]
@@ -130,8 +130,9 @@ class MineralRightsValuationObservationSampler(ValuationObservationSampler):
         lo = torch.max(o_i/2, torch.zeros_like(o_i) + self._common_value_lo)
         hi = torch.zeros_like(o_i) + self._common_value_hi
 
-        u = torch.empty_like(o_i).uniform_()
-        v = (u* hi.log() + (1-u) * lo.log()).exp()
+        u = self._draw_uniform([*outer_batch_sizes, inner_batch_size], [valuation_size],
+                               o_i.device, dtype=o_i.dtype)
+        v = (1-u).mul_(lo.log()).add_(u.mul_(hi.log())).exp_()
         # alternative form of the same: v= b**u * a**(1-u). Which is faster/more stable?
 
         return v
@@ -197,8 +198,8 @@ class AffiliatedValuationObservationSampler(ValuationObservationSampler):
         batch_sizes = self._parse_batch_sizes_arg(batch_sizes)
         device = device or self.default_device
 
-        z_and_s = torch.empty([*batch_sizes, self.n_players+1, self.valuation_size],
-                              device=device).uniform_(self._u_lo, self._u_hi)
+        z_and_s = self._draw_uniform(batch_sizes, [self.n_players+1, self.valuation_size],
+                                     device, self._u_lo, self._u_hi)
 
         weights_v = torch.column_stack([torch.ones([self.n_players]*2, device = device) / self.n_players,
                                        torch.ones([self.n_players, 1], device=device)])
@@ -224,9 +225,8 @@ class AffiliatedValuationObservationSampler(ValuationObservationSampler):
         assert observation_size == self.valuation_size
 
         i = conditioned_player
-        o_i = conditioned_observation \
-            .view(*outer_batch_sizes, 1, observation_size) \
-            .repeat(*([1]*len(outer_batch_sizes)), inner_batch_size, 1)
+        # broadcast o_i over the inner batch
+        o_i = conditioned_observation.view(*outer_batch_sizes, 1, observation_size)
 
         # S|o_i is uniform on [max(lo, o-hi),  min(hi, o-lo)]
         # z_i = o_i - s
@@ -239,20 +239,20 @@ class AffiliatedValuationObservationSampler(ValuationObservationSampler):
         s_lo = torch.max(lo, o_i - hi)
         s_hi = torch.min(hi, o_i - lo)
 
-        s = (s_hi - s_lo) * torch.empty_like(o_i).uniform_() + s_lo
+        s = (s_hi - s_lo) * self._draw_uniform([*outer_batch_sizes, inner_batch], [observation_size],
+                                               o_i.device, dtype=o_i.dtype) + s_lo
 
         #sample for all players then overwrite for i
-        z = torch.empty(
-            [*outer_batch_sizes, inner_batch, self.n_players, self.valuation_size],
-            device = device).uniform_(self._u_lo, self._u_hi)
-        z[..., i, :] = (o_i - s).view_as(z[..., i, :])
+        z = self._draw_uniform(
+            [*outer_batch_sizes, inner_batch], [self.n_players, self.valuation_size],
+            device, self._u_lo, self._u_hi)
+        z[..., i, :] = o_i - s
 
-        observations = z + s.view(*outer_batch_sizes, inner_batch, 1, self.valuation_size)
         valuations = torch.sum(z, dim=-2) / self.n_players + s
+        # observations are computed in-place, s.t. only one full profile is allocated
+        observations = z.add_(s.view(*outer_batch_sizes, inner_batch, 1, self.valuation_size))
 
-        # same valuations for all agents
-        valuations = valuations \
-            .view(*outer_batch_sizes, inner_batch, 1, self.valuation_size) \
-            .repeat(*([1]*len(outer_batch_sizes)), 1, self.n_players, 1)
+        # same valuations for all agents: broadcast view, not a copy
+        valuations = valuations.unsqueeze(-2).expand_as(observations)
 
         return valuations, observations
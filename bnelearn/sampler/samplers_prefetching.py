@@ -0,0 +1,174 @@
+"""This module implements a sampler wrapper that draws profiles of its base
+sampler ahead of time in a background process."""
+
+import pickle
+import queue
+from typing import List, Tuple, Union
+import torch
+import torch.multiprocessing as mp
+from torch.cuda import _device_t as Device
+from .base import ValuationObservationSampler
+
+
+class PrefetchingSampler(ValuationObservationSampler):
+    """A sampler that draws the next `n_prefetch` batches of profiles of a
+    base sampler in a background process, into a ring buffer of preallocated
+    shared-memory tensors. Drawing a batch of the prefetched size then only
+    requires a copy out of the buffer (to the requested device).
+
+    All other requests (other batch sizes, conditional profiles, grids) are
+    delegated to the base sampler.
+
+    Each prefetched batch `k` is drawn after seeding with `seed + k`, where
+    the base seed is drawn from torch's RNG on construction. The batches thus
+    only depend on the global seed, not on the timing of the background
+    process.
+
+    Call `close` to stop the background process.
+    """
+
+    def __init__(self, base_sampler: ValuationObservationSampler,
+                 n_prefetch: int = 2, batch_size: int = None):
+        """
+        Args:
+            base_sampler: The `ValuationObservationSampler` to prefetch profiles
+                from. It must be picklable and able to draw on the cpu.
+            n_prefetch (int): the number of batches drawn ahead of time.
+            batch_size (int): the batch size that is prefetched, defaults to
+                the `default_batch_size` of the base sampler.
+        """
+        # pylint: disable = super-init-not-called (This is by design.)
+
+        self.base_sampler = base_sampler
+
+        self.n_players = base_sampler.n_players
+        self.valuation_size = base_sampler.valuation_size
+        self.observation_size = base_sampler.observation_size
+        self.default_batch_size = batch_size or base_sampler.default_batch_size
+        self.default_device = base_sampler.default_device
+        self.support_bounds = base_sampler.support_bounds
+
+        self.n_prefetch = n_prefetch
+        self._seed = int(torch.randint(2**62, (1,)))
+        self._n_drawn = 0
+
+        # ring buffer of prefetched batches
+        self._valuations = torch.empty(
+            [n_prefetch, self.default_batch_size, self.n_players, self.valuation_size]
+            ).share_memory_()
+        self._observations = torch.empty(
+            [n_prefetch, self.default_batch_size, self.n_players, self.observation_size]
+            ).share_memory_()
+
+        # Only the ring buffer is shared, the base sampler is copied (by
+        # regular pickling, s.t. its tensors aren't moved to shared memory)
+        context = mp.get_context('spawn')
+        self._requests = context.SimpleQueue()
+        self._ready = context.Queue()
+        self._worker = context.Process(
+            target=_prefetch_profiles, daemon=True,
+            args=(pickle.dumps(base_sampler), self._valuations, self._observations,
+                  self._seed, self._requests, self._ready))
+        self._worker.start()
+
+        for k in range(n_prefetch):
+            self._requests.put(k)
+
+    @property
+    def quasi_monte_carlo(self) -> bool:
+        """Whether the base sampler draws scrambled Sobol points."""
+        return self.base_sampler.quasi_monte_carlo
+
+    def draw_profiles(self, batch_sizes: Union[int, List[int]] = None,
+                      device: Device = None) -> Tuple[torch.Tensor, torch.Tensor]:
+        batch_sizes = self._parse_batch_sizes_arg(batch_sizes)
+        device = device or self.default_device
+
+        if list(batch_sizes) != [self.default_batch_size] or self._worker is None:
+            return self.base_sampler.draw_profiles(batch_sizes, device)
+
+        k = self._get_ready_batch()
+        if isinstance(k, Exception):
+            raise RuntimeError('Prefetching profiles failed.') from k
+        assert k == self._n_drawn, "prefetched batches out of order."
+
+        slot = k % self.n_prefetch
+        valuations = self._valuations[slot].to(device, copy=True)
+        observations = self._observations[slot].to(device, copy=True)
+
+        # the slot can be refilled
+        self._requests.put(k + self.n_prefetch)
+        self._n_drawn += 1
+
+        return valuations, observations
+
+    def _get_ready_batch(self):
+        """Waits for the next prefetched batch and returns its index (or the
+        exception raised while drawing it)."""
+        while True:
+            try:
+                return self._ready.get(timeout=1)
+            except queue.Empty:
+                if not self._worker.is_alive():
+                    raise RuntimeError('Prefetching process died unexpectedly.') from None
+
+    def draw_conditional_profiles(self,
+                                  conditioned_player: int,
+                                  conditioned_observation: torch.Tensor,
+                                  inner_batch_size: int,
+                                  device: Device = None) -> Tuple[torch.Tensor, torch.Tensor]:
+        return self.base_sampler.draw_conditional_profiles(
+            conditioned_player, conditioned_observation, inner_batch_size, device)
+
+    def generate_valuation_grid(self, *args, **kwargs) -> torch.Tensor:
+        return self.base_sampler.generate_valuation_grid(*args, **kwargs)
+
+    def generate_reduced_grid(self, *args, **kwargs) -> torch.Tensor:
+        return self.base_sampler.generate_reduced_grid(*args, **kwargs)
+
+    def generate_action_grid(self, *args, **kwargs) -> torch.Tensor:
+        return self.base_sampler.generate_action_grid(*args, **kwargs)
+
+    def project_onto_action_grid(self, *args, **kwargs) -> torch.Tensor:
+        return self.base_sampler.project_onto_action_grid(*args, **kwargs)
+
+    def generate_cell_partition(self, *args, **kwargs):
+        return self.base_sampler.generate_cell_partition(*args, **kwargs)
+
+    def close(self):
+        """Stops the background process. Afterwards, all requests are
+        delegated to the base sampler."""
+        if self._worker is None:
+            return
+        self._requests.put(None)
+        self._worker.join(timeout=10)
+        if self._worker.is_alive():
+            self._worker.terminate()
+        self._worker = None
+
+    def __del__(self):
+        if getattr(self, '_worker', None) is not None and self._worker.pid is not None:
+            self.close()
+
+
+def _prefetch_profiles(pickled_sampler: bytes,
+                       valuations: torch.Tensor, observations: torch.Tensor,
+                       seed: int, requests, ready):
+    """Background loop of `PrefetchingSampler`: draws the requested batches
+    into their slots of the ring buffer until `None` is requested."""
+    torch.set_num_threads(1)
+    sampler: ValuationObservationSampler = pickle.loads(pickled_sampler)
+    n_slots, batch_size, _, _ = valuations.shape
+    while True:
+        k = requests.get()
+        if k is None:
+            break
+        try:
+            torch.manual_seed(seed + k)
+            v, o = sampler.draw_profiles(batch_size, device='cpu')
+            valuations[k % n_slots] = v
+            observations[k % n_slots] = o
+        except Exception as e:  # pylint: disable=broad-except
+            ready.put(e)
+            break
+        ready.put(k)
@@ -6,16 +6,16 @@ import math
 from abc import ABC, abstractmethod
 from copy import copy
 from typing import Callable, Iterable, List
-import os
-import sys
 import warnings
 
 import torch
 import torch.nn as nn
 from torch.distributions.categorical import Categorical
+from torch.nn.utils import parameters_to_vector, vector_to_parameters
 from tqdm import tqdm
 
 from bnelearn.mechanism import Game, MatrixGame
+from bnelearn.util.process_pool import get_process_pool
 from bnelearn.util.tensor_util import GaussLayer, UniformLayer
 
 ## E1102: false positive on torch.tensor()
@@ -52,11 +52,6 @@ class ClosureStrategy(Strategy):
         self.parallel = parallel
         self._mute = mute
 
-    def __mute(self):
-        """suppresses stderr output from workers (avoid integration warnings for each process)"""
-        if self._mute:
-            sys.stderr = open(os.devnull, 'w')
-
     def play(self, inputs, deterministic: bool = False):
         pool_size = 1
 
@@ -69,13 +64,12 @@ class ClosureStrategy(Strategy):
             in_device = inputs.device
 
             # calculate necessary shape by calling closure once for a single input
-            _, *other_dims = self.closure(inputs[:1]).shape
+            probe = self.closure(inputs[:1])
+            _, *other_dims = probe.shape
             out_shape = torch.Size([inputs.shape[0], *other_dims])
 
             # determine chunk-size -----
-            # if providing the tensor by itself, pool.map will iterate over individual elements
-            # and just communicate multiple of those elements to a worker at once.
-            # so instead, we'll split the tensor into a list of tensors ourselves and provide that
+            # we split the tensor into a list of chunks ourselves and provide that
             # as the iterator.
             # we'll use the same chunk-size heuristic as in python.multiprocessing
             # see https://stackoverflow.com/questions/53751050
@@ -83,27 +77,33 @@ class ClosureStrategy(Strategy):
             if extra:
                 chunksize += 1
 
-            # move input to cpu and split into chunks
-            split_tensor = inputs.cpu().split(chunksize)
+            # move a copy of the input to shared memory (`.cpu()` would share the
+            # caller's own tensor) and split it into chunks, the workers write
+            # their results directly into a shared output tensor
+            split_tensor = inputs.detach().cpu().clone().share_memory_().split(chunksize)
+            result = torch.empty(out_shape, dtype=probe.dtype).share_memory_()
+            split_result = result.split(chunksize)
             n_chunks = len(split_tensor)
 
             #torch.multiprocessing.set_sharing_strategy('file_system') # needed for very large number of chunks
 
-            with torch.multiprocessing.Pool(pool_size, initializer=self.__mute) as p:
-                # as we handled chunks ourselves, each element of our list should be an individual chunk,
-                # so the pool.map will get argument chunksize=1
-                # The following code is wrapped to produce progess bar, without it simplifies to:
-                # result = p.map(self.closure, split_tensor, chunksize=1)
-                result = list(tqdm(
-                    p.imap(self.closure, split_tensor, chunksize=1),
+            # the pool is reused across calls until `shutdown_process_pools` is called
+            p = get_process_pool(pool_size, mute_stderr=self._mute)
+            # as we handled chunks ourselves, each element of our list should be an individual chunk,
+            # so the pool.imap will get argument chunksize=1
+            # The following code is wrapped to produce progess bar, without it simplifies to:
+            # p.map(_play_closure_on_chunk, ..., chunksize=1)
+            for _ in tqdm(
+                    p.imap_unordered(_play_closure_on_chunk,
+                                     zip([self.closure]*n_chunks, split_tensor, split_result),
+                                     chunksize=1),
                     total = n_chunks, unit='chunks',
                     desc = 'Calculating strategy for batch_size {} with {} processes, chunk size of {}'.format(
                         inputs.shape[0], pool_size, chunksize)
-                    ))
+                    ):
+                pass
 
-            # finally stitch the tensor back together
-            result = torch.cat(result).view(out_shape).to(in_device)
-            return result
+            return result.to(in_device)
 
         # serial version on single processor
         return self.closure(inputs)
@@ -113,6 +113,13 @@ class ClosureStrategy(Strategy):
         pass
 
 
+def _play_closure_on_chunk(args):
+    """Evaluates a closure on a chunk of inputs and writes the results into the
+    corresponding (shared-memory) chunk of the output."""
+    closure, inputs, out = args
+    out.copy_(closure(inputs).view_as(out))
+
+
 class MatrixGameStrategy(Strategy, nn.Module):
     """ A dummy neural network that encodes and returns a mixed strategy"""
     def __init__(self, n_actions, init_weights = None, init_weight_normalization = False):
@@ -506,6 +513,63 @@ class NeuralNetStrategy(Strategy, nn.Module):
 
         return self.output_activation(x)
 
+    def forward_with_parameters(self, x: torch.Tensor, parameters: torch.Tensor,
+                                deterministic: bool = False, batched_inputs: bool = False) -> torch.Tensor:
+        """Evaluates the network for a whole population of parameter vectors in
+        one stacked forward pass, without creating copies of the model.
+
+        Args:
+            x: torch.Tensor of shape (*batch_sizes, input_length)
+            parameters: torch.Tensor of shape (*population_sizes, n_parameters),
+                where each row is a flat parameter vector in the order of
+                ``parameters_to_vector(self.parameters())``.
+            deterministic: whether mixed strategies should return their mean action.
+            batched_inputs: if True, each parameter vector gets its own inputs,
+                i.e. x has shape (*population_sizes, *batch_sizes, input_length),
+                where population dimensions of size 1 are broadcast.
+
+        Returns:
+            torch.Tensor of shape (*population_sizes, *batch_sizes, output_length)
+        """
+        *population_sizes, n_parameters = parameters.shape
+        assert n_parameters == self.n_parameters, "Parameter vectors do not match the model."
+
+        if self.res_net:
+            skip = x
+
+        # prepend singleton population dims and broadcast the batched matmuls
+        # of the linear layers over them
+        if batched_inputs:
+            n_batch_dims = x.dim() - 1 - len(population_sizes)
+        else:
+            n_batch_dims = x.dim() - 1
+            x = x.reshape(*[1] * len(population_sizes), *x.shape)
+        broadcast = [1] * (n_batch_dims - 1)
+
+        offset = 0
+        for layer in self.layers.values():
+            if isinstance(layer, nn.Linear):
+                n_out, n_in = layer.weight.shape
+                weight = parameters[..., offset:offset + n_out * n_in] \
+                    .reshape(*population_sizes, *broadcast, n_out, n_in)
+                x = torch.matmul(x, weight.transpose(-1, -2))
+                offset += n_out * n_in
+                if layer.bias is not None:
+                    x = x + parameters[..., offset:offset + n_out] \
+                        .reshape(*population_sizes, *broadcast, 1, n_out)
+                    offset += n_out
+            elif hasattr(layer, 'mixed_strategy'):
+                x = layer.forward(x, deterministic=deterministic)
+            elif any(True for _ in layer.parameters()):
+                raise NotImplementedError(f"Layer {layer} cannot be evaluated with stacked parameters.")
+            else:
+                x = layer(x)
+
+        if self.res_net:
+            x = x + skip
+
+        return self.output_activation(x)
+
     def play(self, inputs, deterministic: bool=False):
         return self.forward(inputs, deterministic)
 
@@ -520,6 +584,72 @@ class NeuralNetStrategy(Strategy, nn.Module):
 
         return grad_norm ** 0.5
 
+class EnsembleStrategy(Strategy, nn.Module):
+    """An ensemble of `NeuralNetStrategy`s of identical architecture (e.g. the
+    models of independent runs of an experiment) whose parameters are stacked
+    into a single (n_members x n_parameters) tensor, such that all members are
+    played in one batched forward pass.
+
+    The members play disjoint parts of the batch: An input batch of size
+    n_members * batch_size is split into n_members consecutive chunks, the
+    k-th of which is played by the k-th member. In an environment with that
+    batch size, each member thus plays against its own valuations and the
+    corresponding members of the other players' ensembles.
+
+    Args:
+        models: the members of the ensemble. These are not updated during
+            training, see `update_members`.
+    """
+    def __init__(self, models: List[NeuralNetStrategy]):
+        nn.Module.__init__(self)
+
+        if len(set(model.n_parameters for model in models)) != 1:
+            raise ValueError('Members of an ensemble must have identical architectures.')
+
+        # the members are not registered as submodules, such that the stacked
+        # parameters are the only parameters of the ensemble
+        self.members = list(models)
+        self.n_members = len(self.members)
+        self.input_length = self.members[0].input_length
+        self.weights = nn.Parameter(torch.stack(
+            [parameters_to_vector(model.parameters()).detach() for model in self.members]))
+        self.n_parameters = self.weights.numel()
+
+    def forward(self, x, deterministic=False):
+        return self.forward_with_parameters(x, self.weights.view(-1), deterministic)
+
+    def forward_with_parameters(self, x: torch.Tensor, parameters: torch.Tensor,
+                                deterministic: bool = False) -> torch.Tensor:
+        """Evaluates the ensemble for a population of flat parameter vectors
+        of the whole ensemble, see `NeuralNetStrategy.forward_with_parameters`.
+
+        Args:
+            x: torch.Tensor of shape (n_members * batch_size, input_length)
+            parameters: torch.Tensor of shape (*population_sizes, n_parameters)
+
+        Returns:
+            torch.Tensor of shape (*population_sizes, n_members * batch_size, output_length)
+        """
+        *population_sizes, _ = parameters.shape
+        x = x.view(*[1] * len(population_sizes), self.n_members, -1, x.shape[-1])
+        parameters = parameters.view(*population_sizes, self.n_members, -1)
+        y = self.members[0].forward_with_parameters(x, parameters, deterministic, batched_inputs=True)
+        return y.flatten(start_dim=-3, end_dim=-2)
+
+    def play(self, inputs, deterministic: bool = False):
+        return self.forward(inputs, deterministic)
+
+    def aggregate_by_member(self, values: torch.Tensor) -> torch.Tensor:
+        """Averages per-sample values of shape (*, n_members * batch_size),
+        e.g. unaggregated rewards, for each member. Returns shape (*, n_members)."""
+        return values.view(*values.shape[:-1], self.n_members, -1).mean(dim=-1)
+
+    def update_members(self):
+        """Writes the current stacked parameters back into the member models."""
+        for model, parameters in zip(self.members, self.weights.detach()):
+            vector_to_parameters(parameters.clone(), model.parameters())
+
+
 class TruthfulStrategy(Strategy, nn.Module):
     """A strategy that plays truthful valuations."""
     def __init__(self):
@@ -1,9 +1,12 @@
 """This module tests whether rewards can be calculated correctly in an environment."""
+from concurrent.futures import ThreadPoolExecutor
+
 import torch
-from bnelearn.strategy import TruthfulStrategy
+from bnelearn.strategy import TruthfulStrategy, NeuralNetStrategy, EnsembleStrategy
 from bnelearn.mechanism import FirstPriceSealedBidAuction
 from bnelearn.bidder import Bidder
 from bnelearn.environment import AuctionEnvironment
+from bnelearn.learner import PSOLearner
 from bnelearn.sampler import UniformSymmetricIPVSampler
 
 
@@ -43,4 +46,166 @@ def test_auction_environment():
     reward_0 = env.get_reward(bidders[0])
 
 
-    assert 1==1
\ No newline at end of file
+    assert 1==1
+
+
+def test_opponent_action_cache():
+    """Opponent actions are reused within an iteration and recomputed after
+    redrawing valuations or updating the opponent's parameters."""
+    sampler = UniformSymmetricIPVSampler(
+        u_lo, u_hi, n_players, valuation_size, batch_size, device
+    )
+
+    models = [NeuralNetStrategy(1, [5], [torch.nn.SELU()]).to(device) for _ in range(n_players)]
+    bidders = [strat_to_bidder(model, batch_size, i) for i, model in enumerate(models)]
+
+    env = AuctionEnvironment(
+        FirstPriceSealedBidAuction(cuda=cuda), bidders, sampler, batch_size,
+        n_players, strat_to_bidder
+    )
+
+    # count how often each bidder computes actions
+    n_calls = [0] * n_players
+    def counting(bidder):
+        get_action = bidder.get_action
+        def wrapped(*args, **kwargs):
+            n_calls[bidder.player_position] += 1
+            return get_action(*args, **kwargs)
+        return wrapped
+    for bidder in bidders:
+        bidder.get_action = counting(bidder)
+
+    reward = env.get_reward(bidders[0])
+    assert n_calls == [1, 1, 1]
+    assert torch.equal(reward, env.get_reward(bidders[0]))
+    assert n_calls == [2, 1, 1], "Opponent actions should have been cached."
+
+    # optimizer step on opponent invalidates its cached actions only
+    optimizer = torch.optim.SGD(models[1].parameters(), lr=0.1)
+    sum(p.sum() for p in models[1].parameters()).backward()
+    optimizer.step()
+    env.get_reward(bidders[0])
+    assert n_calls == [3, 2, 1]
+
+    env.draw_valuations()
+    env.get_reward(bidders[0])
+    assert n_calls == [4, 3, 2]
+
+
+def test_opponent_action_cache_pso_self_play():
+    """Cached opponent actions must be invalidated by PSO updates, which write
+    the model parameters via aliased buffers (bypassing version counters)."""
+    sampler = UniformSymmetricIPVSampler(
+        u_lo, u_hi, n_players, valuation_size, batch_size, device
+    )
+
+    models = [NeuralNetStrategy(1, [5], [torch.nn.SELU()]).to(device) for _ in range(n_players)]
+    bidders = [strat_to_bidder(model, batch_size, i) for i, model in enumerate(models)]
+
+    env = AuctionEnvironment(
+        FirstPriceSealedBidAuction(cuda=cuda), bidders, sampler, batch_size,
+        n_players, strat_to_bidder
+    )
+    hyperparams = {'swarm_size': 8, 'topology': 'global', 'reeval_frequency': 100,
+                   'inertia_weight': .5, 'cognition': .8, 'social': .8}
+    learners = [PSOLearner(model=model, environment=env, hyperparams=hyperparams,
+                           optimizer_type=torch.optim.SGD, optimizer_hyperparams={'lr': 1e-1},
+                           strat_to_player_kwargs={'player_position': i})
+                for i, model in enumerate(models)]
+
+    for _ in range(30):
+        for learner in learners:
+            learner.update_strategy()
+        reward = env.get_reward(bidders[0])
+        env.invalidate_action_cache()
+        assert torch.equal(reward, env.get_reward(bidders[0])), "Stale cached opponent actions."
+
+    # PSO's model parameters alias a row of its best positions, which are
+    # updated in place when that particle improves
+    learner = learners[1]
+    best = learner.best_fitness.argmin()
+    env.get_reward(bidders[0])
+    learner.best_position[best] += 1.
+    opponent_actions = dict(env._generate_agent_actions(exclude={0}))
+    assert torch.equal(opponent_actions[1], bidders[1].get_action(env._observations[:, 1, :])), \
+        "Stale cached opponent actions."
+
+
+def test_concurrent_rewards_in_shared_iteration():
+    """Rewards evaluated concurrently by several threads within a shared
+    iteration must match the sequentially evaluated rewards."""
+    sampler = UniformSymmetricIPVSampler(
+        u_lo, u_hi, n_players, valuation_size, batch_size, device
+    )
+
+    models = [NeuralNetStrategy(1, [5], [torch.nn.SELU()]).to(device) for _ in range(n_players)]
+    bidders = [strat_to_bidder(model, batch_size, i) for i, model in enumerate(models)]
+
+    env = AuctionEnvironment(
+        FirstPriceSealedBidAuction(cuda=cuda), bidders, sampler, batch_size,
+        n_players, strat_to_bidder, redraw_every_iteration=True
+    )
+
+    with env.shared_iteration():
+        expected = [env.get_reward(bidder).detach() for bidder in bidders]
+        env.invalidate_action_cache()
+        with ThreadPoolExecutor(max_workers=n_players) as pool:
+            rewards = list(pool.map(lambda bidder: env.get_reward(bidder).detach(), bidders * 4))
+
+    for i, reward in enumerate(rewards):
+        assert torch.equal(reward, expected[i % n_players])
+
+
+def test_get_strategies_rewards():
+    """Rewards of several candidates evaluated at once must match their
+    individually evaluated rewards."""
+    sampler = UniformSymmetricIPVSampler(
+        u_lo, u_hi, n_players, valuation_size, batch_size, device
+    )
+
+    bidders = [
+        strat_to_bidder(TruthfulStrategy(), batch_size, i)
+        for i in range(n_players)]
+
+    env = AuctionEnvironment(
+        FirstPriceSealedBidAuction(cuda=cuda), bidders, sampler, batch_size,
+        n_players, strat_to_bidder
+    )
+
+    candidates = [NeuralNetStrategy(1, [5], [torch.nn.SELU()]).to(device) for _ in range(4)]
+    expected = torch.stack([env.get_strategy_reward(c, player_position=1).detach() for c in candidates])
+
+    rewards = env.get_strategies_rewards(candidates, player_position=1).detach()
+    assert rewards.shape == torch.Size([4])
+    assert torch.allclose(rewards, expected, atol=1e-5)
+
+    parameters = torch.stack([torch.nn.utils.parameters_to_vector(c.parameters()).detach() for c in candidates])
+    rewards = env.get_strategies_rewards(parameters, player_position=1, model=candidates[0],
+                                         aggregate_batch=False)
+    assert rewards.shape == torch.Size([4, batch_size])
+    assert torch.allclose(rewards.mean(dim=-1), expected, atol=1e-5)
+
+
+def test_regularization_per_ensemble_member():
+    """Each member of an ensemble must only be penalized for its own bids."""
+    n_members = 2
+    sampler = UniformSymmetricIPVSampler(
+        u_lo, u_hi, n_players, valuation_size, n_members * batch_size, device
+    )
+    model = EnsembleStrategy([NeuralNetStrategy(1, [5], [torch.nn.SELU()]).to(device)
+                              for _ in range(n_members)])
+    bidders = [strat_to_bidder(model, n_members * batch_size, 0)] + [
+        strat_to_bidder(TruthfulStrategy(), n_members * batch_size, i) for i in range(1, n_players)]
+    env = AuctionEnvironment(
+        FirstPriceSealedBidAuction(cuda=cuda), bidders, sampler, n_members * batch_size,
+        n_players, strat_to_bidder
+    )
+
+    regularize = 0.1
+    reward = env.get_reward(bidders[0], aggregate=False).detach()
+    regularized_reward = env.get_reward(bidders[0], aggregate=False, regularize=regularize).detach()
+
+    member_mean_bids = model.aggregate_by_member(
+        model.play(env._observations[:, 0, :]).detach().view(-1))
+    assert torch.allclose(model.aggregate_by_member(reward - regularized_reward),
+                          regularize * member_mean_bids)
@@ -2,7 +2,7 @@
 import pytest
 
 import torch
-from bnelearn.mechanism import CombinatorialAuction
+from bnelearn.mechanism import CombinatorialAuction, LLLLGGAuction
 import warnings
 
 
@@ -54,7 +54,8 @@ ids, testdata = zip(*[
     ['vcg - multi-item', ('vcg', bids_2, bundles_2, expected_allocation_2, torch.tensor([[0.0, 0.0, 1.8]]))]
 ])
 
-def run_combinatorial_test(rule, device, bids, bundle, expected_allocation, expected_VCG_payments):
+def run_combinatorial_test(rule, device, bids, bundle, expected_allocation, expected_VCG_payments,
+                           solver='gurobi'):
     """Run correctness test for a given LLLLGG rule"""
     
     cuda = device == 'cuda' and torch.cuda.is_available()
@@ -62,7 +63,7 @@ def run_combinatorial_test(rule, device, bids, bundle, expected_allocation, expe
     if device == 'cuda' and not torch.cuda.is_available():
         pytest.skip("CUDA not available. skipping...")
 
-    game = CombinatorialAuction(rule = rule, cuda=cuda, bundles = bundle)
+    game = CombinatorialAuction(rule = rule, cuda=cuda, bundles = bundle, solver=solver)
     allocation, payments = game.run(bids.to(device))
 
     assert torch.equal(allocation, expected_allocation.to(device)), "Wrong allocation"
@@ -77,4 +78,55 @@ def test_combinatorial(rule,bids,bundles,expected_allocation,expected_payments,
     """ Tests allocation and payments in combinatorial auctions"""    
     run_combinatorial_test(rule, 'cpu', bids, bundles, expected_allocation, expected_payments)
     run_combinatorial_test(rule, 'cuda', bids, bundles, expected_allocation, expected_payments)
-    
\ No newline at end of file
+    
+
+
+@pytest.mark.parametrize("rule,bids,bundles,expected_allocation,expected_payments", testdata, ids=ids)
+def test_combinatorial_enumeration(rule,bids,bundles,expected_allocation,expected_payments):
+    """ Tests allocation and payments in combinatorial auctions solved by enumeration"""
+    run_combinatorial_test(rule, 'cpu', bids, bundles, expected_allocation, expected_payments,
+                           solver='enumeration')
+    run_combinatorial_test(rule, 'cuda', bids, bundles, expected_allocation, expected_payments,
+                           solver='enumeration')
+
+
+def test_combinatorial_enumeration_matches_llllgg():
+    """The general auction must give the VCG outcome of the LLLLGG auction
+    when the bidders only bid on their own bundles."""
+    # items A to H, bundles as in `LLLLGGData`
+    bundles = torch.zeros(12, 8)
+    for bundle, items in enumerate([[0, 1], [1, 2], [2, 3], [3, 4], [4, 5], [5, 6], [6, 7], [7, 0],
+                                    [0, 1, 2, 3], [4, 5, 6, 7], [2, 3, 4, 5], [6, 7, 0, 1]]):
+        bundles[bundle, items] = 1
+
+    generator = torch.Generator().manual_seed(0)
+    bids = torch.rand(2**6, 6, 2, generator=generator) * torch.tensor([1, 1, 1, 1, 2, 2]).view(1, 6, 1)
+    general_bids = torch.zeros(2**6, 6, 12)
+    for player in range(6):
+        general_bids[:, player, 2*player:2*player+2] = bids[:, player]
+
+    game = CombinatorialAuction(rule='vcg', cuda=False, bundles=bundles)
+    allocation, payments = game.run(general_bids)
+
+    llllgg_allocation, llllgg_payments = LLLLGGAuction(rule='vcg', cuda=False).run(bids)
+
+    own_allocation = torch.stack([allocation[:, player, 2*player:2*player+2] for player in range(6)], dim=1)
+    assert torch.equal(own_allocation, llllgg_allocation), "Wrong allocation"
+    assert torch.allclose(payments, llllgg_payments, atol=1e-5), "Wrong payments"
+
+
+def test_combinatorial_enumeration_size_guard(monkeypatch):
+    """Instances with too many allocations must not be enumerated."""
+    import bnelearn.mechanism.auctions_combinatorial as auctions_combinatorial
+    monkeypatch.setattr(auctions_combinatorial, 'GUROBI_AVAILABLE', False)
+
+    # 4^3 > 50 allocations
+    game = CombinatorialAuction(rule='vcg', cuda=False, bundles=bundles_2, max_enumerated_allocations=50)
+    with pytest.raises(ValueError, match='max_enumerated_allocations'):
+        game.run(bids_2)
+    with pytest.raises(ValueError, match='max_enumerated_allocations'):
+        game._feasible_allocations(3)
+
+    game.max_enumerated_allocations = 4**3
+    allocation, _ = game.run(bids_2)
+    assert torch.equal(allocation, expected_allocation_2)
@@ -3,7 +3,7 @@ import warnings
 import pytest
 import torch
 import torch.nn as nn
-from bnelearn.strategy import NeuralNetStrategy
+from bnelearn.strategy import NeuralNetStrategy, EnsembleStrategy
 from bnelearn.mechanism import StaticMechanism, StaticFunctionMechanism
 from bnelearn.bidder import Bidder
 from bnelearn.environment import AuctionEnvironment
@@ -109,6 +109,114 @@ def test_ES_learner_SGD():
     assert torch.isclose(utility_in_BNE, utility, atol=0.1), "optimizer did not learn sufficiently"
 
 
+def test_forward_with_parameters():
+    """Stacked forward pass must match forward passes of individually perturbed models."""
+    model, _, _ = set_up_environment(mechanism_auction, 2**10)
+    inputs = torch.rand(2**10, input_length, device=device) * u_hi
+
+    params_flat = nn.utils.parameters_to_vector(model.parameters()).detach()
+    population = params_flat + 0.1 * torch.randn(8, params_flat.numel(), device=device)
+
+    actions = model.forward_with_parameters(inputs, population)
+    assert actions.shape == torch.Size([8, 2**10, 1])
+
+    for candidate, candidate_actions in zip(population, actions):
+        nn.utils.vector_to_parameters(candidate, model.parameters())
+        assert torch.allclose(model(inputs), candidate_actions, atol=1e-5)
+
+
+def test_ES_learner_vectorized_population():
+    """Tests ES PG learner with population evaluated in a single batched pass."""
+    batch_size = 2**14
+    epoch = 100
+
+    optimizer_type = torch.optim.SGD
+    optimizer_hyperparams = {'lr': 1e-1, 'momentum': 0.3}
+    learner_hyperparams = {'sigma': .1, 'population_size': 32, 'scale_sigma_by_model_size': False,
+                           'vectorize_population': True}
+
+    # with this learning rate, the strategy occasionally collapses to zero bids
+    # (from which it can't recover), so the run is seeded without affecting
+    # the random state of the other tests
+    with torch.random.fork_rng():
+        torch.manual_seed(0)
+        model, bidder, env = set_up_environment(mechanism_auction, batch_size)
+        env.draw_valuations()
+
+        learner = ESPGLearner(
+            model=model, environment=env,
+            hyperparams=learner_hyperparams,
+            optimizer_type=optimizer_type,
+            optimizer_hyperparams=optimizer_hyperparams)
+
+        for e in range(epoch + 1):
+            utility = learner.update_strategy_and_evaluate_utility()
+
+    utility_in_BNE = (0.05 * torch.pow(env._valuations, 2)).mean()
+    assert torch.isclose(utility_in_BNE, utility, atol=0.1), "optimizer did not learn sufficiently"
+
+
+def test_ES_learner_noise_table():
+    """Tests ES PG learner with symmetric perturbations from a small shared
+    noise table, while logging the gradient variance."""
+    batch_size = 2**16
+    epoch = 200
+
+    optimizer_type = torch.optim.SGD
+    optimizer_hyperparams = {'lr': 1e-1, 'momentum': 0.3}
+    learner_hyperparams = {'sigma': .1, 'population_size': 32, 'scale_sigma_by_model_size': False,
+                           'symmetric_sampling': True, 'noise_table_size': 2**10}
+
+    model, bidder, env = set_up_environment(mechanism_auction, batch_size)
+    env.draw_valuations()
+
+    learner = ESPGLearner(
+        model=model, environment=env,
+        hyperparams=learner_hyperparams,
+        optimizer_type=optimizer_type,
+        optimizer_hyperparams=optimizer_hyperparams,
+        log_gradient_variance=True)
+
+    for e in range(epoch + 1):
+        utility = learner.update_strategy_and_evaluate_utility()
+
+    assert learner.gradient_variance > 0
+    utility_in_BNE = (0.05 * torch.pow(env._valuations, 2)).mean()
+    assert torch.isclose(utility_in_BNE, utility, atol=0.1), "optimizer did not learn sufficiently"
+
+
+def test_ES_learner_ensemble():
+    """Tests ES PG learner on an ensemble of models, each of which plays its
+    own part of the batch and must learn on its own."""
+    batch_size = 2**15
+    n_members = 2
+    epoch = 200
+
+    optimizer_type = torch.optim.SGD
+    optimizer_hyperparams = {'lr': 1e-1, 'momentum': 0.3}
+    learner_hyperparams = {'sigma': .1, 'population_size': 32, 'scale_sigma_by_model_size': False}
+
+    members = [set_up_environment(mechanism_auction, 2)[0] for _ in range(n_members)]
+    model = EnsembleStrategy(members)
+    _, _, env = set_up_environment(mechanism_auction, n_members * batch_size)
+    env.agents[0] = strat_to_bidder(model, n_members * batch_size)
+    env.draw_valuations()
+
+    learner = ESPGLearner(
+        model=model, environment=env,
+        hyperparams=learner_hyperparams,
+        optimizer_type=optimizer_type,
+        optimizer_hyperparams=optimizer_hyperparams)
+
+    for e in range(epoch + 1):
+        learner.update_strategy()
+
+    utilities = model.aggregate_by_member(
+        env.get_strategy_reward(model, player_position=0, aggregate_batch=False).detach())
+    utilities_in_BNE = model.aggregate_by_member(0.05 * torch.pow(env._valuations.view(1, -1), 2)).view(-1)
+    assert torch.allclose(utilities_in_BNE, utilities, atol=0.1), "optimizer did not learn sufficiently"
+
+
 def test_PG_learner_SGD():
     """Tests the standard policy gradient learner in static env.
     This does not test complete convergence but 'running in the right direction'.
@@ -1,4 +1,6 @@
 """Testing correctness of LLLLGG combinatorial auction implementations."""
+import json
+import platform
 import pytest
 import torch
 from bnelearn.mechanism import LLLLGGAuction
@@ -208,9 +210,11 @@ def test_LLLLGG(parallel, rule,bids,expected_allocation,expected_payments):
     """
     run_LLLLGG_test(parallel, rule, 'cpu', bids, expected_allocation, expected_payments, 'qpth')
     run_LLLLGG_test(parallel, rule, 'cpu', bids, expected_allocation, expected_payments, 'mpc')
+    run_LLLLGG_test(parallel, rule, 'cpu', bids, expected_allocation, expected_payments, 'enumeration')
 
     run_LLLLGG_test(parallel, rule, 'cuda', bids, expected_allocation, expected_payments, 'qpth')
     run_LLLLGG_test(parallel, rule, 'cuda', bids, expected_allocation, expected_payments, 'mpc')
+    run_LLLLGG_test(parallel, rule, 'cuda', bids, expected_allocation, expected_payments, 'enumeration')
 
 @pytest.mark.parametrize("parallel, rule,bids,expected_allocation,expected_payments", testdata, ids=ids)
 def test_LLLLGG_gurobi(parallel, rule,bids,expected_allocation,expected_payments, check_gurobi):
@@ -218,4 +222,70 @@ def test_LLLLGG_gurobi(parallel, rule,bids,expected_allocation,expected_payments
     Testing batch_size > 1, VCG 0 prices, FP, global/local winning
     """
     run_LLLLGG_test(parallel, rule, 'cpu', bids, expected_allocation, expected_payments, 'gurobi')
-    run_LLLLGG_test(parallel, rule, 'cuda', bids, expected_allocation, expected_payments, 'gurobi')
\ No newline at end of file
+    run_LLLLGG_test(parallel, rule, 'cuda', bids, expected_allocation, expected_payments, 'gurobi')
+
+def test_LLLLGG_mpc_warm_start():
+    """Warm-starting the mpc core solver from the previous (similar) bids must
+    not change the payments."""
+    torch.manual_seed(0)
+    bids = torch.rand([2**7, 6, 2])
+    perturbed_bids = (bids + 0.01*torch.randn_like(bids)).clamp(min=0)
+
+    warm_game = LLLLGGAuction(rule='nearest_vcg', core_solver='mpc', cuda=False, warm_start=True)
+    warm_game.run(bids)
+    assert warm_game._core_iterates['min_vcg_distance']['x0'].shape[0] == bids.shape[0]
+    warm_allocation, warm_payments = warm_game.run(perturbed_bids)
+
+    cold_game = LLLLGGAuction(rule='nearest_vcg', core_solver='mpc', cuda=False)
+    cold_allocation, cold_payments = cold_game.run(perturbed_bids)
+
+    assert torch.equal(warm_allocation, cold_allocation)
+    assert torch.allclose(warm_payments, cold_payments, atol=0.001)
+
+    # the warm-start state must not be shared by concurrent learner updates
+    assert not warm_game.thread_safe and cold_game.thread_safe
+
+
+def test_LLLLGG_auto_core_solver(tmp_path):
+    """The 'auto' core solver must benchmark the available solvers on a probe
+    once per batch size bucket, cache its choice and match the payments of mpc."""
+    generator = torch.Generator().manual_seed(0)
+    bids = torch.rand([2**6, 6, 2], generator=generator)
+    cache_file = tmp_path / 'core_solvers.json'
+
+    game = LLLLGGAuction(rule='nearest_vcg', core_solver='auto', cuda=False, solver_cache_file=str(cache_file))
+    benchmark, time_core_solver, benchmark_sizes = game._benchmark_core_solvers, game._time_core_solver, []
+    game._benchmark_core_solvers = lambda *args: benchmark(*args, max_probe_size=2**4, pilot_size=2**2)
+    game._time_core_solver = lambda A, *args: benchmark_sizes.append(len(A)) or time_core_solver(A, *args)
+    allocation, payments = game.run(bids)
+    assert max(benchmark_sizes) == 2**4
+
+    choices = json.loads(cache_file.read_text())
+    assert len(choices) == 1 and list(choices.values())[0] in LLLLGGAuction.core_solvers
+    assert list(choices)[0].startswith(platform.node())
+
+    _, mpc_payments = LLLLGGAuction(rule='nearest_vcg', core_solver='mpc', cuda=False).run(bids)
+    assert torch.allclose(payments.double(), mpc_payments.double(), atol=0.01)
+
+    # a new mechanism reuses the cached choice without benchmarking
+    game = LLLLGGAuction(rule='nearest_vcg', core_solver='auto', cuda=False, solver_cache_file=str(cache_file))
+    game._benchmark_core_solvers = None
+    cached_allocation, _ = game.run(bids)
+    assert torch.equal(allocation, cached_allocation)
+
+
+def test_LLLLGG_enumeration_core_solver():
+    """The 'enumeration' core solver must match the payments of mpc, also when
+    samples with more winners than it enumerates fall back to mpc."""
+    generator = torch.Generator().manual_seed(0)
+    bids = torch.rand([2**8, 6, 2], generator=generator) * torch.tensor([1., 1, 1, 1, 2, 2]).view(1, 6, 1)
+
+    _, mpc_payments = LLLLGGAuction(rule='nearest_vcg', core_solver='mpc', cuda=False).run(bids)
+    game = LLLLGGAuction(rule='nearest_vcg', core_solver='enumeration', cuda=False)
+    _, payments = game.run(bids)
+    assert torch.allclose(payments.double(), mpc_payments.double(), atol=0.001)
+
+    fallback = game._run_batch_nearest_vcg_core_enumeration
+    game._run_batch_nearest_vcg_core_enumeration = lambda *args: fallback(*args, max_winners=2)
+    _, payments = game.run(bids)
+    assert torch.allclose(payments.double(), mpc_payments.double(), atol=0.001)
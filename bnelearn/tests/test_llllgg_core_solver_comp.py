@@ -44,3 +44,4 @@ def test_LLLLGG_solver_identical_results(parallel,rule,bids, device, check_gurob
     #run_LLLLGG_test(parallel, rule, bids, device, 'gurobi','cvxpy')
     run_LLLLGG_test(parallel, rule, bids, device, 'gurobi','qpth')
     run_LLLLGG_test(parallel, rule, bids, device, 'gurobi','mpc')
+    run_LLLLGG_test(parallel, rule, bids, device, 'gurobi','enumeration')
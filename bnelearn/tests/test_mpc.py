@@ -0,0 +1,37 @@
+"""Testing the batched MPC solver for quadratic programs."""
+import pytest
+import torch
+
+from bnelearn.util.mpc import MpcSolver
+
+device = 'cuda' if torch.cuda.is_available() else 'cpu'
+
+
+def random_qps(n_batch=2**7, n_x=6, n_ineq=20, n_eq=1):
+    """Feasible, strictly convex QPs (x=0 is strictly feasible)."""
+    generator = torch.Generator().manual_seed(0)
+    M = torch.randn(n_batch, n_x, n_x, dtype=torch.double, generator=generator)
+    Q = torch.bmm(M, M.transpose(1, 2)) + torch.eye(n_x, dtype=torch.double)
+    q = torch.randn(n_batch, n_x, dtype=torch.double, generator=generator)
+    G = torch.randn(n_batch, n_ineq, n_x, dtype=torch.double, generator=generator)
+    h = torch.rand(n_batch, n_ineq, dtype=torch.double, generator=generator) + 0.1
+    A = torch.randn(n_batch, n_eq, n_x, dtype=torch.double, generator=generator)
+    b = torch.zeros(n_batch, n_eq, dtype=torch.double)
+    return tuple(tensor.to(device) for tensor in (Q, q, G, h, A, b))
+
+
+@pytest.mark.parametrize("with_equality", [True, False], ids=['eq', 'no_eq'])
+def test_mpc_reduced_kkt(with_equality):
+    """Solving the reduced KKT system must give the same solutions as solving
+    the full Jacobian."""
+    Q, q, G, h, A, b = random_qps()
+    if not with_equality:
+        A, b = None, None
+
+    x_reduced, _ = MpcSolver(reduce_kkt=True).solve(Q, q, G, h, A, b)
+    x_full, _ = MpcSolver(reduce_kkt=False).solve(Q, q, G, h, A, b)
+
+    assert torch.allclose(x_reduced, x_full, atol=1e-6)
+    assert (torch.bmm(G, x_reduced) <= h.unsqueeze(-1) + 1e-6).all(), "infeasible solution"
+    if with_equality:
+        assert torch.allclose(torch.bmm(A, x_reduced), b.unsqueeze(-1), atol=1e-6)
@@ -141,3 +141,20 @@ def test_mineral_rights(n_players, valuation_size, u_lo, u_hi):
             "Highest observation can only be caused by highest valuation."
 
     # What else can we test?
+
+
+def test_mineral_rights_conditional_profiles_are_broadcast():
+    """The common valuations of conditional profiles must be broadcast over
+    the players rather than copied, and the conditioned observations must be
+    respected exactly (also for zero observations)."""
+    n_players, valuation_size = 3, 2
+    s = vs.MineralRightsValuationObservationSampler(n_players, valuation_size)
+    conditioned_observation = torch.tensor([[0., 0.], [0.5, 1.0], [2.0, 1.5]], device=device)
+
+    cv, co = s.draw_conditional_profiles(1, conditioned_observation, 2**10)
+
+    assert cv.shape == co.shape == torch.Size([3, 2**10, n_players, valuation_size])
+    assert cv.stride(-2) == 0, "common valuations should not be copied for each player."
+    assert torch.equal(co[..., 1, :], conditioned_observation.unsqueeze(-2).expand_as(co[..., 1, :]))
+    assert not co.isnan().any() and not cv.isnan().any()
+    assert torch.all(co <= 2*cv + 1e-5)
@@ -0,0 +1,50 @@
+"""Tests drawing profiles ahead of time in the background process of the
+PrefetchingSampler."""
+
+import torch
+
+import bnelearn.sampler as vs
+
+batch_size = 2**10
+n_batches = 5
+
+
+def draw_batches(sampler):
+    """Draws `n_batches` batches of profiles from a freshly seeded prefetching sampler."""
+    torch.manual_seed(0)
+    prefetching_sampler = vs.PrefetchingSampler(sampler, n_prefetch=2)
+    try:
+        return [prefetching_sampler.draw_profiles() for _ in range(n_batches)]
+    finally:
+        prefetching_sampler.close()
+
+
+def test_prefetching_sampler():
+    """Prefetched batches must be valid, distinct and reproducible."""
+    sampler = vs.LLLLGGSampler(default_batch_size=batch_size)
+    batches = draw_batches(sampler)
+
+    for v, o in batches:
+        assert v.shape == torch.Size([batch_size, 6, 2]) and torch.equal(v, o)
+        assert v.device.type == sampler.default_device
+        assert torch.all(v >= sampler.support_bounds[..., 0].cpu().to(v.device))
+        assert torch.all(v <= sampler.support_bounds[..., 1].cpu().to(v.device))
+    assert not torch.equal(batches[0][0], batches[1][0]), "batches should differ!"
+
+    for (v, _), (v_repeated, _) in zip(batches, draw_batches(sampler)):
+        assert torch.equal(v, v_repeated), "prefetched batches should be reproducible!"
+
+
+def test_prefetching_sampler_delegation():
+    """Requests other than prefetched batches are delegated to the base sampler."""
+    sampler = vs.MineralRightsValuationObservationSampler(3, default_batch_size=batch_size)
+    prefetching_sampler = vs.PrefetchingSampler(sampler, n_prefetch=1)
+
+    v, o = prefetching_sampler.draw_profiles(2**4)
+    assert v.shape == o.shape == torch.Size([2**4, 3, 1])
+    cv, co = prefetching_sampler.draw_conditional_profiles(0, o[:, 0, :], 2**3)
+    assert cv.shape == co.shape == torch.Size([2**4, 2**3, 3, 1])
+
+    prefetching_sampler.close()
+    v, _ = prefetching_sampler.draw_profiles()
+    assert v.shape == torch.Size([batch_size, 3, 1])
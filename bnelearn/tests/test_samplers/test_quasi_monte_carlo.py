@@ -0,0 +1,70 @@
+"""Tests drawing profiles from scrambled Sobol sequences (randomized quasi-Monte
+Carlo) in the samplers: QMC draws must follow the same distributions as
+pseudo-random draws, and reduce the variance of sample means."""
+
+import pytest
+import torch
+
+import bnelearn.sampler as vs
+
+device = 'cuda' if torch.cuda.is_available() else 'cpu'
+batch_size = 2**16
+conditional_batch_size = 2**4
+inner_batch_size = 2**8
+
+samplers = {
+    'uniform': lambda: vs.UniformSymmetricIPVSampler(0, 1, 3, 2, batch_size),
+    'gaussian': lambda: vs.GaussianSymmetricIPVSampler(10, 1, 3, 1, batch_size),
+    'beta': lambda: vs.BetaSymmetricIPVSampler(2., 3., 3, 1, batch_size),
+    'correlated-bernoulli': lambda: vs.BernoulliWeightsCorrelatedSymmetricUniformPVSampler(
+        3, 1, 0.5, default_batch_size=batch_size),
+    'correlated-constant': lambda: vs.ConstantWeightCorrelatedSymmetricUniformPVSampler(
+        3, 1, 0.5, default_batch_size=batch_size),
+    'llg': lambda: vs.LLGSampler(0.5, 'Bernoulli', default_batch_size=batch_size),
+    'mineral-rights': lambda: vs.MineralRightsValuationObservationSampler(
+        3, 1, default_batch_size=batch_size),
+    'affiliated': lambda: vs.AffiliatedValuationObservationSampler(
+        2, 1, default_batch_size=batch_size),
+}
+
+
+@pytest.mark.parametrize("make_sampler", samplers.values(), ids=samplers.keys())
+def test_quasi_monte_carlo_profiles(make_sampler):
+    """QMC profiles must match the moments of pseudo-random profiles."""
+    sampler = make_sampler()
+    v_mc, o_mc = sampler.draw_profiles()
+
+    sampler.quasi_monte_carlo = True
+    v_qmc, o_qmc = sampler.draw_profiles()
+
+    assert v_qmc.shape == v_mc.shape and o_qmc.shape == o_mc.shape
+    for mc, qmc in [(v_mc, v_qmc), (o_mc, o_qmc)]:
+        assert torch.allclose(mc.mean(dim=0), qmc.mean(dim=0), atol=0.03), "unexpected sample mean!"
+        assert torch.allclose(mc.std(dim=0), qmc.std(dim=0), atol=0.03), "unexpected sample std!"
+
+    # conditional profiles
+    _, observations = sampler.draw_profiles(conditional_batch_size)
+    cv, co = sampler.draw_conditional_profiles(0, observations[:, 0, :], inner_batch_size)
+    assert cv.shape[:3] == co.shape[:3] == \
+        torch.Size([conditional_batch_size, inner_batch_size, sampler.n_players])
+    assert torch.allclose(co[..., 0, :], observations[:, [0], :].expand_as(co[..., 0, :]))
+
+
+def test_quasi_monte_carlo_variance_reduction():
+    """QMC estimates of the mean valuation must have lower variance and be
+    reproducible."""
+    sampler = vs.UniformSymmetricIPVSampler(0, 1, 2, 1, 2**10)
+    n_repetitions = 32
+
+    means_mc = torch.stack([sampler.draw_profiles()[0].mean() for _ in range(n_repetitions)])
+    sampler.quasi_monte_carlo = True
+    means_qmc = torch.stack([sampler.draw_profiles()[0].mean() for _ in range(n_repetitions)])
+
+    assert (means_qmc - 0.5).abs().max() < 0.01
+    assert means_qmc.std() < 0.1 * means_mc.std()
+
+    torch.manual_seed(0)
+    v1, _ = sampler.draw_profiles()
+    torch.manual_seed(0)
+    v2, _ = sampler.draw_profiles()
+    assert torch.equal(v1, v2)
@@ -7,6 +7,7 @@ import torch
 
 import bnelearn.bidder as b
 import bnelearn.strategy as s
+from bnelearn.util.process_pool import get_process_pool, shutdown_process_pools
 
 device = 'cuda' if torch.cuda.is_available() else 'cpu'
 u_lo = 0.
@@ -39,6 +40,26 @@ def test_closure_strategy_basic():
     assert torch.equal(observations+1, bidder.get_action(observations)), \
         "Closure strategy returned invalid results."
 
+def _squared_closure(x):
+    """Module-level closure, s.t. it can be pickled for worker processes."""
+    return x**2
+
+def test_parallel_closure_strategy():
+    """Parallel closure strategy should return the serial result, leave its
+    inputs untouched and reuse its pool of worker processes across calls."""
+    inputs = torch.rand(2**12, 2)
+    strat = s.ClosureStrategy(_squared_closure, parallel=2)
+
+    try:
+        assert torch.equal(strat.play(inputs), inputs**2), \
+            "Parallel closure strategy returned invalid results."
+        assert not inputs.is_shared(), "Inputs were moved to shared memory."
+        pool = get_process_pool(2)
+        assert torch.equal(strat.play(inputs), inputs**2)
+        assert get_process_pool(2) is pool, "Worker pool was not reused."
+    finally:
+        shutdown_process_pools()
+
 def test_closure_strategy_invalid_input():
     """Invalid closures should raise exception"""
     closure = 5
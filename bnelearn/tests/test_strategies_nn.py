@@ -5,7 +5,7 @@ import time
 import pytest
 import torch
 
-from bnelearn.strategy import NeuralNetStrategy
+from bnelearn.strategy import NeuralNetStrategy, EnsembleStrategy
 
 batch_size = 8
 
@@ -46,4 +46,29 @@ def test_nn_initialization(input_length, output_length, hidden_nodes):
     assert_nn_initialization(input_length, output_length, hidden_nodes, 'cpu')
     assert_nn_initialization(input_length, output_length, hidden_nodes, 'cuda')
 
+
+@pytest.mark.parametrize("input_length,output_length,hidden_nodes", testdata, ids=ids)
+def test_ensemble_strategy(input_length, output_length, hidden_nodes):
+    """Each member of an ensemble must play its own chunk of the batch as it would on its own."""
+    n_members = 3
+    members = [
+        NeuralNetStrategy(input_length=input_length, output_length=output_length, hidden_nodes=hidden_nodes,
+                          hidden_activations=[torch.nn.SELU() for _ in hidden_nodes])
+        for _ in range(n_members)]
+    ensemble = EnsembleStrategy(members)
+    assert [name for name, _ in ensemble.named_parameters()] == ['weights']
+
+    input_tensor = torch.rand(n_members * batch_size, input_length)
+    expected = torch.cat([member(x) for member, x in zip(members, input_tensor.view(n_members, batch_size, -1))])
+    assert torch.allclose(ensemble(input_tensor), expected, atol=1e-6), "Ensemble doesn't match its members!"
+
+    # members are updated on request only
+    with torch.no_grad():
+        ensemble.weights.add_(1.)
+    assert torch.allclose(torch.cat([member(x) for member, x in zip(
+        members, input_tensor.view(n_members, batch_size, -1))]), expected)
+    ensemble.update_members()
+    assert torch.allclose(ensemble(input_tensor), torch.cat([member(x) for member, x in zip(
+        members, input_tensor.view(n_members, batch_size, -1))]), atol=1e-6)
+
 # TODO: tests for pretraining
\ No newline at end of file
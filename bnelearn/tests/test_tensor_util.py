@@ -0,0 +1,29 @@
+"""Testing the tensor utilities for dynamic mini batching."""
+import pytest
+import torch
+
+from bnelearn.util.tensor_util import apply_with_dynamic_mini_batching
+
+
+def function(x):
+    """Memory-hungry function with two outputs of different types"""
+    y = x.view(-1, 1) * torch.arange(2**10, device=x.device).view(1, -1)
+    return y.sum(dim=-1, keepdim=True), y.argmax(dim=-1)
+
+
+@pytest.mark.parametrize("memory_budget, n_threads", [
+    (None, 1), (1, 1), (2**16, 1), (2**16, 3)
+    ], ids=['default', 'sequential', 'chunked', 'threaded'])
+def test_apply_with_dynamic_mini_batching_cpu(memory_budget, n_threads):
+    """Mini batches sized by the memory budget must give the same results as
+    the full batch."""
+    args = torch.rand(2**8, 1)
+    expected = function(args)
+
+    output = apply_with_dynamic_mini_batching(
+        function, args, mute=True, memory_budget=memory_budget, n_threads=n_threads)
+
+    assert len(output) == len(expected)
+    for o, e in zip(output, expected):
+        assert o.shape == e.shape and o.dtype == e.dtype
+        assert torch.allclose(o, e)
@@ -25,8 +25,8 @@ bid_i always used as val_i and only using truthful bidding
 
 import pytest
 import torch
-from bnelearn.mechanism import LLLLGGAuction, FirstPriceSealedBidAuction
-from bnelearn.mechanism.auctions_multiunit import FPSBSplitAwardAuction
+from bnelearn.mechanism import LLLLGGAuction, FirstPriceSealedBidAuction, VickreyAuction
+from bnelearn.mechanism.auctions_multiunit import FPSBSplitAwardAuction, MultiUnitDiscriminatoryAuction
 from bnelearn.strategy import TruthfulStrategy, ClosureStrategy
 import bnelearn.util.metrics as metrics
 from bnelearn.bidder import Bidder, ReverseBidder
@@ -243,6 +243,349 @@ def test_ex_interim_util_loss_estimator_fpsb_bne():
     assert mean_util_loss < 0.02, "Util_loss {} in BNE should be (close to) zero!".format(util_loss.mean())
     assert max_util_loss < 0.05, "Util_loss {} in BNE should be (close to) zero!".format(util_loss.max())
 
+def test_ex_interim_utility_common_random_numbers():
+    """Utilities of a grid of alternative actions, evaluated on shared
+    opponent draws, must match utilities of each alternative evaluated on
+    its own with the same draws."""
+    device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    n_players = 3
+    grid_size = 2**3
+    batch_size = 2**4
+    opponent_batch_size = 2**6
+    player_position = 1
+
+    sampler = samplers.UniformSymmetricIPVSampler(
+        u_lo, u_hi, n_players, 1, batch_size, device)
+    agents = [
+        Bidder(ClosureStrategy(lambda v: 0.5 * v), player_position=i, batch_size=batch_size)
+        for i in range(n_players)
+    ]
+    env = AuctionEnvironment(
+        mechanism=FirstPriceSealedBidAuction(), agents=agents,
+        valuation_observation_sampler=sampler,
+        batch_size=batch_size, n_players=n_players
+    )
+
+    _, observations = sampler.draw_profiles(batch_size, device)
+    agent_observations = observations[:, player_position, :]
+    alternatives = torch.linspace(u_lo, u_hi, grid_size, device=device).view(-1, 1)
+    grid_actions = alternatives.view(grid_size, 1, 1).expand(grid_size, batch_size, 1)
+
+    torch.manual_seed(0)
+    utilities = metrics._ex_interim_utility(
+        env, player_position, agent_observations, grid_actions, opponent_batch_size)
+    assert utilities.shape == torch.Size([grid_size, batch_size])
+
+    for alternative, alternative_utilities in zip(alternatives, utilities):
+        torch.manual_seed(0)
+        expected = metrics._ex_interim_utility(
+            env, player_position, agent_observations,
+            alternative.expand(batch_size, 1), opponent_batch_size)
+        assert torch.allclose(alternative_utilities, expected)
+
+def test_sequential_utility_estimation():
+    """Sequential estimates of the utilities in the BNE of fpsb must stop
+    early and their confidence intervals must cover the analytical values."""
+    device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    n_players = 3
+    batch_size = 2**16
+    player_position = 0
+    tolerance = 2e-3
+
+    strat = ClosureStrategy(lambda v: v * (n_players - 1) / n_players)
+    sampler = samplers.UniformSymmetricIPVSampler(
+        u_lo, u_hi, n_players, 1, batch_size, device)
+    env = AuctionEnvironment(
+        mechanism=FirstPriceSealedBidAuction(),
+        agents=[Bidder(strat, player_position=i, batch_size=batch_size) for i in range(n_players)],
+        valuation_observation_sampler=sampler,
+        batch_size=batch_size, n_players=n_players,
+        strategy_to_player_closure=lambda strategy, batch_size, player_position: \
+            Bidder(strategy, player_position, batch_size)
+    )
+
+    torch.manual_seed(0)
+    # ex-ante utility in BNE: 1 / (n * (n+1))
+    utility, ci, n_samples = metrics.sequential_strategy_reward(
+        env, strat, player_position, tolerance, chunk_size=2**10)
+    assert n_samples < batch_size, "Sequential estimation should stop early."
+    assert ci < 1.96 * tolerance * 1.01
+    assert abs(utility - 1 / (n_players * (n_players + 1))) < 2 * ci
+
+    # ex-interim utility in BNE: v^n / n
+    observations = torch.linspace(0.2, 1, 8, device=device).view(-1, 1)
+    utilities, cis, n_samples = metrics.sequential_ex_interim_utility(
+        env, player_position, observations, strat.play(observations),
+        tolerance=5e-3, max_opponent_batch_size=2**14)
+    assert utilities.shape == cis.shape == torch.Size([8])
+    assert n_samples < 2**14, "Sequential estimation should stop early."
+    assert torch.all((utilities - observations.view(-1)**n_players / n_players).abs() < 2 * cis + 1e-6)
+
+def test_sequential_strategy_reward_keeps_agent_positions():
+    """Opponents must keep their own player positions, irrespective of their
+    order in the environment."""
+    device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    batch_size = 2**14
+    sampler = samplers.UniformSymmetricIPVSampler(u_lo, u_hi, 2, 1, batch_size, device)
+    # opponent at position 1 bids zero, but is listed first
+    agents = [
+        Bidder(ClosureStrategy(lambda v: 0 * v), player_position=1, batch_size=batch_size),
+        Bidder(TruthfulStrategy(), player_position=0, batch_size=batch_size)
+    ]
+    env = AuctionEnvironment(
+        mechanism=FirstPriceSealedBidAuction(), agents=agents,
+        valuation_observation_sampler=sampler,
+        batch_size=batch_size, n_players=2,
+        strategy_to_player_closure=lambda strategy, batch_size, player_position: \
+            Bidder(strategy, player_position, batch_size)
+    )
+
+    # bidding half the value always wins against the zero bids: E[v/2] = 1/4
+    utility, ci, _ = metrics.sequential_strategy_reward(
+        env, ClosureStrategy(lambda v: 0.5 * v), 0, tolerance=1e-3, chunk_size=2**12)
+    assert abs(utility - 0.25) < 2 * ci + 1e-6
+
+def test_ex_interim_util_loss_tolerance_single_item_ipv():
+    """The tolerance must also apply in single-item IPV auctions, where the
+    utilities of the actual actions are otherwise computed exactly."""
+    device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    n_players = 3
+    batch_size = 2**6
+    player_position = 0
+
+    strat = ClosureStrategy(lambda v: v * (n_players - 1) / n_players)
+    sampler = samplers.UniformSymmetricIPVSampler(
+        u_lo, u_hi, n_players, 1, batch_size, device)
+    env = AuctionEnvironment(
+        mechanism=FirstPriceSealedBidAuction(),
+        agents=[Bidder(strat, player_position=i, batch_size=batch_size) for i in range(n_players)],
+        valuation_observation_sampler=sampler,
+        batch_size=batch_size, n_players=n_players
+    )
+    observations = sampler.draw_profiles(batch_size, device)[1][:, player_position, :]
+
+    _, _, cis = metrics.ex_interim_util_loss(
+        env, player_position, observations, 2**6, 2**10, return_ci=True)
+    assert torch.all(cis == 0)
+
+    util_loss, _, cis = metrics.ex_interim_util_loss(
+        env, player_position, observations, 2**6, 2**10, tolerance=1e-2, return_ci=True)
+    assert torch.any(cis > 0)
+    assert util_loss.mean() < 0.02
+
+@pytest.mark.parametrize("mechanism, risk, player_position", [
+    (FirstPriceSealedBidAuction(), 1.0, 0),
+    (FirstPriceSealedBidAuction(), 0.5, 1),
+    (VickreyAuction(), 1.0, 1),
+    (VickreyAuction(), 1.0, 2)
+    ], ids=['fpsb-0', 'fpsb-risk-1', 'vickrey-1', 'vickrey-2'])
+def test_single_item_ipv_ex_interim_utility(mechanism, risk, player_position):
+    """The sort-based single-item IPV utilities must match the utilities of
+    explicitly played auctions on the same opponent draws, including ties."""
+    device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    n_players = 3
+    opponent_batch_size = 2**12
+
+    sampler = samplers.UniformSymmetricIPVSampler(
+        u_lo, u_hi, n_players, 1, 1, device)
+    # bids on a coarse grid s.t. ties are frequent
+    agents = [
+        Bidder(ClosureStrategy(lambda v: torch.round(10 * v) / 10),
+               player_position=i, batch_size=1, risk=risk)
+        for i in range(n_players)
+    ]
+    env = AuctionEnvironment(
+        mechanism=mechanism, agents=agents,
+        valuation_observation_sampler=sampler,
+        batch_size=1, n_players=n_players
+    )
+    assert metrics._is_single_item_ipv(env, player_position)
+
+    agent_observations = torch.tensor([[0.73]], device=device)
+    grid_actions = (torch.arange(11, device=device).float() / 10).view(-1, 1, 1)
+
+    torch.manual_seed(0)
+    expected = metrics._ex_interim_utility(
+        env, player_position, agent_observations, grid_actions, opponent_batch_size)
+    torch.manual_seed(0)
+    highest_opponent_bids, wins_tie = metrics._draw_highest_opponent_bids(
+        env, player_position, agent_observations, opponent_batch_size)
+    utilities = metrics._single_item_ipv_ex_interim_utility(
+        env, player_position, agent_observations, grid_actions,
+        highest_opponent_bids, wins_tie)
+
+    assert torch.allclose(utilities, expected, atol=1e-6)
+
+def test_refined_best_responses_fpsb_bne():
+    """Refining a coarse grid must find best responses close to the BNE bid,
+    off the grid."""
+    device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    n_players = 3
+    batch_size = 2**5
+    opponent_batch_size = 2**12
+    player_position = 0
+
+    optimal_bid = lambda v: v * (n_players - 1) / n_players
+    sampler = samplers.UniformSymmetricIPVSampler(
+        u_lo, u_hi, n_players, 1, batch_size, device)
+    agents = [
+        Bidder(ClosureStrategy(optimal_bid), player_position=i, batch_size=batch_size)
+        for i in range(n_players)
+    ]
+    env = AuctionEnvironment(
+        mechanism=FirstPriceSealedBidAuction(), agents=agents,
+        valuation_observation_sampler=sampler,
+        batch_size=batch_size, n_players=n_players
+    )
+
+    _, observations = sampler.draw_profiles(batch_size, device)
+    agent_observations = observations[:, player_position, :]
+    coarse_grid = torch.linspace(0, 1, 5, device=device).view(-1, 1)
+
+    br_utility, br_actions = metrics._get_refined_best_responses(
+        env, player_position, agent_observations, coarse_grid,
+        opponent_batch_size, refinement_rounds=5, top_k=2)
+
+    assert br_utility.shape == torch.Size([batch_size])
+    assert br_actions.shape == torch.Size([batch_size, 1])
+    assert (br_actions - optimal_bid(agent_observations)).abs().mean() < 0.02, \
+        "Refined best responses should be close to the BNE."
+
+def test_refined_best_responses_multiunit_descending():
+    """Refined best responses must satisfy the constraints of the coarse grid,
+    here marginally descending bids."""
+    device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    n_players = 2
+    n_items = 2
+    batch_size = 2**5
+    player_position = 0
+
+    sampler = samplers.MultiUnitValuationObservationSampler(
+        n_players, n_items, default_batch_size=batch_size, default_device=device)
+    agents = [
+        Bidder(ClosureStrategy(lambda v: 0.5 * v), player_position=i, batch_size=batch_size,
+               valuation_size=n_items, observation_size=n_items, bid_size=n_items)
+        for i in range(n_players)
+    ]
+    env = AuctionEnvironment(
+        mechanism=MultiUnitDiscriminatoryAuction(), agents=agents,
+        valuation_observation_sampler=sampler,
+        batch_size=batch_size, n_players=n_players
+    )
+
+    _, observations = sampler.draw_profiles(batch_size, device)
+    agent_observations = observations[:, player_position, :]
+    # for low valuations, (invalid) ascending bids are as good as any losing bid
+    agent_observations[:batch_size // 2] *= 0.1
+    coarse_grid = sampler.generate_action_grid(player_position, 2**4, device=device)
+    _, br_actions = metrics._get_refined_best_responses(
+        env, player_position, agent_observations, coarse_grid,
+        2**8, refinement_rounds=3, top_k=4)
+
+    assert torch.all(br_actions[:, 0] >= br_actions[:, 1])
+
+def test_util_loss_threads_require_thread_safe_environment():
+    """Mini batches may only be evaluated concurrently if no agent or the
+    mechanism keeps state across calls."""
+    device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    n_players = 2
+    batch_size = 2**4
+
+    sampler = samplers.UniformSymmetricIPVSampler(
+        u_lo, u_hi, n_players, 1, batch_size, device)
+    env = AuctionEnvironment(
+        mechanism=FirstPriceSealedBidAuction(),
+        agents=[Bidder(TruthfulStrategy(), player_position=i, batch_size=batch_size,
+                       enable_action_caching=i == 1)
+                for i in range(n_players)],
+        valuation_observation_sampler=sampler,
+        batch_size=batch_size, n_players=n_players
+    )
+    assert metrics._get_thread_safe_n_threads(env, 1) == 1
+    with pytest.warns(UserWarning, match='not thread-safe'):
+        assert metrics._get_thread_safe_n_threads(env, 4) == 1
+
+    env.agents[1]._enable_action_caching = False
+    assert metrics._get_thread_safe_n_threads(env, 4) == 4
+
+def test_duplicate_grid_points():
+    """Only repeated copies of points on the grid are marked, irrespective of
+    rounding errors."""
+    lower = torch.tensor([0., 0.])
+    spacing = torch.tensor([0.1, 0.])
+    points = torch.tensor([[0.3, 1.], [0.1 + 0.2, 1.], [0.3, 1.], [0.2, 1.]]).view(4, 1, 2)
+
+    duplicate = metrics._duplicate_grid_points(points, lower, spacing)
+    assert duplicate.view(-1).tolist() == [False, True, True, False]
+
+@pytest.mark.parametrize("smoothing_temperature", [None, 0.01], ids=['finite-differences', 'smooth-market'])
+def test_polished_best_responses_fpsb_bne(smoothing_temperature):
+    """Local ascent from coarse grid points must find best responses close to
+    the BNE bid, both with gradients from the smoothed market and with
+    finite differences."""
+    device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    n_players = 3
+    batch_size = 2**5
+    opponent_batch_size = 2**12
+    player_position = 0
+
+    optimal_bid = lambda v: v * (n_players - 1) / n_players
+    sampler = samplers.UniformSymmetricIPVSampler(
+        u_lo, u_hi, n_players, 1, batch_size, device)
+    agents = [
+        Bidder(ClosureStrategy(optimal_bid), player_position=i, batch_size=batch_size)
+        for i in range(n_players)
+    ]
+    env = AuctionEnvironment(
+        mechanism=FirstPriceSealedBidAuction(smoothing_temperature=smoothing_temperature),
+        agents=agents, valuation_observation_sampler=sampler,
+        batch_size=batch_size, n_players=n_players
+    )
+
+    _, observations = sampler.draw_profiles(batch_size, device)
+    agent_observations = observations[:, player_position, :]
+    # start at the points of a coarse grid closest to truthful bidding
+    start = (agent_observations * 4).round() / 4
+
+    _, polished_actions = metrics._polish_best_responses(
+        env, player_position, agent_observations, start, opponent_batch_size,
+        polishing_steps=10, step_size=torch.tensor([0.125], device=device),
+        lower=torch.tensor([0.], device=device), upper=torch.tensor([1.], device=device))
+
+    assert polished_actions.shape == torch.Size([batch_size, 1])
+    assert (polished_actions - optimal_bid(agent_observations)).abs().mean() < 0.02, \
+        "Polished best responses should be close to the BNE."
+
+def test_polished_util_loss_fpsb_bne_unbiased():
+    """The utility loss of polished best responses must be estimated on
+    opponent draws independent of the polishing ascent, s.t. it is not biased
+    upwards (by maximizing over the noise) in the BNE."""
+    device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    n_players = 3
+    batch_size = 2**7
+    opponent_batch_size = 2**8
+    player_position = 0
+
+    optimal_bid = lambda v: v * (n_players - 1) / n_players
+    sampler = samplers.UniformSymmetricIPVSampler(
+        u_lo, u_hi, n_players, 1, batch_size, device)
+    agents = [
+        Bidder(ClosureStrategy(optimal_bid), player_position=i, batch_size=batch_size)
+        for i in range(n_players)
+    ]
+    env = AuctionEnvironment(
+        mechanism=FirstPriceSealedBidAuction(), agents=agents,
+        valuation_observation_sampler=sampler, batch_size=batch_size, n_players=n_players
+    )
+    _, observations = sampler.draw_profiles(batch_size, device)
+
+    util_loss = torch.stack([
+        metrics.ex_interim_util_loss(
+            env, player_position, observations[:, player_position, :], 2**5,
+            opponent_batch_size=opponent_batch_size, polishing_steps=10)[0].mean()
+        for _ in range(3)])
+    assert util_loss.mean() < 1.5e-3, "Polished utility loss in the BNE is biased."
+
 ## TODO Stefan: @Nils: this test needs multi-unit sampling
 def test_ex_interim_util_loss_estimator_splitaward_bne():
     """Test the util_loss in BNE of fpsb split-award auction. - ex interim util_loss should be close to zero"""
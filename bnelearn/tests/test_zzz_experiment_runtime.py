@@ -8,6 +8,9 @@ TODO:
     - Stefan: Later: gaussian with fpsb and util_loss
 """
 
+import os
+
+import pandas as pd
 import pytest
 
 # pylint: disable=wrong-import-order
@@ -63,6 +66,42 @@ ids_si, *testdata_si = zip(*[
         *ConfigurationManager(experiment_type='mineral_rights', n_runs=N_RUNS, n_epochs=N_EPOCHS) \
                            .get_config(),
         True
+    ], [
+        '7 - single_item-asymmetric-uniform-fp-parallel_learner_updates',
+        *ConfigurationManager(experiment_type='single_item_asymmetric_uniform_overlapping', n_runs=N_RUNS, n_epochs=N_EPOCHS) \
+                           .set_hardware(parallel_learner_updates=True)
+                           .get_config(),
+        True
+    ], [
+        '8 - single_item-symmetric-uniform-fp-parallel_runs',
+        *ConfigurationManager(experiment_type='single_item_uniform_symmetric', n_runs=N_RUNS, n_epochs=N_EPOCHS) \
+                           .set_hardware(parallel_runs=N_RUNS)
+                           .get_config(),
+        True
+    ], [
+        '9 - single_item-asymmetric-uniform-fp-ensemble_runs',
+        *ConfigurationManager(experiment_type='single_item_asymmetric_uniform_overlapping', n_runs=N_RUNS, n_epochs=N_EPOCHS) \
+                           .set_hardware(ensemble_runs=True)
+                           .get_config(),
+        True
+    ], [
+        '10 - single_item-asymmetric-uniform-fp-sequential_estimation',
+        *ConfigurationManager(experiment_type='single_item_asymmetric_uniform_overlapping', n_runs=N_RUNS, n_epochs=N_EPOCHS) \
+                           .set_logging(eval_tolerance=1e-2, eval_chunk_size=2, util_loss_tolerance=1e-2)
+                           .get_config(),
+        True
+    ], [
+        '11 - single_item-symmetric-gaussian-fp-quasi_monte_carlo',
+        *ConfigurationManager(experiment_type='single_item_gaussian_symmetric', n_runs=N_RUNS, n_epochs=N_EPOCHS) \
+                           .set_learning(quasi_monte_carlo=True)
+                           .get_config(),
+        True
+    ], [
+        '12 - single_item-affiliated-observations-prefetching',
+        *ConfigurationManager(experiment_type='affiliated_observations', n_runs=N_RUNS, n_epochs=N_EPOCHS) \
+                           .set_learning(redraw_every_iteration=True, prefetch_batches=2)
+                           .get_config(),
+        True
     ]
 ])
 
@@ -214,3 +253,51 @@ def test_local_global_auctions(config, exp_class, known_bne):
 @pytest.mark.parametrize("config, exp_class, known_bne", zip(*testdata_mu), ids=ids_mu)
 def test_multi_unit_auctions(config, exp_class, known_bne):
     run_auction_test(config, exp_class, known_bne)
+
+
+def test_async_evaluation(tmp_path):
+    """Metrics calculated in the evaluation worker process must be logged."""
+    config, exp_class = ConfigurationManager(
+        experiment_type='single_item_uniform_symmetric', n_runs=1, n_epochs=N_EPOCHS) \
+        .set_logging(log_root_dir=str(tmp_path), async_evaluation=True,
+                     save_figure_to_disk_png=False, save_figure_to_disk_svg=False,
+                     save_figure_data_to_disk=False) \
+        .get_config()
+    config.learning.pretrain_iters = 20
+    config.logging.eval_frequency = 1
+    config.logging.plot_points = 10
+    config.logging.util_loss_batch_size = 2 ** 2
+    config.logging.util_loss_grid_size = 2 ** 2
+    config.learning.batch_size = 2 ** 2
+    config.logging.eval_batch_size = 2 ** 2
+    config.hardware.specific_gpu = 0
+
+    experiment = exp_class(config)
+    success = experiment.run()
+    assert success, "One or more errors were caught during the experiment runs! (See test logs.)"
+    assert experiment._evaluation_worker is None  # pylint: disable=protected-access
+    assert 'util_loss_ex_interim' in experiment._cur_epoch_log_params  # pylint: disable=protected-access
+
+
+def test_ensemble_logging(tmp_path):
+    """Ensemble runs must log each run to its own run directory, s.t. they
+    are tabulated like individual runs."""
+    config, exp_class = ConfigurationManager(
+        experiment_type='single_item_asymmetric_uniform_overlapping', n_runs=N_RUNS, n_epochs=N_EPOCHS) \
+        .set_hardware(ensemble_runs=True) \
+        .set_logging(log_root_dir=str(tmp_path), save_tb_events_to_csv_aggregate=True,
+                     save_figure_to_disk_png=False, save_figure_to_disk_svg=False,
+                     save_figure_data_to_disk=False) \
+        .get_config()
+    config.learning.pretrain_iters = 20
+    config.learning.batch_size = 2 ** 2
+    config.hardware.specific_gpu = 0
+
+    experiment = exp_class(config)
+    success = experiment.run()
+    assert success, "One or more errors were caught during the experiment runs! (See test logs.)"
+
+    aggregate_log = pd.read_csv(os.path.join(experiment.experiment_log_dir, 'aggregate_log.csv'))
+    utilities = aggregate_log[aggregate_log.tag.str.startswith('market/utilities')]
+    assert utilities.run.nunique() == N_RUNS
+    assert (utilities.epoch == N_EPOCHS).all()
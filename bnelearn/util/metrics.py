@@ -1,12 +1,19 @@
 """This module implements metrics that may be interesting."""
 
-from typing import Tuple
+from copy import copy
+from itertools import product
+from typing import Callable, Tuple
+import warnings
 import torch
 import matplotlib.pyplot as plt
 
 from bnelearn.bidder import Bidder
 from bnelearn.environment import AuctionEnvironment
-from bnelearn.mechanism import Mechanism, TullockContest, CrowdsourcingContest
+from bnelearn.mechanism import (
+    Mechanism, TullockContest, CrowdsourcingContest,
+    FirstPriceSealedBidAuction, VickreyAuction
+)
+from bnelearn.sampler import IPVSampler, PrefetchingSampler
 from bnelearn.strategy import Strategy
 from bnelearn.util.tensor_util import (
     apply_with_dynamic_mini_batching,
@@ -135,6 +142,96 @@ def norm_strategy_and_actions(strategy, actions, valuations: torch.Tensor, p: fl
     else:
         return norm_actions(s_actions, actions, p)
 
+
+def sequential_mean_estimate(draw_samples: Callable[[], torch.Tensor],
+                             tolerance: float, max_samples: int,
+                             confidence: float = 0.95
+                             ) -> Tuple[torch.Tensor, torch.Tensor, int]:
+    """Estimates the mean of a random variable sequentially: Chunks of samples
+    are drawn until the standard error of the estimate falls below
+    `tolerance` (for all entries) or at least `max_samples` samples have been
+    drawn.
+
+    Args:
+        draw_samples: Callable that returns a new chunk of i.i.d. samples, as
+            Tensor of dim (*batch_sizes x chunk_size).
+        tolerance: float, target standard error of the mean.
+        max_samples: int, cap on the number of samples.
+        confidence: float, level of the reported confidence interval.
+
+    Returns:
+        mean: (Tensor of dim (*batch_sizes))
+        ci: (Tensor of dim (*batch_sizes)), half-width of the (normal
+            approximation) confidence interval of the mean.
+        n_samples: int, number of samples that were drawn.
+    """
+    n_samples = 0
+    sum_samples = sum_squares = 0
+    while True:
+        samples = draw_samples().detach()
+        dtype = samples.dtype
+        samples = samples.double()
+        sum_samples = sum_samples + samples.sum(dim=-1)
+        sum_squares = sum_squares + samples.pow(2).sum(dim=-1)
+        n_samples += samples.shape[-1]
+
+        mean = sum_samples / n_samples
+        variance = (sum_squares / n_samples - mean.pow(2)).clamp(min=0) \
+            * n_samples / max(n_samples - 1, 1)
+        standard_error = (variance / n_samples).sqrt()
+
+        if n_samples >= max_samples or standard_error.max() <= tolerance:
+            break
+
+    z = torch.distributions.Normal(0, 1).icdf(torch.tensor((1 + confidence) / 2)).item()
+    return mean.to(dtype), (z * standard_error).to(dtype), n_samples
+
+def sequential_strategy_reward(env: AuctionEnvironment, strategy: Strategy,
+                               player_position: int, tolerance: float,
+                               max_batch_size: int = None, chunk_size: int = 2**12,
+                               confidence: float = 0.95
+                               ) -> Tuple[torch.Tensor, torch.Tensor, int]:
+    """Estimates the (ex-ante) reward of a strategy against the agents of
+    `env` from fresh chunks of valuations, until the standard error of the
+    estimate falls below `tolerance` (see `sequential_mean_estimate`).
+
+    Args:
+        env: AuctionEnvironment with a `strategy_to_player` closure.
+        max_batch_size: int, cap on the number of games, defaults to the
+            environment's batch size.
+        chunk_size: int, number of games per chunk.
+
+    Returns:
+        reward (scalar Tensor), ci (scalar Tensor), n_samples (int)
+    """
+    # pylint: disable=protected-access
+    max_batch_size = max_batch_size or env.batch_size
+    chunk_size = min(chunk_size, max_batch_size)
+    chunk_env = AuctionEnvironment(
+        env.mechanism,
+        agents=[_with_batch_size(agent, chunk_size) for agent in env.agents],
+        valuation_observation_sampler=env.sampler,
+        batch_size=chunk_size,
+        n_players=env.n_players,
+        strategy_to_player_closure=env._strategy_to_player
+        )
+
+    def draw_rewards():
+        chunk_env.draw_valuations()
+        return chunk_env.get_strategy_reward(strategy, player_position, aggregate_batch=False)
+
+    return sequential_mean_estimate(draw_rewards, tolerance, max_batch_size, confidence)
+
+def _with_batch_size(agent: Bidder, batch_size: int) -> Bidder:
+    """Returns a shallow copy of the agent that keeps its player position and
+    settings (e.g. risk) but plays batches of `batch_size` (without action
+    caching)."""
+    # pylint: disable=protected-access
+    agent = copy(agent)
+    agent.batch_size = batch_size
+    agent._enable_action_caching = False
+    return agent
+
 def _create_grid_bid_profiles(bidder_position: int, grid: torch.Tensor, bid_profile: torch.Tensor):
     """Given an original bid profile, creates a tensor of (grid_size *
     batch_size) batches of bid profiles, where for each original batch, the
@@ -235,7 +332,14 @@ def ex_interim_util_loss(env: AuctionEnvironment, player_position: int,
                          agent_observations: torch.Tensor,
                          grid_size: int,
                          opponent_batch_size: int = None,
-                         grid_best_response: bool = False):
+                         grid_best_response: bool = False,
+                         memory_budget: int = None,
+                         n_threads: int = 1,
+                         refinement_rounds: int = 0,
+                         refinement_top_k: int = 4,
+                         polishing_steps: int = 0,
+                         tolerance: float = None,
+                         return_ci: bool = False):
     #pylint: disable = anomalous-backslash-in-string
     """Estimates a bidder's utility loss in the current state of the
     environment, i.e. the potential benefit of deviating from the current
@@ -259,6 +363,28 @@ def ex_interim_util_loss(env: AuctionEnvironment, player_position: int,
         grid_best_response: bool, whether or not the BRs live on the grid or
             possibly come from the actual actions (in case no better response
             was found on grid).
+        memory_budget: int, (CPU only) RAM in bytes that mini batches of
+            observations may use at once, see `apply_with_dynamic_mini_batching`.
+        n_threads: int, (CPU only) number of threads that evaluate mini batches
+            of observations concurrently. Only used if the environment may be
+            shared by threads (see `_get_thread_safe_n_threads`).
+        refinement_rounds: int, number of rounds in which the best responses
+            found on the grid are refined locally (see
+            `_get_refined_best_responses`). With refinement, best responses
+            don't live on the grid anymore.
+        refinement_top_k: int, number of best candidates per observation that
+            are refined in each round.
+        polishing_steps: int, number of local ascent steps that polish each
+            best response found on the (refined) grid (see
+            `_polish_best_responses`).
+        tolerance: float, if given, the utilities of the actual actions are
+            estimated sequentially from chunks of opponents until their
+            standard errors fall below `tolerance`, with `opponent_batch_size`
+            as cap (see `sequential_ex_interim_utility`). This replaces the
+            exact computation in single-item IPV auctions for the actual (and
+            polished) actions, the grid search is not affected.
+        return_ci: bool, whether to additionally return the half-widths of the
+            confidence intervals of the utility losses.
 
     Returns:
         utility_loss (torch.Tensor, shape: [batch_size]):  the computed
@@ -267,10 +393,18 @@ def ex_interim_util_loss(env: AuctionEnvironment, player_position: int,
             the best response found for each input observation (This is
             either a grid point, or the actual action according to the player's
             strategy.)
+        utility_loss_ci (torch.Tensor, shape: [batch_size]): only if
+            `return_ci`, the half-widths of the confidence intervals of the
+            sequentially estimated utilities that enter the utility losses
+            (zero without `tolerance`).
 
     Remarks:
         Relies on availability of `draw_conditional_profiles` and
         `generate_valuation_grid` in the `env`'s ValuationObservationSampler.
+        In single-item first-price and Vickrey auctions with independent
+        private values, the utilities are computed exactly w.r.t. a single
+        sample of highest opposing bids that is shared by all observations
+        (see `_single_item_ipv_ex_interim_utility`).
     """
 
     device = agent_observations.device
@@ -280,15 +414,40 @@ def ex_interim_util_loss(env: AuctionEnvironment, player_position: int,
     opponent_batch_size = opponent_batch_size or agent_batch_size
 
     agent: Bidder = env.agents[player_position]
+    n_threads = _get_thread_safe_n_threads(env, n_threads)
     # ensure we are not propagating any gradients (may cause memory leaks)
     agent_observations = agent_observations.detach().clone().to(device)
 
     ####### get actual utility #############################
     agent.strategy.to(device)
     agent_action_actual = agent.get_action(agent_observations)
-    utility_actual = ex_interim_utility(
-        env, player_position, agent_observations, agent_action_actual,
-        opponent_batch_size)
+
+    # in single-item IPV auctions, the utilities can be computed exactly from
+    # the (sorted) highest opponent bids, which are shared by all observations
+    single_item_ipv = _is_single_item_ipv(env, player_position)
+    if single_item_ipv:
+        highest_opponent_bids, wins_tie = _draw_highest_opponent_bids(
+            env, player_position, agent_observations, opponent_batch_size)
+
+    def estimate_utility(actions):
+        """Returns the utilities of the actions and the half-widths of their
+        confidence intervals."""
+        if tolerance is not None:
+            return sequential_ex_interim_utility(
+                env, player_position, agent_observations, actions,
+                tolerance, opponent_batch_size)[:2]
+        if single_item_ipv:
+            utility = _single_item_ipv_ex_interim_utility(
+                env, player_position, agent_observations, actions,
+                highest_opponent_bids, wins_tie)
+        else:
+            utility = ex_interim_utility(
+                env, player_position, agent_observations, actions,
+                opponent_batch_size)
+        return utility, torch.zeros_like(utility)
+
+    utility_actual, utility_actual_ci = estimate_utility(agent_action_actual)
+    br_utility_ci = torch.zeros_like(utility_actual_ci)
 
     ####### get best responses over grid of alternative actions #######
     action_alternatives = env.sampler.generate_action_grid(
@@ -312,40 +471,99 @@ def ex_interim_util_loss(env: AuctionEnvironment, player_position: int,
     #
     # br_utility = br_utility.sum(axis=-1)
     # action_alternatives = torch.linspace(0, 1, grid_size, device=device)
-    get_br_utily_and_index = lambda obs: _get_best_responses_among_alternatives(
-        env, player_position, obs, action_alternatives, opponent_batch_size)
-    br_utility, br_indices = apply_with_dynamic_mini_batching(
-        function=get_br_utily_and_index,
-        args=agent_observations)
+    if single_item_ipv:
+        grid_utilities = _single_item_ipv_ex_interim_utility(
+            env, player_position, agent_observations,
+            action_alternatives.view(-1, 1, action_size) \
+                .expand(-1, agent_batch_size, action_size),
+            highest_opponent_bids, wins_tie)
+        br_utility, br_indices = grid_utilities.max(dim=0)
+        br_alternatives = action_alternatives[br_indices]
+    elif refinement_rounds > 0:
+        get_br_utily_and_action = lambda obs: _get_refined_best_responses(
+            env, player_position, obs, action_alternatives, opponent_batch_size,
+            refinement_rounds, refinement_top_k)
+        br_utility, br_alternatives = apply_with_dynamic_mini_batching(
+            function=get_br_utily_and_action,
+            args=agent_observations,
+            memory_budget=memory_budget,
+            n_threads=n_threads)
+    else:
+        get_br_utily_and_index = lambda obs: _get_best_responses_among_alternatives(
+            env, player_position, obs, action_alternatives, opponent_batch_size)
+        br_utility, br_indices = apply_with_dynamic_mini_batching(
+            function=get_br_utily_and_index,
+            args=agent_observations,
+            memory_budget=memory_budget,
+            n_threads=n_threads)
+        br_alternatives = action_alternatives[br_indices]
+
+    if polishing_steps > 0:
+        lower, upper, spacing = _get_grid_bounds_and_spacing(action_alternatives)
+        # start at half of the final grid spacing
+        step_size = spacing / 2**(refinement_rounds + 1 if not single_item_ipv else 1)
+        observation_size = agent_observations.shape[-1]
+        polish = lambda obs_and_actions: _polish_best_responses(
+            env, player_position, obs_and_actions[:, :observation_size],
+            obs_and_actions[:, observation_size:], opponent_batch_size,
+            polishing_steps, step_size, lower, upper)
+        _, br_alternatives = apply_with_dynamic_mini_batching(
+            function=polish,
+            args=torch.cat([agent_observations, br_alternatives], dim=-1),
+            memory_budget=memory_budget,
+            n_threads=n_threads)
+        # the ascent maximized the utilities on its own opponent draws, which
+        # would bias them upwards: re-evaluate the polished actions as the
+        # actual ones, on draws that are independent of the ascent
+        br_utility, br_utility_ci = estimate_utility(br_alternatives)
 
     ##### calculate the loss and return best responses ###########
     utility_loss = (br_utility - utility_actual).relu_()
 
-    # BR only on grid
+    # BR only on grid (or refined from it)
     if grid_best_response:
-        br_actions = action_alternatives[br_indices]
+        br_actions = br_alternatives
     else:
         actual_was_best = (utility_loss == 0).unsqueeze_(1).repeat(1, action_size)
         br_actions = actual_was_best * agent_action_actual + \
-            actual_was_best.logical_not() * action_alternatives[br_indices]
+            actual_was_best.logical_not() * br_alternatives
 
+    if return_ci:
+        utility_loss_ci = (utility_actual_ci.pow(2) + br_utility_ci.pow(2)).sqrt()
+        return (utility_loss, br_actions, utility_loss_ci)
     return (utility_loss, br_actions)
 
+def _get_thread_safe_n_threads(env: AuctionEnvironment, n_threads: int) -> int:
+    """Mini batches of observations may only be evaluated by several threads
+    if these can share the environment, i.e. neither the mechanism (see
+    `Mechanism.thread_safe`) nor the agents (action caching) keep mutable
+    state across calls. Otherwise, returns a single thread."""
+    # pylint: disable=protected-access
+    if n_threads > 1 and (not env.mechanism.thread_safe or
+                          any(agent._enable_action_caching for agent in env.agents)):
+        warnings.warn('The environment is not thread-safe (mechanism or agents keep state across '
+                      'calls). Evaluating the mini batches sequentially.')
+        return 1
+    return n_threads
+
 def get_best_responses_among_alternatives(
         env: AuctionEnvironment, player_position: int,
         agent_observations: torch.Tensor, action_alternatives: torch.Tensor,
-        opponent_batch_size: int,
+        opponent_batch_size: int, memory_budget: int = None, n_threads: int = 1
     ) -> Tuple[torch.Tensor, torch.IntTensor]:
     """Wrapper for `_get_best_responses_among_alternatives` that makes some
     computations sequentially if `device` is OOM.
     """
+    n_threads = _get_thread_safe_n_threads(env, n_threads)
     get_br_utily_and_index = lambda obs: _get_best_responses_among_alternatives(
         env, player_position, obs, action_alternatives, opponent_batch_size
     )
 
     return apply_with_dynamic_mini_batching(
         function=get_br_utily_and_index,
-        args=agent_observations
+        args=agent_observations,
+        memory_budget=memory_budget,
+        n_threads=n_threads
     )
 
 def _get_best_responses_among_alternatives(
@@ -364,18 +582,17 @@ def _get_best_responses_among_alternatives(
 
     grid_size, action_size = action_alternatives.shape
     agent_batch_size, _ = agent_observations.shape
-    device = env.mechanism.device
 
     ## grid_size x agent_batch_size x action_size
+    # the observations are not repeated: conditional opponent draws and
+    # their actions are shared by all alternatives (common random numbers)
     grid_actions = action_alternatives \
         .view(grid_size, 1, action_size) \
-        .repeat([1, agent_batch_size, 1])
-    ## grid_size x agent_batch_size x observation_size
-    grid_observations = agent_observations.repeat([grid_size, 1, 1])
+        .expand([grid_size, agent_batch_size, action_size])
 
     # grid_size x agent_batch_size
     grid_utilities = ex_interim_utility(
-        env, player_position, grid_observations,
+        env, player_position, agent_observations,
         grid_actions, opponent_batch_size
         )
 
@@ -385,6 +602,177 @@ def _get_best_responses_among_alternatives(
 
     return br_utility, br_indices
 
+def _get_grid_bounds_and_spacing(
+        action_alternatives: torch.Tensor
+    ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    """Returns the lower and upper bounds and the spacing of a (rectangular)
+    grid of actions in each dimension, each of size [action_size]."""
+    _, action_size = action_alternatives.shape
+
+    lower, _ = action_alternatives.min(dim=0)
+    upper, _ = action_alternatives.max(dim=0)
+    n_points_per_dim = torch.tensor(
+        [action_alternatives[:, d].unique().numel() for d in range(action_size)],
+        dtype=action_alternatives.dtype, device=action_alternatives.device)
+    spacing = (upper - lower) / (n_points_per_dim - 1).clamp(min=1)
+
+    return lower, upper, spacing
+
+def _get_refined_best_responses(
+        env: AuctionEnvironment, player_position: int,
+        agent_observations: torch.Tensor, action_alternatives: torch.Tensor,
+        opponent_batch_size: int, refinement_rounds: int, top_k: int
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+    """For a batch of observations for the given player, searches the
+    ex-interim best responses coarse-to-fine: Starting with the best `top_k`
+    actions among the (coarse grid of) `action_alternatives`, each round
+    evaluates the `3^action_size` points around each candidate at half of the
+    previous round's grid spacing and keeps the best `top_k` distinct ones
+    among them. Like the grid, these points are subject to the sampler's
+    constraints on the actions (see `project_onto_action_grid`).
+
+    This reaches the precision of a uniform grid with
+    `2^refinement_rounds` times as many points per dimension at a fraction of
+    the evaluations.
+
+    Returns:
+        br_utility (torch.FloatTensor of size [agent_batch_size])
+        br_actions (torch.FloatTensor of size [agent_batch_size, action_size]):
+            the best actions found, which need not lie on the grid.
+    """
+    grid_size, action_size = action_alternatives.shape
+    agent_batch_size, _ = agent_observations.shape
+    top_k = min(top_k, grid_size)
+    dtype, device = action_alternatives.dtype, action_alternatives.device
+
+    lower, upper, spacing = _get_grid_bounds_and_spacing(action_alternatives)
+
+    # top_k x agent_batch_size
+    utilities = ex_interim_utility(
+        env, player_position, agent_observations,
+        action_alternatives \
+            .view(grid_size, 1, action_size) \
+            .expand([grid_size, agent_batch_size, action_size]),
+        opponent_batch_size)
+    utilities, indices = utilities.topk(top_k, dim=0)
+    # top_k x agent_batch_size x action_size
+    candidates = action_alternatives[indices]
+
+    # steps to the neighboring points (including the candidate itself)
+    steps = torch.tensor(list(product([-1., 0., 1.], repeat=action_size)),
+                         dtype=dtype, device=device).view(-1, 1, 1, action_size)
+
+    for _ in range(refinement_rounds):
+        spacing = spacing / 2
+
+        # (3^action_size * top_k) x agent_batch_size x action_size
+        neighbors = (candidates + steps * spacing).view(-1, agent_batch_size, action_size)
+        neighbors = env.sampler.project_onto_action_grid(
+            player_position, torch.max(torch.min(neighbors, upper), lower))
+
+        # candidates are reevaluated with the neighbors on shared opponent draws
+        utilities = ex_interim_utility(
+            env, player_position, agent_observations, neighbors,
+            opponent_batch_size)
+        # neighborhoods overlap: keep only one copy of each point
+        utilities = utilities.masked_fill(
+            _duplicate_grid_points(neighbors, lower, spacing), float('-inf'))
+        utilities, indices = utilities.topk(top_k, dim=0)
+        candidates = neighbors.gather(
+            0, indices.unsqueeze(-1).expand([top_k, agent_batch_size, action_size]))
+
+    return utilities[0], candidates[0]
+
+def _duplicate_grid_points(
+        points: torch.Tensor, lower: torch.Tensor, spacing: torch.Tensor
+    ) -> torch.BoolTensor:
+    """For points on a grid with the given lower bounds and spacing, of shape
+    (n_points x *batch_sizes x action_size), marks all but the first copy of
+    each point along the first dimension. Returns shape (n_points x *batch_sizes)."""
+    # integer coordinates on the grid (robust against rounding errors)
+    coordinates = torch.where(spacing > 0, (points - lower) / spacing.clamp(min=1e-12),
+                              torch.zeros_like(points)).round().long()
+    n_coordinates = coordinates.max().item() + 1
+    keys = (coordinates * n_coordinates**torch.arange(
+        points.shape[-1], device=points.device)).sum(dim=-1)
+
+    sorted_keys, order = keys.sort(dim=0, stable=True)
+    duplicate = torch.zeros_like(sorted_keys, dtype=torch.bool)
+    duplicate[1:] = sorted_keys[1:] == sorted_keys[:-1]
+    return torch.zeros_like(duplicate).scatter_(0, order, duplicate)
+
+def _polish_best_responses(
+        env: AuctionEnvironment, player_position: int,
+        agent_observations: torch.Tensor, agent_actions: torch.Tensor,
+        opponent_batch_size: int, polishing_steps: int,
+        step_size: torch.Tensor, lower: torch.Tensor, upper: torch.Tensor,
+        n_directions: int = 8
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+    """For a batch of observations for the given player, polishes (best
+    response) actions by batched local ascent on the ex-interim utility.
+
+    The ascent direction is the gradient through the smoothed mechanism if
+    the mechanism has a `smoothing_temperature`, and is otherwise estimated by
+    ES-style finite differences along `n_directions` antithetic random
+    directions. Each observation takes normalized steps of (initially)
+    `step_size` that are only accepted if they improve its utility; otherwise
+    its step size is halved. All evaluations share the same opponent draws.
+
+    Args:
+        agent_actions (torch.Tensor of size [agent_batch_size, action_size]):
+            the starting points, e.g. the best responses on a grid.
+        step_size, lower, upper (torch.Tensor of size [action_size]): initial
+            step size and bounds of the actions in each dimension.
+
+    Returns:
+        utility (torch.FloatTensor of size [agent_batch_size]): the utilities
+            of the polished actions.
+        actions (torch.FloatTensor of size [agent_batch_size, action_size]):
+            the polished actions.
+    """
+    agent_batch_size, action_size = agent_actions.shape
+    smooth_market = env.mechanism.smoothing_temperature is not None
+
+    cv, opponent_action_profile = _draw_conditional_opponent_actions(
+        env, player_position, agent_observations, opponent_batch_size,
+        action_size, agent_actions.dtype
+        )
+    utility = lambda actions, smooth=False: _ex_interim_utility_against(
+        env, player_position, actions, cv, opponent_action_profile, smooth)
+    clip = lambda actions: env.sampler.project_onto_action_grid(
+        player_position, torch.max(torch.min(actions, upper), lower))
+
+    actions = agent_actions.detach().clone()
+    current_utility = utility(actions)
+    # per-observation step scale in units of `step_size`
+    scale = torch.ones(agent_batch_size, 1, dtype=actions.dtype, device=actions.device)
+
+    for _ in range(polishing_steps):
+        # ascent directions in units of `step_size`
+        if smooth_market:
+            with torch.enable_grad():
+                actions_ = actions.clone().requires_grad_(True)
+                gradient, = torch.autograd.grad(utility(actions_, True).sum(), actions_)
+            direction = gradient * step_size
+        else:
+            epsilon = torch.randn(n_directions, agent_batch_size, action_size,
+                                  dtype=actions.dtype, device=actions.device)
+            perturbations = torch.cat([epsilon, -epsilon]) * scale * step_size
+            perturbed_utility = utility(clip(actions + perturbations))
+            utility_differences = perturbed_utility[:n_directions] - perturbed_utility[n_directions:]
+            direction = (utility_differences.unsqueeze(-1) * epsilon).sum(dim=0)
+        direction = direction / direction.norm(dim=-1, keepdim=True).clamp(min=1e-12)
+
+        candidates = clip(actions + scale * step_size * direction)
+        candidate_utility = utility(candidates)
+
+        improved = candidate_utility > current_utility
+        actions[improved] = candidates[improved]
+        current_utility[improved] = candidate_utility[improved]
+        scale[~improved] /= 2
+
+    return current_utility, actions
+
 def ex_interim_utility(
         env: AuctionEnvironment, player_position: int,
         agent_observations: torch.Tensor, agent_actions: torch.Tensor,
@@ -400,10 +788,41 @@ def ex_interim_utility(
 
     return apply_average_dynamic_mini_batching(
         fct, batch_size=opponent_batch_size,
-        shape=agent_observations.shape[:-1],
+        shape=agent_actions.shape[:-1],
         device=agent_observations.device
     )
 
+def sequential_ex_interim_utility(
+        env: AuctionEnvironment, player_position: int,
+        agent_observations: torch.Tensor, agent_actions: torch.Tensor,
+        tolerance: float, max_opponent_batch_size: int,
+        chunk_size: int = 2**6, confidence: float = 0.95
+    ) -> Tuple[torch.Tensor, torch.Tensor, int]:
+    """Estimates the ex-interim utilities of the agent's actions as in
+    `ex_interim_utility`, but draws chunks of conditional opponents until the
+    standard errors of all estimates fall below `tolerance` (see
+    `sequential_mean_estimate`).
+
+    Returns:
+        utility (Tensor of dim (*agent_batch_sizes)), ci (Tensor of dim
+        (*agent_batch_sizes)), n_samples (int): number of opponent samples
+        per observation.
+    """
+    action_size = agent_actions.shape[-1]
+
+    def draw_utilities():
+        cv, opponent_action_profile = _draw_conditional_opponent_actions(
+            env, player_position, agent_observations,
+            min(chunk_size, max_opponent_batch_size), action_size, agent_actions.dtype
+            )
+        return _ex_interim_utility_against(
+            env, player_position, agent_actions, cv, opponent_action_profile,
+            aggregate=False
+            )
+
+    return sequential_mean_estimate(
+        draw_utilities, tolerance, max_opponent_batch_size, confidence)
+
 def _ex_interim_utility(
         env: AuctionEnvironment, player_position: int,
         agent_observations: torch.Tensor, agent_actions: torch.Tensor,
@@ -413,32 +832,53 @@ def _ex_interim_utility(
     Calculates the ex-interim utility of a given agent in the environment,
     given (batches of) their observations and actions.
 
-    Can handle multiple batch dimensions for the agent.
+    Can handle multiple batch dimensions for the agent. `agent_actions` may
+    have additional leading dimensions, e.g. a grid of alternative actions
+    for each observation. Conditional type profiles and opponent actions are
+    then drawn only once per observation and shared among all alternatives
+    (common random numbers), only the mechanism is evaluated per alternative.
 
     Args:
         env (AuctionEnvironment): The environment from which conditional type
             profiles and opponent actions will be sampled.
         player_position (int): the position of the agent to be evaluated
         agent_observations (Tensor of dim (*agent_batch_sizes x observation_size))
-        agent_actions      (Tensor of dim (*agent_batch_sizes x action_size))
+        agent_actions      (Tensor of dim (*alternative_sizes x *agent_batch_sizes x action_size))
         opponent_batch_size (int): how many conditional valuations and opponent
             observations to sample for each agent_batch entry. The expected
             ex-interim utility will then be approximated by the sample mean
             over the opponent_batch_size dimension.
 
     Returns:
-        utility: (Tensor of dim (*agent_batch_sizes)): the resulting empirical
-            ex-interim utilities.
+        utility: (Tensor of dim (*alternative_sizes x *agent_batch_sizes)): the
+            resulting empirical ex-interim utilities.
     """
-    mechanism = env.mechanism
-    device = agent_observations.device
-    agent = env.agents[player_position]
+    *_, action_size = agent_actions.shape
 
-    *batch_dims, _ = range(agent_actions.dim())
-    *agent_batch_sizes, action_size = agent_actions.shape
-    assert agent_observations.shape[:len(batch_dims)] == torch.Size(agent_batch_sizes), \
-        """observations and actions must have the same batch sizes!"""
-    action_dtype = agent_actions.dtype
+    cv, opponent_action_profile = _draw_conditional_opponent_actions(
+        env, player_position, agent_observations, opponent_batch_size,
+        action_size, agent_actions.dtype
+        )
+
+    return _ex_interim_utility_against(
+        env, player_position, agent_actions, cv, opponent_action_profile
+        )
+
+def _draw_conditional_opponent_actions(
+        env: AuctionEnvironment, player_position: int,
+        agent_observations: torch.Tensor, opponent_batch_size: int,
+        action_size: int, action_dtype=torch.float
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+    """Draws conditional valuation profiles and the corresponding opponent
+    actions for a batch of observations of the agent at `player_position`.
+
+    Returns:
+        cv: (Tensor of dim (*agent_batch_sizes x opponent_batch_size x n_players x valuation_size))
+        action_profile: (Tensor of dim (*agent_batch_sizes x opponent_batch_size x n_players x action_size))
+            opponents' actions, the agent's own actions are zero.
+    """
+    device = agent_observations.device
+    *agent_batch_sizes, _ = agent_observations.shape
 
     # draw conditional observations conditioned on `agent`'s observation:
     # co has dimension (*agent_batches , opponent_batch, n_players, observation_size)
@@ -447,34 +887,198 @@ def _ex_interim_utility(
         player_position, agent_observations, opponent_batch_size, device
         )
 
-    action_profile_actual = torch.zeros(
+    action_profile = torch.zeros(
         *agent_batch_sizes, opponent_batch_size, env.n_players, action_size,
         dtype=action_dtype, device=device
         )
 
-    action_profile_actual[...,:,player_position,:] = \
-        agent_actions \
-            .view(*agent_batch_sizes, 1, action_size) \
-            .repeat(*([1]*len(agent_batch_sizes)), opponent_batch_size, 1)
-
     for a in env.agents:
         if a.player_position != player_position:
-            action_profile_actual[..., a.player_position, :] = \
+            action_profile[..., a.player_position, :] = \
                 a.strategy.play(co[..., a.player_position, :]).to(device)
 
-    # shapes: allocations: *agent_batches x opponent_batch x n_players x n_items
-    #         payments:    *agent_batches x opponent_batch x n_players
-    allocations, payments = mechanism.play(action_profile_actual)
+    return cv, action_profile
+
+def _ex_interim_utility_against(
+        env: AuctionEnvironment, player_position: int,
+        agent_actions: torch.Tensor, cv: torch.Tensor,
+        opponent_action_profile: torch.Tensor, smooth_market: bool = False,
+        aggregate: bool = True
+    ) -> torch.Tensor:
+    """Calculates the ex-interim utilities of (alternative) actions of the
+    agent at `player_position` against fixed conditional valuations and
+    opponent actions (see `_draw_conditional_opponent_actions`).
+
+    Args:
+        agent_actions (Tensor of dim (*alternative_sizes x *agent_batch_sizes x action_size))
+        cv, opponent_action_profile: as returned by
+            `_draw_conditional_opponent_actions`.
+        smooth_market (bool): whether to play the smoothed mechanism, which
+            makes the utilities differentiable w.r.t. the agent's actions.
+        aggregate (bool): whether to average over the opponent batch.
+
+    Returns:
+        utility: (Tensor of dim (*alternative_sizes x *agent_batch_sizes)),
+            or (*alternative_sizes x *agent_batch_sizes x opponent_batch_size)
+            if not `aggregate`.
+    """
+    agent = env.agents[player_position]
+
+    *agent_batch_sizes, opponent_batch_size, _, _ = opponent_action_profile.shape
+    *action_batch_sizes, action_size = agent_actions.shape
+    n_alternative_dims = len(action_batch_sizes) - len(agent_batch_sizes)
+    assert n_alternative_dims >= 0 and \
+        agent_actions.shape[n_alternative_dims:-1] == torch.Size(agent_batch_sizes), \
+        """observations and actions must have the same batch sizes!"""
+    alternative_sizes = action_batch_sizes[:n_alternative_dims]
+
+    # opponents' actions don't depend on the agent's action: they're only
+    # computed once and broadcast over the alternatives
+    action_profile_actual = opponent_action_profile \
+        .expand(*alternative_sizes, *opponent_action_profile.shape) \
+        .contiguous()
+
+    action_profile_actual[..., player_position, :] = \
+        agent_actions.view(*action_batch_sizes, 1, action_size)
+
+    # shapes: allocations: *alternatives x *agent_batches x opponent_batch x n_players x n_items
+    #         payments:    *alternatives x *agent_batches x opponent_batch x n_players
+    allocations, payments = env.mechanism.play(action_profile_actual, smooth_market=smooth_market)
 
     agent_allocations = allocations[..., player_position, :]
     agent_payments = payments[..., player_position]
-    agent_valuations = cv[..., player_position, :]
+    agent_valuations = cv[..., player_position, :] \
+        .expand(*alternative_sizes, *cv.shape[:-2], cv.shape[-1])
 
-    # shape of utility: *agent_batch_sizes x opponent_batch_size
+    # shape of utility: *alternative_sizes x *agent_batch_sizes x opponent_batch_size
     utility = agent.get_utility(
         agent_allocations, agent_payments, agent_valuations
         )
 
     # expectation over opponent batches
-    utility = torch.mean(utility, axis=-1)  # dim: agent_batch_size
+    if aggregate:
+        utility = torch.mean(utility, axis=-1)  # dim: agent_batch_size
     return utility
+
+def _is_single_item_ipv(env: AuctionEnvironment, player_position: int) -> bool:
+    """Checks whether the ex-interim utilities of the agent at
+    `player_position` only depend on the distribution of the highest opposing
+    bid, s.t. they can be computed by `_single_item_ipv_ex_interim_utility`.
+
+    This is the case for single-item first-price and (risk-neutral) Vickrey
+    auctions with independent private values.
+    """
+    mechanism = env.mechanism
+    agent = env.agents[player_position]
+    sampler = env.sampler.base_sampler if isinstance(env.sampler, PrefetchingSampler) \
+        else env.sampler
+
+    return isinstance(sampler, IPVSampler) \
+        and sampler.valuation_size == 1 and env.n_players > 1 \
+        and isinstance(mechanism, (FirstPriceSealedBidAuction, VickreyAuction)) \
+        and not getattr(mechanism, 'random_tie_break', False) \
+        and type(agent) is Bidder and agent.bid_size == 1 \
+        and (isinstance(mechanism, FirstPriceSealedBidAuction) or agent.risk == 1.0)
+
+def _draw_highest_opponent_bids(
+        env: AuctionEnvironment, player_position: int,
+        agent_observations: torch.Tensor, opponent_batch_size: int
+    ) -> Tuple[torch.Tensor, torch.BoolTensor]:
+    """Samples the highest opposing bids in a single-item IPV setting, sorted
+    in ascending order. As opponents' types are independent of the agent's
+    observation, the same sample is valid for all of the agent's observations.
+
+    Returns:
+        highest_bids (torch.Tensor of size [opponent_batch_size])
+        wins_tie (torch.BoolTensor of size [opponent_batch_size]): whether the
+            agent would win with a bid equal to the highest opposing bid, i.e.
+            whether no opponent with the same bid precedes the agent.
+    """
+    device = agent_observations.device
+
+    _, co = env.draw_conditionals(
+        player_position, agent_observations[:1], opponent_batch_size, device
+        )
+
+    opponent_positions = [a.player_position for a in env.agents
+                          if a.player_position != player_position]
+    # shape: opponent_batch_size x n_opponents
+    opponent_bids = torch.cat(
+        [env.agents[i].strategy.play(co[0, :, i, :]).to(device)
+         for i in opponent_positions],
+        dim=-1)
+
+    highest_bids, _ = opponent_bids.max(dim=-1)
+    preceding = torch.tensor(opponent_positions, device=device) < player_position
+    wins_tie = ((opponent_bids == highest_bids.unsqueeze(-1)) & preceding) \
+        .any(dim=-1).logical_not_()
+
+    highest_bids, order = highest_bids.sort()
+    return highest_bids, wins_tie[order]
+
+def _single_item_ipv_ex_interim_utility(
+        env: AuctionEnvironment, player_position: int,
+        agent_observations: torch.Tensor, agent_actions: torch.Tensor,
+        highest_opponent_bids: torch.Tensor, wins_tie: torch.BoolTensor
+    ) -> torch.Tensor:
+    """Calculates the exact ex-interim utilities of an agent in a single-item
+    first-price or Vickrey auction with independent private values w.r.t. the
+    empirical distribution of the highest opposing bid (see
+    `_draw_highest_opponent_bids`).
+
+    Rather than playing `*alternatives x agent_batch x opponent_batch` auctions
+    as `_ex_interim_utility`, the (sorted) highest opposing bids are
+    accumulated once and each action is located among them via binary
+    search. Ties are resolved like in the mechanisms, i.e. in favor of the
+    first player.
+
+    Args:
+        agent_observations (Tensor of dim (agent_batch_size x 1))
+        agent_actions      (Tensor of dim (*alternative_sizes x agent_batch_size x 1))
+        highest_opponent_bids (Tensor of dim (opponent_batch_size)), sorted.
+        wins_tie (BoolTensor of dim (opponent_batch_size))
+
+    Returns:
+        utility: (Tensor of dim (*alternative_sizes x agent_batch_size))
+    """
+    agent = env.agents[player_position]
+    n_samples = highest_opponent_bids.shape[0]
+    device = agent_actions.device
+
+    bids = agent_actions.squeeze(-1)
+    valuations = agent_observations \
+        .expand(*agent_actions.shape[:-2], *agent_observations.shape)
+
+    # the agent wins against all lower and the tie-winnable equal bids
+    n_lower = torch.searchsorted(highest_opponent_bids, bids.contiguous())
+    n_lower_or_equal = torch.searchsorted(highest_opponent_bids, bids.contiguous(), right=True)
+
+    def won(cumulative: torch.Tensor) -> torch.Tensor:
+        """Total of the accumulated quantity over all won auctions"""
+        winnable = torch.zeros(n_samples + 1, dtype=cumulative.dtype, device=device)
+        winnable[1:] = cumulative.cumsum(dim=0)
+        return winnable[n_lower]
+
+    def won_ties(cumulative: torch.Tensor) -> torch.Tensor:
+        """Total of the accumulated quantity over all won ties"""
+        winnable = torch.zeros(n_samples + 1, dtype=cumulative.dtype, device=device)
+        winnable[1:] = (cumulative * wins_tie).cumsum(dim=0)
+        return winnable[n_lower_or_equal] - winnable[n_lower]
+
+    if isinstance(env.mechanism, FirstPriceSealedBidAuction):
+        ones = torch.ones_like(highest_opponent_bids)
+        win_probability = (won(ones) + won_ties(ones)) / n_samples
+        # items with a winning bid of zero are not allocated
+        win_probability.masked_fill_(bids == 0, 0)
+        utility_if_won = agent.get_utility(
+            torch.ones_like(valuations), bids, valuations)
+        return win_probability * utility_if_won
+
+    # Vickrey: the agent pays the highest opposing bid, items with a price of
+    # zero are not allocated
+    allocated = (highest_opponent_bids > 0).to(highest_opponent_bids.dtype)
+    win_probability = (won(allocated) + won_ties(allocated)) / n_samples
+    expected_payment = (won(highest_opponent_bids) + won_ties(highest_opponent_bids)) / n_samples
+    # risk-neutral, so utility is linear in allocations and payments
+    return agent.get_utility(
+        win_probability.unsqueeze(-1), expected_payment, valuations)
@@ -36,13 +36,35 @@ class MpcSolver():
         A (Tensor of dimension (n_batches, n_eq, n))
         b (Tensor of dimension (n_batches, n_eq))
         refine: bool. When set to `True`, if after max_iter iterations there are
-            still batches with residuals over 1e-6, the algorithm will run for another max_iter iterations,
+            still batches with residuals over `tol`, the algorithm will run for another max_iter iterations,
             up to two additional times.
         print_warning (bool): if True, will print warnings if after three runs of max_iter iterations,
             the algorithm still hasn't converged sufficiently.
+        x0 (Tensor of dimension (n_batches, n), optional): warm-start for the
+            primal variables, e.g. the solution of a similar problem.
+        z0 (Tensor of dimension (n_batches, n_ineq), optional): warm-start for
+            the duals of the inequality constraints.
+        y0 (Tensor of dimension (n_batches, n_eq), optional): warm-start for
+            the duals of the equality constraints.
+
+    Problems whose residuals have converged (to below `tol`) are dropped from the
+    active batch, such that later iterations only factorize the KKT systems of
+    the remaining problems.
+
+    With `reduce_kkt=True` (default), the slacks and inequality duals are
+    eliminated from the KKT system, s.t. each iteration only factorizes the
+    (n + n_eq)-dimensional reduced system
+
+        | Q + G.T D G  A.T |
+        |      A        0  |
+
+    instead of the full (n + 2 n_ineq + n_eq)-dimensional Jacobian. Only the
+    diagonal D changes between iterations, while G is shared by all of them.
     """
-    def __init__(self, max_iter=20):
+    def __init__(self, max_iter=20, tol=1e-8, reduce_kkt=True):
         self.max_iter = max_iter
+        self.tol = tol
+        self.reduce_kkt = reduce_kkt
 
         # problem parameters
         self.Q: torch.Tensor = None # objective quadratic term
@@ -61,6 +83,7 @@ class MpcSolver():
         self.y: torch.Tensor = None # Lagrange multiplicators of equality constraints
 
         self.J: torch.Tensor = None # Jacobian of the KKT system
+        self.d: torch.Tensor = None # diagonal D of the Jacobian (n_batch, n_ineq, 1)
         self.J_lu: torch.Tensor = None # LU factorization of J
         self.J_piv: torch.Tensor = None # pivot information about J_LU
 
@@ -74,11 +97,20 @@ class MpcSolver():
 
         self.refine: bool = None
 
+        # indices (in the full batch) of the problems that are still iterated
+        self._active: torch.Tensor = None
+        # whether each problem of the full batch has converged
+        self.converged: torch.BoolTensor = None
+        # total number of iterations performed in the last call of `solve`
+        self.n_iter: int = 0
+
 
     def solve(self, Q: torch.Tensor, q: torch.Tensor,
                     G: torch.Tensor, h: torch.Tensor,
                     A: torch.Tensor  = None, b: torch.Tensor = None,
-                    refine=False, print_warning=False):
+                    refine=False, print_warning=False,
+                    x0: torch.Tensor = None, z0: torch.Tensor = None,
+                    y0: torch.Tensor = None):
 
         self.refine = refine
         self.device = Q.device
@@ -103,13 +135,57 @@ class MpcSolver():
         self.s = -self.z+alpha_p*(torch.ones_like(self.z))
         self.z = self.z+alpha_d*(torch.ones_like(self.z))
 
+        warm_started = x0 is not None or z0 is not None or y0 is not None
+        if warm_started:
+            self._set_warm_start(x0, z0, y0)
+
         # main iterations
         self.x, self.s, self.z, self.y = self._run_main_iterations(
             print_warning=print_warning)
+        # restore the parameters of the full batch (the solver only keeps the
+        # active problems during the iterations)
+        self._set_and_verify_parameters(Q, q, G, h, A, b)
+
+        if warm_started and not self.converged.all():
+            # a poor warm-start may stall the iterations: solve these problems
+            # again from a cold start
+            self._resolve_cold_started(~self.converged, refine, print_warning)
+
         op_val = 0.5*torch.bmm(torch.transpose(self.x, dim0=2, dim1=1), torch.bmm(self.Q, self.x)) + \
             torch.bmm(torch.transpose(self.q.unsqueeze(-1), dim0=2, dim1=1), self.x)
         return self.x, op_val
 
+    def _resolve_cold_started(self, problems: torch.BoolTensor, refine: bool, print_warning: bool):
+        """Solves the subset `problems` of the batch again without warm-start,
+        and overwrites their iterates."""
+        indices = problems.nonzero().squeeze(-1)
+        cold_solver = MpcSolver(max_iter=self.max_iter, tol=self.tol, reduce_kkt=self.reduce_kkt)
+        cold_solver.solve(
+            self.Q[indices], self.q[indices], self.G[indices], self.h[indices],
+            self.A[indices] if self.n_eq > 0 else None, self.b[indices] if self.n_eq > 0 else None,
+            refine=refine, print_warning=print_warning)
+
+        for name in ['x', 's', 'z', 'y']:
+            if getattr(self, name) is not None:
+                getattr(self, name)[indices] = getattr(cold_solver, name)
+        self.converged[indices] = cold_solver.converged
+        self.n_iter += cold_solver.n_iter
+
+    def _set_warm_start(self, x0: torch.Tensor = None, z0: torch.Tensor = None,
+                        y0: torch.Tensor = None, margin: float = 1e-3):
+        """Replaces the (cold) initial iterates by the provided warm-start
+        values. Slacks and duals are kept at least `margin` away from the
+        boundary, as the interior point iterations can't recover from
+        (numerically) zero entries."""
+        if x0 is not None:
+            self.x = x0.to(self.device, self.dtype).reshape(self.n_batch, self.n_x, 1).clone()
+            # slacks of the warm-started primal
+            self.s = (self.h.unsqueeze(-1) - torch.bmm(self.G, self.x)).clamp_(min=margin)
+        if z0 is not None:
+            self.z = z0.to(self.device, self.dtype).reshape(self.n_batch, self.n_ineq, 1).clamp(min=margin)
+        if y0 is not None and self.n_eq > 0:
+            self.y = y0.to(self.device, self.dtype).reshape(self.n_batch, self.n_eq, 1).clone()
+
     def _set_and_verify_parameters(self, Q: torch.Tensor, q: torch.Tensor,
                                          G: torch.Tensor, h: torch.Tensor,
                                          A: torch.Tensor, b: torch.Tensor):
@@ -180,6 +256,13 @@ class MpcSolver():
     #     return (data, pivots)
 
     def _set_initial_Jacobian(self):
+        if self.reduce_kkt:
+            # the reduced system is built from D = I on factorization
+            self.d = torch.ones(self.n_batch, self.n_ineq, 1, device=self.device, dtype=self.dtype)
+            return
+        self._set_initial_full_Jacobian()
+
+    def _set_initial_full_Jacobian(self):
         """Set up the initial Jacobian KKT matrix as the following block matrix:
 
             | Q 0 | Gt At |
@@ -228,6 +311,9 @@ class MpcSolver():
         if d is not None:
             assert d.shape == torch.Size([self.n_batch, self.n_ineq, 1]), \
                 "d has unexpected shape."
+            self.d = d
+            if self.reduce_kkt:
+                return
             self.J[ :, self.n_x:self.n_primal_vars, self.n_x:self.n_primal_vars] = \
                 torch.diag_embed(d.squeeze(-1))
 
@@ -236,7 +322,18 @@ class MpcSolver():
         # TODO Stefan: wrapper no longer needed (??)
         # replaced by direct torch.lu call below, but keep around just in case
         #self.J_lu, self.J_piv = self.lu_factorize(self.J)
-        self.J_lu, self.J_piv = self.J.lu(pivot = not self.J.is_cuda)
+        J = self._reduced_Jacobian() if self.reduce_kkt else self.J
+        self.J_lu, self.J_piv = J.lu(pivot = not J.is_cuda)
+
+    def _reduced_Jacobian(self) -> torch.Tensor:
+        """Returns the Jacobian of the KKT system after eliminating ds and dz,
+        i.e. the block matrix ((Q + G.T D G, A.T), (A, 0))."""
+        H = self.Q + torch.bmm(self.G_T, self.d * self.G)
+        if self.n_eq == 0:
+            return H
+        zeros = torch.zeros(self.n_batch, self.n_eq, self.n_eq, device=self.device, dtype=self.dtype)
+        return torch.cat([torch.cat([H, self.A_T], dim=2),
+                          torch.cat([self.A, zeros], dim=2)], dim=1)
 
     def _solve_kkt(self, rx, rs, rz, ry) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor, Union[torch.Tensor, None]]:
         """Solve the KKT system with jacobian self.J and RHS specified by rx,rs,rz,ry, i.e.
@@ -248,6 +345,8 @@ class MpcSolver():
         Args:
             rx, rs, rz, ry (torch.Tensors): right hand side vectors for the primal and dual variables.
         """
+        if self.reduce_kkt:
+            return self._solve_reduced_kkt(rx, rs, rz, ry)
         if ry is not None:
             rhs = torch.cat((rx, rs, rz, ry), dim=1)
         else:
@@ -263,6 +362,22 @@ class MpcSolver():
             dy = None
         return dx, ds, dz, dy
 
+    def _solve_reduced_kkt(self, rx, rs, rz, ry):
+        """Solves the KKT system via the reduced Jacobian: substituting
+        ds = rz - G dx and dz = rs - D ds into the first block row yields
+
+            (Q + G.T D G) dx + A.T dy = rx - G.T (rs - D rz),   A dx = ry.
+        """
+        rhs = rx - torch.bmm(self.G_T, rs - self.d * rz)
+        if ry is not None:
+            rhs = torch.cat((rhs, ry), dim=1)
+        delta = rhs.lu_solve(self.J_lu, self.J_piv)
+        dx = delta[:, :self.n_x, :]
+        dy = delta[:, self.n_x:, :] if ry is not None else None
+        ds = rz - torch.bmm(self.G, dx)
+        dz = rs - self.d * ds
+        return dx, ds, dz, dy
+
     # ALTERNATIVE SOLVE_KKT USING BLOCK ELIMINATION TECHNIQUE
     # this has been found to be slower in our settings.
     # For details see Anne Christopher's MSc Thesis (2020), section 5.3.2
@@ -318,12 +433,21 @@ class MpcSolver():
         return dx, ds, dz, dy, wh
 
     def _run_main_iterations(self, print_warning=True):
-        """Runs the main iterations of the MPC algorithm."""
-        #bat = np.array([i for i in range(self.n_batch)])
-        n_iter = 0
-        while n_iter <= 3:
-            if n_iter > 0:
-                print(n_iter)
+        """Runs the main iterations of the MPC algorithm.
+
+        Converged problems are written to the solution and dropped from the
+        active batch. Returns the iterates of the full batch."""
+        solution = [v.clone() if v is not None else None
+                    for v in (self.x, self.s, self.z, self.y)]
+        self._active = torch.arange(self.n_batch, device=self.device)
+        self.converged = torch.zeros(self.n_batch, dtype=torch.bool, device=self.device)
+        self.n_iter = 0
+
+        n_round = 0
+        terminated = False
+        while n_round <= 3 and not terminated:
+            if n_round > 0:
+                print(n_round)
                 print("Refining solutions with second round of iterations")
             for i in range(self.max_iter):
 
@@ -332,27 +456,33 @@ class MpcSolver():
                        torch.bmm(self.Q, self.x)+ self.q.unsqueeze(-1))
                 if self.n_eq > 0:
                     rx -= torch.bmm(self.A_T, self.y)
-                rs = -self.z
                 rz = -(torch.bmm(self.G, self.x)+self.s-self.h.unsqueeze(-1))
                 ry = -(torch.bmm(self.A, self.x)-self.b.unsqueeze(-1)) if self.n_eq > 0 else None
 
-
-                residual_x = torch.abs(rx)
                 # complementary slackness residual
                 mu = torch.abs(torch.bmm(torch.transpose(self.s, dim0=2, dim1=1),
                                          self.z).sum(1))/self.n_ineq
-                residual_z = torch.abs(rz)
-                residual_y = torch.abs(ry) if self.n_eq > 0 else torch.zeros_like(residual_z)
 
-                residuals = torch.cat([r.max().view(1) for r in [residual_x, mu, residual_z, residual_y]])
-
-                try:
-                    if (residuals < 1e-6).all():
+                # maximum residuals of each problem (NaNs never converge)
+                residuals = torch.stack([rx.abs().amax(dim=(1, 2)), mu.view(-1), rz.abs().amax(dim=(1, 2))])
+                if self.n_eq > 0:
+                    residuals = torch.cat([residuals, ry.abs().amax(dim=(1, 2)).unsqueeze(0)])
+                residuals = residuals.amax(dim=0)
+
+                converged = residuals < self.tol
+                if converged.any():
+                    self.converged[self._active[converged]] = True
+                    self._retire(converged, solution)
+                    if self.n_batch == 0:
                         # print("Early exit at iteration no:",i)
-                        return(self.x, self.s, self.z, self.y)
-                except Exception as e:
-                    #print(bat[torch.isnan(residual_x.sum(1)).squeeze(1)])
-                    raise RuntimeError("invalid residuals, NaNs introduced?") from e
+                        return tuple(solution)
+                    active = ~converged
+                    rx, rz, mu, residuals = rx[active], rz[active], mu[active], residuals[active]
+                    if self.n_eq > 0:
+                        ry = ry[active]
+                rs = -self.z
+
+                self.n_iter += 1
 
                 # 2. Affine step calculation
                 # get modified Jacobian and its lu factorization
@@ -393,7 +523,8 @@ class MpcSolver():
 
                 dx, ds, dz, dy, wh = self._remove_nans(dx, ds, dz, dy)
                 if len(wh) == self.n_batch: #all batches have NaNs in the update --> terminate
-                    return(self.x, self.s, self.z, self.y)
+                    terminated = True
+                    break
 
                 self.x += alpha*dx
                 self.s += alpha*ds
@@ -408,10 +539,33 @@ class MpcSolver():
                     print("no of mu not converged: ", len(mu[mu > 1e-10]))
                     print("mpc warning: Residuals not converged, need more itrations")
             if not self.refine:
-                return(self.x, self.s, self.z, self.y)
-            else:
-                n_iter += 1
-        return(self.x, self.s, self.z, self.y)
+                break
+            n_round += 1
+
+        self._retire(torch.ones(self.n_batch, dtype=torch.bool, device=self.device), solution)
+        return tuple(solution)
+
+    def _retire(self, done: torch.BoolTensor, solution):
+        """Writes the current iterates of the active problems marked as `done`
+        into `solution` (x, s, z, y of the full batch), and drops these
+        problems from the active batch.
+
+        Args:
+            done: torch.BoolTensor (n_batch) mask of the active problems to retire.
+            solution: list of the full-batch tensors x, s, z, y
+        """
+        indices = self._active[done]
+        for full, current in zip(solution, (self.x, self.s, self.z, self.y)):
+            if full is not None:
+                full[indices] = current[done]
+
+        keep = ~done
+        self._active = self._active[keep]
+        self.n_batch = len(self._active)
+        for name in ['Q', 'q', 'G', 'G_T', 'h', 'A', 'A_T', 'b', 'J', 'd', 'x', 's', 'z', 'y']:
+            value = getattr(self, name)
+            if value is not None:
+                setattr(self, name, value[keep])
 
     @staticmethod
     def _calculate_step_size(v, dv):
@@ -0,0 +1,61 @@
+"""Persistent pools of worker processes for cpu-parallel strategies and
+mechanisms.
+
+Starting a `torch.multiprocessing.Pool` requires spawning its workers and
+re-importing the package (and, for gurobi, checking the solver licence) in each
+of them. The pools provided here are therefore started on first use and reused
+by all subsequent calls, until `shutdown_process_pools` is called (at the end of
+each experiment run).
+
+The workers are spawned rather than forked: a run may already hold CUDA
+contexts and threads (e.g. of thread pools or prefetching samplers), which
+forked children would inherit in an inconsistent state. Scripts using the pools
+therefore need an `if __name__ == '__main__':` guard.
+
+Tensors passed to and returned from the workers are moved to shared memory by
+the reductions of `torch.multiprocessing`, i.e. they are not copied through the
+pipe.
+"""
+
+import os
+import sys
+from typing import Dict, Tuple
+
+import torch.multiprocessing as mp
+
+_POOLS: Dict[Tuple[int, bool, bool], mp.Pool] = {}
+
+
+def _mute_worker(mute_stdout: bool, mute_stderr: bool):
+    """Suppresses stdout (e.g. gurobi licence messages) and/or stderr
+    (e.g. integration warnings) of a worker process."""
+    if mute_stdout:
+        sys.stdout = open(os.devnull, 'w')
+    if mute_stderr:
+        sys.stderr = open(os.devnull, 'w')
+
+
+def get_process_pool(n_processes: int, mute_stdout: bool = False,
+                     mute_stderr: bool = False) -> mp.Pool:
+    """Returns a persistent pool of `n_processes` workers, which is started on
+    first use and shared by all callers requesting the same configuration.
+
+    Args:
+        n_processes: number of worker processes.
+        mute_stdout, mute_stderr: whether to suppress the respective outputs
+            of the workers.
+    """
+    key = (n_processes, mute_stdout, mute_stderr)
+    if key not in _POOLS:
+        _POOLS[key] = mp.get_context('spawn').Pool(n_processes, initializer=_mute_worker,
+                                                    initargs=(mute_stdout, mute_stderr))
+    return _POOLS[key]
+
+
+def shutdown_process_pools():
+    """Stops all persistent worker pools. Pools will be restarted on their
+    next use."""
+    while _POOLS:
+        _, pool = _POOLS.popitem()
+        pool.close()
+        pool.join()
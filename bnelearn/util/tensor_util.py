@@ -1,8 +1,10 @@
 """This module implements util functions for PyTorch tensor operations."""
 
+import os
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm
-from typing import List
+from typing import List, Tuple
 from math import ceil
 import torch
 
@@ -117,30 +119,66 @@ def batched_index_select(input: torch.Tensor, dim: int,
     return torch.gather(input, dim, index)
 
 
+def _default_cpu_memory_budget() -> int:
+    """Returns half of the currently available RAM in bytes (or 1 GB if this
+    cannot be determined on the current platform)."""
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_AVPHYS_PAGES') // 2
+    except (ValueError, AttributeError, OSError):
+        return 2**30
+
+
+def _call_and_estimate_memory(function: callable, args: torch.Tensor) -> Tuple[tuple, int]:
+    """Calls `function(args)` and returns its output together with an
+    estimate of the memory it requires on CPU, i.e. the total number of bytes
+    allocated during the call. (This is an upper bound of its peak memory
+    usage, as freed memory is not subtracted.)
+    """
+    with torch.autograd.profiler.profile(profile_memory=True) as profiler:
+        output = function(args)
+    n_bytes = sum(max(event.self_cpu_memory_usage, 0) for event in profiler.function_events)
+    return output, n_bytes
+
+
 def apply_with_dynamic_mini_batching(
         function: callable,
         args: torch.Tensor,
         mute: bool=False,
+        memory_budget: int=None,
+        n_threads: int=1
     ) -> List[torch.Tensor]:
     """Apply the function `function` batch wise to the tensor argument `args`
     with error handling for CUDA Out-Of-Memory problems. Starting with the full
     batch, this method will cut the batch size in half until the operation
     succeeds (or a non-CUDA-OOM error occurs).
 
-    NOTE: The automatic error handling applies to CUDA memory limits only. This
-    function does not provide any benefits when processing on CPU with regular
-    RAM.
+    On CPU, where OOM errors are not reliably raised, the initial mini batch
+    size is instead derived from the memory footprint of a probe call on a
+    single item, s.t. the mini batches stay within `memory_budget`. The mini
+    batches may then also be distributed over a pool of `n_threads` threads
+    (which share the budget).
 
     Args:
         function :callable: function to be evaluated.
         args :torch.Tensor: pytorch.tensor arguments passed to function.
         mute :bool: Suppress console output.
+        memory_budget :int: (CPU only) RAM in bytes that may be used at once.
+            Defaults to half of the available memory.
+        n_threads :int: (CPU only) number of threads that evaluate mini
+            batches concurrently. Only pass `n_threads > 1` if `function` is
+            thread-safe, i.e. it may not mutate shared state (such as
+            caches of environments, agents or mechanisms).
 
     Returns:
         function evaluated at args.
     """
     batch_size = args.shape[0]
-    output_sample = function(args[[0], ...])
+    on_cpu = str(args.device) == "cpu"
+
+    if on_cpu:
+        output_sample, item_memory = _call_and_estimate_memory(function, args[[0], ...])
+    else:
+        output_sample = function(args[[0], ...])
     n_outputs = len(output_sample)
     output_dtypes = [o.dtype for o in output_sample]
     output_shapes = [tuple(o.shape[1:]) for o in output_sample]
@@ -155,8 +193,23 @@ def apply_with_dynamic_mini_batching(
 
     calculation_successful = False
 
-    # Auto splitting doesn't work on CPU -> go full sequential
-    mini_batch_size = 1 if str(args.device) == "cpu" else batch_size
+    if on_cpu:
+        # Auto splitting doesn't work reliably on CPU -> size mini batches by memory budget
+        memory_budget = memory_budget or _default_cpu_memory_budget()
+        n_threads = max(1, n_threads)
+        mini_batch_size = memory_budget // (n_threads * max(item_memory, 1))
+        mini_batch_size = int(min(max(mini_batch_size, 1), batch_size))
+    else:
+        n_threads = 1
+        mini_batch_size = batch_size
+
+    def apply_to_mini_batch(i: int, mini_arg: torch.Tensor):
+        # Get the indices corresponding to this mini batch
+        indices = slice(i*mini_batch_size, (i+1)*mini_batch_size)
+
+        mini_output = function(mini_arg)
+        for out_dim in range(n_outputs):
+            output[out_dim][indices] = mini_output[out_dim]
 
     while not calculation_successful:
         try:
@@ -167,15 +220,16 @@ def apply_with_dynamic_mini_batching(
             mini_args = args.split(mini_batch_size)
 
             # Iterate over chunks
-            custom_range = enumerate(mini_args) if mute else tqdm(enumerate(mini_args), total=ceil(len(mini_args)))
-            for i, mini_arg in custom_range:
-
-                # Get the indices corresponding to this mini batch
-                indices = slice(i*mini_batch_size, (i+1)*mini_batch_size)
-
-                mini_output = function(mini_arg)
-                for out_dim in range(n_outputs):
-                    output[out_dim][indices] = mini_output[out_dim]
+            if n_threads > 1 and len(mini_args) > 1:
+                with ThreadPoolExecutor(max_workers=n_threads) as pool:
+                    futures = [pool.submit(apply_to_mini_batch, i, mini_arg)
+                               for i, mini_arg in enumerate(mini_args)]
+                    for future in (futures if mute else tqdm(futures)):
+                        future.result()
+            else:
+                custom_range = enumerate(mini_args) if mute else tqdm(enumerate(mini_args), total=ceil(len(mini_args)))
+                for i, mini_arg in custom_range:
+                    apply_to_mini_batch(i, mini_arg)
 
             calculation_successful = True
             if not mute: